@@ -0,0 +1,26 @@
+"""add user token generation
+
+Revision ID: 005_add_token_generation
+Revises: 004_add_app_settings
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005_add_token_generation"
+down_revision: Union[str, None] = "004_add_app_settings"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("token_generation", sa.Integer(), nullable=False, server_default=sa.text("0")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "token_generation")
@@ -0,0 +1,64 @@
+"""add ledger
+
+Revision ID: 006_add_ledger
+Revises: 005_add_token_generation
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006_add_ledger"
+down_revision: Union[str, None] = "005_add_token_generation"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ledger_entries",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("reference_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.text("now()")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_ledger_entries")),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], name=op.f("fk_ledger_entries_user_id_users"), ondelete="RESTRICT"
+        ),
+        sa.CheckConstraint(
+            "kind IN ('purchase', 'payment', 'spin', 'reward', 'fiscal_reset', 'adjustment')",
+            name="ck_ledger_entry_kind",
+        ),
+    )
+    op.create_index("ix_ledger_entries_user_id_created_at", "ledger_entries", ["user_id", "created_at"])
+
+    op.create_table(
+        "balance_snapshots",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("balance", sa.Float(), nullable=False),
+        sa.Column("taken_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_balance_snapshots")),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], name=op.f("fk_balance_snapshots_user_id_users"), ondelete="RESTRICT"
+        ),
+    )
+    op.create_index("ix_balance_snapshots_user_id_taken_at", "balance_snapshots", ["user_id", "taken_at"])
+
+    # Opening snapshot: balances so far have no ledger entries behind them.
+    # A zero balance needs none, which also leaves pending users without
+    # rows; a user with history cannot be deleted while the rows exist
+    op.execute(
+        "INSERT INTO balance_snapshots (user_id, balance, taken_at) "
+        "SELECT id, balance, now() AT TIME ZONE 'utc' FROM users WHERE balance != 0"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_balance_snapshots_user_id_taken_at", table_name="balance_snapshots")
+    op.drop_table("balance_snapshots")
+    op.drop_index("ix_ledger_entries_user_id_created_at", table_name="ledger_entries")
+    op.drop_table("ledger_entries")
@@ -0,0 +1,47 @@
+"""add pagination indexes
+
+Revision ID: 008_add_pagination_indexes
+Revises: 007_add_idempotency_keys
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "008_add_pagination_indexes"
+down_revision: Union[str, None] = "007_add_idempotency_keys"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns) matching the sort keys of the paginated list endpoints
+INDEXES = [
+    ("ix_transactions_user_id_created_at_id", "transactions", ["user_id", "created_at", "id"]),
+    ("ix_transactions_status_created_at_id", "transactions", ["status", "created_at", "id"]),
+    ("ix_users_first_name_id", "users", ["first_name", "id"]),
+    ("ix_users_is_active_balance_id", "users", ["is_active", "balance", "id"]),
+    ("ix_fiscal_debts_status_created_at_id", "fiscal_debts", ["status", "created_at", "id"]),
+    ("ix_reward_grants_user_id_granted_at_id", "reward_grants", ["user_id", "granted_at", "id"]),
+    ("ix_reward_grants_granted_at_id", "reward_grants", ["granted_at", "id"]),
+    ("ix_slot_machine_spins_user_id_created_at_id", "slot_machine_spins", ["user_id", "created_at", "id"]),
+]
+
+# Single-column indexes that are a prefix of one of the above
+SUPERSEDED = [
+    ("ix_reward_grants_user_id", "reward_grants", ["user_id"]),
+    ("ix_reward_grants_granted_at", "reward_grants", ["granted_at"]),
+    ("ix_slot_machine_spins_user_id", "slot_machine_spins", ["user_id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    for name, table, _ in SUPERSEDED:
+        op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table, columns in SUPERSEDED:
+        op.create_index(name, table, columns)
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
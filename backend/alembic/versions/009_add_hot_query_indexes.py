@@ -0,0 +1,35 @@
+"""add hot query indexes
+
+Revision ID: 009_add_hot_query_indexes
+Revises: 008_add_pagination_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "009_add_hot_query_indexes"
+down_revision: Union[str, None] = "008_add_pagination_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_transactions_pending_created_at_id", "transactions", ["created_at", "id"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+    op.create_index(
+        "ix_fiscal_debts_fiscal_period_id_amount", "fiscal_debts", ["fiscal_period_id", "amount"]
+    )
+    op.create_index(
+        "ix_fiscal_debts_user_id_outstanding", "fiscal_debts", ["user_id", "created_at"],
+        postgresql_where=sa.text("status IN ('unpaid', 'payment_pending')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_fiscal_debts_user_id_outstanding", table_name="fiscal_debts")
+    op.drop_index("ix_fiscal_debts_fiscal_period_id_amount", table_name="fiscal_debts")
+    op.drop_index("ix_transactions_pending_created_at_id", table_name="transactions")
@@ -0,0 +1,32 @@
+"""add transaction search indexes
+
+Revision ID: 010_add_tx_search_indexes
+Revises: 009_add_hot_query_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "010_add_tx_search_indexes"
+down_revision: Union[str, None] = "009_add_hot_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index("ix_transactions_created_at_id", "transactions", ["created_at", "id"])
+    op.create_index(
+        "ix_transactions_product_id_created_at_id", "transactions", ["product_id", "created_at", "id"]
+    )
+    op.create_index(
+        "ix_transactions_note_trgm", "transactions", ["note"],
+        postgresql_using="gin", postgresql_ops={"note": "gin_trgm_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_transactions_note_trgm", table_name="transactions")
+    op.drop_index("ix_transactions_product_id_created_at_id", table_name="transactions")
+    op.drop_index("ix_transactions_created_at_id", table_name="transactions")
@@ -0,0 +1,79 @@
+"""add fiscal period stats
+
+Revision ID: 011_add_fiscal_period_stats
+Revises: 010_add_tx_search_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "011_add_fiscal_period_stats"
+down_revision: Union[str, None] = "010_add_tx_search_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fiscal_period_stats",
+        sa.Column("fiscal_period_id", sa.Integer(), nullable=False),
+        sa.Column("total_purchases", sa.Integer(), nullable=False),
+        sa.Column("total_purchase_amount", sa.Float(), nullable=False),
+        sa.Column("total_payments", sa.Integer(), nullable=False),
+        sa.Column("total_payment_amount", sa.Float(), nullable=False),
+        sa.Column("total_debt", sa.Float(), nullable=False),
+        sa.Column("debt_collected", sa.Float(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("fiscal_period_id", name=op.f("pk_fiscal_period_stats")),
+        sa.ForeignKeyConstraint(
+            ["fiscal_period_id"], ["fiscal_periods.id"],
+            name=op.f("fk_fiscal_period_stats_fiscal_period_id_fiscal_periods"),
+        ),
+    )
+
+    # Freeze the statistics of every period closed so far
+    op.execute(
+        """
+        INSERT INTO fiscal_period_stats (
+            fiscal_period_id, total_purchases, total_purchase_amount, total_payments,
+            total_payment_amount, total_debt, debt_collected, computed_at
+        )
+        SELECT
+            p.id,
+            COALESCE(t.purchases, 0),
+            ABS(COALESCE(t.purchase_amount, 0)),
+            COALESCE(t.payments, 0),
+            COALESCE(t.payment_amount, 0),
+            COALESCE(d.total, 0),
+            COALESCE(d.collected, 0),
+            now() AT TIME ZONE 'utc'
+        FROM fiscal_periods p
+        LEFT JOIN LATERAL (
+            SELECT
+                COUNT(*) FILTER (WHERE type = 'purchase') AS purchases,
+                SUM(amount) FILTER (WHERE type = 'purchase') AS purchase_amount,
+                COUNT(*) FILTER (WHERE type = 'payment') AS payments,
+                SUM(amount) FILTER (WHERE type = 'payment') AS payment_amount
+            FROM transactions
+            WHERE status = 'approved'
+              AND type IN ('purchase', 'payment')
+              AND created_at >= p.started_at
+              AND created_at <= p.ended_at
+        ) t ON true
+        LEFT JOIN (
+            SELECT
+                fiscal_period_id,
+                SUM(amount) AS total,
+                SUM(amount) FILTER (WHERE status = 'paid') AS collected
+            FROM fiscal_debts
+            GROUP BY fiscal_period_id
+        ) d ON d.fiscal_period_id = p.id
+        WHERE p.ended_at IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("fiscal_period_stats")
@@ -0,0 +1,38 @@
+"""add user fiscal debt total
+
+Revision ID: 012_add_user_fiscal_debt_total
+Revises: 011_add_fiscal_period_stats
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "012_add_user_fiscal_debt_total"
+down_revision: Union[str, None] = "011_add_fiscal_period_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "users",
+        sa.Column("fiscal_debt_total", sa.Float(), nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        UPDATE users SET fiscal_debt_total = d.total
+        FROM (
+            SELECT user_id, SUM(amount) AS total
+            FROM fiscal_debts
+            WHERE status IN ('unpaid', 'payment_pending')
+            GROUP BY user_id
+        ) d
+        WHERE d.user_id = users.id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "fiscal_debt_total")
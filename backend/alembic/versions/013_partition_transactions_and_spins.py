@@ -0,0 +1,91 @@
+"""partition transactions and slot machine spins by month
+
+Revision ID: 013_partition_tx_and_spins
+Revises: 012_add_user_fiscal_debt_total
+Create Date: 2026-10-18 00:00:00.000000
+
+Rebuilds both tables as range-partitioned by created_at, one partition per
+month from the oldest row to three months ahead; the scheduler creates
+later months (app.services.partitions). Rows are copied inside the
+migration's transaction, which holds an exclusive lock on the tables until
+it commits. The primary key becomes (id, created_at), as Postgres requires
+the partition key in it; ids still come from the same sequence.
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "013_partition_tx_and_spins"
+down_revision: Union[str, None] = "012_add_user_fiscal_debt_total"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("transactions", "slot_machine_spins")
+MONTHS_AHEAD = 3
+
+
+def _add_months(moment: datetime, months: int) -> datetime:
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _rebuild(table: str, partitioned: bool) -> None:
+    """Recreate `table` with the same columns, checks, defaults, foreign
+    keys and indexes, partitioned or not, and move its rows over."""
+    bind = op.get_bind()
+    indexes = bind.execute(
+        sa.text(
+            "SELECT indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = :table AND indexname <> :pk"
+        ),
+        {"table": table, "pk": f"pk_{table}"},
+    ).scalars().all()
+    foreign_keys = bind.execute(
+        sa.text(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+        ),
+        {"table": table},
+    ).all()
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+
+    new = f"{table}_rebuilt"
+    op.execute(
+        f"CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        + (" PARTITION BY RANGE (created_at)" if partitioned else "")
+    )
+    if partitioned:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {table}")).scalar() or now
+        newest = bind.execute(sa.text(f"SELECT max(created_at) FROM {table}")).scalar() or now
+        month, end = _add_months(oldest, 0), _add_months(max(newest, now), MONTHS_AHEAD + 1)
+        while month < end:
+            following = _add_months(month, 1)
+            op.execute(
+                f"CREATE TABLE {table}_y{month.year}m{month.month:02d} PARTITION OF {new} "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+            )
+            month = following
+
+    op.execute(f"INSERT INTO {new} SELECT * FROM {table}")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY {new}.id")
+    op.execute(f"DROP TABLE {table}")
+    op.execute(f"ALTER TABLE {new} RENAME TO {table}")
+
+    key = "id, created_at" if partitioned else "id"
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT pk_{table} PRIMARY KEY ({key})")
+    for name, definition in foreign_keys:
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}")
+    for definition in indexes:
+        op.execute(definition)
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        _rebuild(table, partitioned=True)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        _rebuild(table, partitioned=False)
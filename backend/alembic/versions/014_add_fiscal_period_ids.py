@@ -0,0 +1,63 @@
+"""add fiscal period ids to transactions, spins and reward grants
+
+Revision ID: 014_add_fiscal_period_ids
+Revises: 013_partition_tx_and_spins
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "014_add_fiscal_period_ids"
+down_revision: Union[str, None] = "013_partition_tx_and_spins"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# table -> column the period membership was derived from so far
+TABLES = {
+    "transactions": "created_at",
+    "slot_machine_spins": "created_at",
+    "reward_grants": "granted_at",
+}
+
+
+def upgrade() -> None:
+    for table, time_column in TABLES.items():
+        op.add_column(table, sa.Column("fiscal_period_id", sa.Integer(), nullable=True))
+        op.create_foreign_key(
+            op.f(f"fk_{table}_fiscal_period_id_fiscal_periods"),
+            table, "fiscal_periods", ["fiscal_period_id"], ["id"],
+        )
+        # Periods are contiguous: each starts when the previous one ended. A
+        # row at the close instant belongs to the closing period, as in the
+        # stats frozen by 011 (created_at <= ended_at)
+        op.execute(
+            f"""
+            WITH p AS (
+                SELECT id, started_at, ended_at,
+                       lag(ended_at) OVER (ORDER BY started_at) AS previous_ended_at
+                FROM fiscal_periods
+            )
+            UPDATE {table} SET fiscal_period_id = p.id
+            FROM p
+            WHERE {table}.{time_column} >= p.started_at
+              AND (p.previous_ended_at IS NULL OR {table}.{time_column} > p.previous_ended_at)
+              AND (p.ended_at IS NULL OR {table}.{time_column} <= p.ended_at)
+            """
+        )
+
+    op.create_index("ix_transactions_fiscal_period_id_status", "transactions", ["fiscal_period_id", "status"])
+    op.create_index(
+        "ix_slot_machine_spins_fiscal_period_id_user_id", "slot_machine_spins", ["fiscal_period_id", "user_id"]
+    )
+    op.create_index("ix_reward_grants_fiscal_period_id", "reward_grants", ["fiscal_period_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reward_grants_fiscal_period_id", table_name="reward_grants")
+    op.drop_index("ix_slot_machine_spins_fiscal_period_id_user_id", table_name="slot_machine_spins")
+    op.drop_index("ix_transactions_fiscal_period_id_status", table_name="transactions")
+    for table in TABLES:
+        op.drop_constraint(op.f(f"fk_{table}_fiscal_period_id_fiscal_periods"), table, type_="foreignkey")
+        op.drop_column(table, "fiscal_period_id")
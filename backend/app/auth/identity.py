@@ -0,0 +1,37 @@
+from dataclasses import dataclass
+
+from app.cache import LRUCache
+from app.config import settings
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class UserIdentity:
+    """Cached snapshot of the user fields needed to authenticate a request."""
+
+    id: int
+    telegram_id: int
+    is_active: bool
+    is_admin: bool
+    first_name: str
+    last_name: str | None
+    username: str | None
+    token_generation: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserIdentity":
+        return cls(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            is_active=user.is_active,
+            is_admin=user.is_admin,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            username=user.username,
+            token_generation=user.token_generation,
+        )
+
+
+# telegram_id -> UserIdentity. Role handlers invalidate entries explicitly;
+# the TTL bounds staleness for changes made on other workers.
+user_identities = LRUCache(settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
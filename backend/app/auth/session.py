@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class SessionUser:
+    """Authorization claims carried by a session token."""
+
+    id: int
+    is_active: bool
+    is_admin: bool
+
+
+class _GenerationRegistry:
+    """Per-worker view of users' token generations.
+
+    A generation is trusted for SESSION_GENERATION_CHECK_SECONDS before it is
+    re-read from the database, which bounds how long a token revoked on
+    another worker can still be used.
+    """
+
+    def __init__(self):
+        self._known: dict[int, tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> int | None:
+        with self._lock:
+            entry = self._known.get(user_id)
+        if entry is None:
+            return None
+        generation, checked_at = entry
+        if time.monotonic() - checked_at > settings.SESSION_GENERATION_CHECK_SECONDS:
+            return None
+        return generation
+
+    def set(self, user_id: int, generation: int) -> None:
+        with self._lock:
+            self._known[user_id] = (generation, time.monotonic())
+
+    def forget(self, user_id: int) -> None:
+        with self._lock:
+            self._known.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._known.clear()
+
+
+session_generations = _GenerationRegistry()
+
+
+@lru_cache(maxsize=4)
+def _signing_key(secret: str, bot_token: str) -> bytes:
+    if secret:
+        return secret.encode()
+    return hmac.new(b"SessionToken", bot_token.encode(), hashlib.sha256).digest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    key = _signing_key(settings.SESSION_SECRET, settings.BOT_TOKEN)
+    return _b64encode(hmac.new(key, payload.encode(), hashlib.sha256).digest())
+
+
+def create_session_token(user: User) -> tuple[str, int]:
+    """Create a signed session token for the user; returns (token, expires_at)."""
+    expires_at = int(time.time()) + settings.SESSION_TOKEN_TTL_SECONDS
+    claims = {
+        "u": user.id,
+        "a": int(user.is_active),
+        "d": int(user.is_admin),
+        "g": user.token_generation,
+        "e": expires_at,
+    }
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    session_generations.set(user.id, user.token_generation)
+    return f"{payload}.{_sign(payload)}", expires_at
+
+
+def _verified_claims(token: str) -> dict:
+    payload, _, signature = token.partition(".")
+    if not payload or not signature:
+        raise ValueError("Malformed session token")
+    if not hmac.compare_digest(_sign(payload), signature):
+        raise ValueError("Invalid session token")
+
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        raise ValueError("Malformed session token")
+
+    if time.time() > claims["e"]:
+        raise ValueError("Session token expired")
+    return claims
+
+
+def _session_user(claims: dict, generation: int | None) -> SessionUser:
+    if generation is None or generation != claims["g"]:
+        raise ValueError("Session revoked")
+    return SessionUser(id=claims["u"], is_active=bool(claims["a"]), is_admin=bool(claims["d"]))
+
+
+def decode_session_token(token: str, db: Session) -> SessionUser:
+    """Verify a session token and return its claims.
+
+    The database is only consulted when this worker has no fresh view of the
+    user's token generation.
+    """
+    claims = _verified_claims(token)
+    generation = session_generations.get(claims["u"])
+    if generation is None:
+        generation = db.query(User.token_generation).filter(User.id == claims["u"]).scalar()
+        if generation is not None:
+            session_generations.set(claims["u"], generation)
+    return _session_user(claims, generation)
+
+
+async def decode_session_token_async(token: str, db: AsyncSession) -> SessionUser:
+    """Async variant of `decode_session_token`."""
+    claims = _verified_claims(token)
+    generation = session_generations.get(claims["u"])
+    if generation is None:
+        generation = await db.scalar(
+            select(User.token_generation).where(User.id == claims["u"])
+        )
+        if generation is not None:
+            session_generations.set(claims["u"], generation)
+    return _session_user(claims, generation)
+
+
+def revoke_sessions(user: User) -> None:
+    """Invalidate all outstanding session tokens of the user.
+
+    Takes effect when the caller commits the session.
+    """
+    user.token_generation += 1
+    session_generations.forget(user.id)
@@ -2,21 +2,49 @@ import hashlib
 import hmac
 import json
 import time
+from dataclasses import replace
+from functools import lru_cache
 from urllib.parse import parse_qs, unquote
 
 from fastapi import Depends, Header, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.auth.identity import UserIdentity, user_identities
+from app.auth.session import SessionUser, decode_session_token, decode_session_token_async
+from app.cache import LRUCache
 from app.config import settings
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
+from app.services.profile_sync import profile_changes, queue_profile_update
 
 # Init data is valid for 1 hour
 INIT_DATA_EXPIRY_SECONDS = 3600
 
 
-def validate_init_data(init_data_raw: str, bot_token: str) -> dict:
-    """Validate Telegram Mini App init data and return parsed data."""
+@lru_cache(maxsize=4)
+def _derive_secret_key(bot_token: str) -> bytes:
+    """Derive the WebAppData secret key once per bot token."""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+# Verified init data keyed by the received hash; entries expire at
+# auth_date + INIT_DATA_EXPIRY_SECONDS, so a cached entry is never accepted
+# after the raw init data itself would have been rejected.
+init_data_cache = LRUCache(settings.INIT_DATA_CACHE_SIZE)
+
+
+def _extract_hash(init_data_raw: str) -> str | None:
+    """Pull the hash field out of raw init data without a full parse."""
+    for pair in init_data_raw.split("&"):
+        if pair.startswith("hash="):
+            return pair[5:]
+    return None
+
+
+def _parse_and_verify(init_data_raw: str, bot_token: str) -> tuple[dict, float | None]:
+    """Verify init data and return the Telegram user and its auth_date."""
     parsed = parse_qs(init_data_raw, keep_blank_values=True)
 
     # Extract hash
@@ -34,7 +62,7 @@ def validate_init_data(init_data_raw: str, bot_token: str) -> dict:
     data_check_string = "\n".join(data_pairs)
 
     # Compute HMAC-SHA256
-    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    secret_key = _derive_secret_key(bot_token)
     computed_hash = hmac.new(
         secret_key, data_check_string.encode(), hashlib.sha256
     ).hexdigest()
@@ -43,6 +71,7 @@ def validate_init_data(init_data_raw: str, bot_token: str) -> dict:
         raise ValueError("Invalid hash")
 
     # Check expiry
+    auth_date = None
     auth_date_str = parsed.get("auth_date", [None])[0]
     if auth_date_str:
         auth_date = int(auth_date_str)
@@ -54,93 +83,285 @@ def validate_init_data(init_data_raw: str, bot_token: str) -> dict:
     if not user_data_str:
         raise ValueError("Missing user data")
 
-    return json.loads(unquote(user_data_str))
+    return json.loads(unquote(user_data_str)), auth_date
+
+
+def validate_init_data(init_data_raw: str, bot_token: str) -> dict:
+    """Validate Telegram Mini App init data and return parsed data."""
+    tg_user, _auth_date = _parse_and_verify(init_data_raw, bot_token)
+    return tg_user
+
+
+def validate_init_data_cached(init_data_raw: str, bot_token: str) -> dict:
+    """Validate init data, reusing a previous verification when possible."""
+    received_hash = _extract_hash(init_data_raw)
+    if received_hash:
+        cached = init_data_cache.get(
+            received_hash, valid=lambda entry: entry[:2] == (init_data_raw, bot_token)
+        )
+        if cached is not None:
+            return cached[2]
+
+    tg_user, auth_date = _parse_and_verify(init_data_raw, bot_token)
+
+    if received_hash:
+        # Without auth_date the data never expires; still bound its cache lifetime
+        issued_at = auth_date if auth_date is not None else time.time()
+        init_data_cache.put(
+            received_hash,
+            (init_data_raw, bot_token, tg_user),
+            expires_at=issued_at + INIT_DATA_EXPIRY_SECONDS,
+        )
+    return tg_user
+
+
+DEV_TELEGRAM_ID = 999999999
+
+
+def _new_dev_user() -> User:
+    return User(
+        telegram_id=DEV_TELEGRAM_ID,
+        first_name="Dev",
+        last_name="User",
+        username="devuser",
+        is_admin=True,
+    )
 
 
 def _get_or_create_dev_user(db: Session) -> User:
     """Return a fake dev user, creating one if needed."""
-    dev_telegram_id = 999999999
-    user = db.query(User).filter(User.telegram_id == dev_telegram_id).first()
+    user = db.query(User).filter(User.telegram_id == DEV_TELEGRAM_ID).first()
     if user is None:
-        user = User(
-            telegram_id=dev_telegram_id,
-            first_name="Dev",
-            last_name="User",
-            username="devuser",
-            is_admin=True,
-        )
+        user = _new_dev_user()
         db.add(user)
         db.commit()
         db.refresh(user)
     return user
 
 
-def get_current_user(
-    authorization: str | None = Header(None),
-    db: Session = Depends(get_db),
-) -> User:
-    """Validate Telegram init data and return/create the user."""
-    if settings.DEV_MODE:
-        return _get_or_create_dev_user(db)
+async def _get_or_create_dev_user_async(db: AsyncSession) -> User:
+    user = await db.scalar(select(User).where(User.telegram_id == DEV_TELEGRAM_ID))
+    if user is None:
+        user = _new_dev_user()
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+    return user
+
 
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+def _telegram_user_from_header(authorization: str | None) -> dict:
+    """Validate the `tma` Authorization header and return the Telegram user."""
     if not authorization or not authorization.startswith("tma "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing or invalid Authorization header",
-        )
+        raise _unauthorized("Missing or invalid Authorization header")
 
     init_data_raw = authorization[4:]
 
     try:
-        tg_user = validate_init_data(init_data_raw, settings.BOT_TOKEN)
+        return validate_init_data_cached(init_data_raw, settings.BOT_TOKEN)
     except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=str(e),
-        )
+        raise _unauthorized(str(e))
 
-    telegram_id = tg_user["id"]
 
-    user = db.query(User).filter(User.telegram_id == telegram_id).first()
+def _cached_identity(tg_user: dict) -> UserIdentity | None:
+    """Return the cached identity unless its profile must be written now."""
+    identity = user_identities.get(tg_user["id"])
+    if identity is None:
+        return None
+    changes = profile_changes(identity, tg_user)
+    if not changes:
+        return identity
+    if settings.PROFILE_SYNC_MODE == "batched":
+        queue_profile_update(identity.id, changes)
+        identity = replace(identity, **changes)
+        user_identities.put(identity.telegram_id, identity)
+        return identity
+    return None
+
+
+def _new_pending_user(tg_user: dict) -> User:
+    return User(
+        telegram_id=tg_user["id"],
+        first_name=tg_user.get("first_name", "Unknown"),
+        last_name=tg_user.get("last_name"),
+        username=tg_user.get("username"),
+        is_active=False,
+    )
+
+
+def _sync_profile(user: User, tg_user: dict) -> bool:
+    """Sync the Telegram profile onto the user and cache its identity.
+
+    Returns True if the caller must commit the changed row.
+    """
+    changes = profile_changes(user, tg_user)
+    user_identities.put(user.telegram_id, replace(UserIdentity.from_user(user), **changes))
+    if not changes:
+        return False
+    if settings.PROFILE_SYNC_MODE == "batched":
+        queue_profile_update(user.id, changes)
+        return False
+    for field, value in changes.items():
+        setattr(user, field, value)
+    return True
+
+
+def get_current_user(
+    authorization: str | None = Header(None),
+    db: Session = Depends(get_db),
+) -> User | UserIdentity:
+    """Validate Telegram init data and return/create the user.
+
+    Known users are served from the identity cache without a query; callers
+    that need the full row must go through `load_user`.
+    """
+    if settings.DEV_MODE:
+        return _get_or_create_dev_user(db)
+
+    tg_user = _telegram_user_from_header(authorization)
+
+    identity = _cached_identity(tg_user)
+    if identity is not None:
+        return identity
+
+    user = db.query(User).filter(User.telegram_id == tg_user["id"]).first()
     if user is None:
         # Auto-create as pending (inactive) user
-        user = User(
-            telegram_id=telegram_id,
-            first_name=tg_user.get("first_name", "Unknown"),
-            last_name=tg_user.get("last_name"),
-            username=tg_user.get("username"),
-            is_active=False,
-        )
+        user = _new_pending_user(tg_user)
         db.add(user)
         db.commit()
         db.refresh(user)
+        user_identities.put(user.telegram_id, UserIdentity.from_user(user))
         return user
 
-    # Update profile info from Telegram
-    user.first_name = tg_user.get("first_name", user.first_name)
-    user.last_name = tg_user.get("last_name", user.last_name)
-    user.username = tg_user.get("username", user.username)
-    db.commit()
-    db.refresh(user)
+    # Sync profile info from Telegram, writing only when something changed
+    if _sync_profile(user, tg_user):
+        db.commit()
+        db.refresh(user)
 
     return user
 
 
-def require_active_user(user: User = Depends(get_current_user)) -> User:
-    """Dependency that requires the current user to be active (approved)."""
+async def get_current_user_async(
+    authorization: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+) -> User | UserIdentity:
+    """Async variant of `get_current_user`."""
+    if settings.DEV_MODE:
+        return await _get_or_create_dev_user_async(db)
+
+    tg_user = _telegram_user_from_header(authorization)
+
+    identity = _cached_identity(tg_user)
+    if identity is not None:
+        return identity
+
+    user = await db.scalar(select(User).where(User.telegram_id == tg_user["id"]))
+    if user is None:
+        user = _new_pending_user(tg_user)
+        db.add(user)
+        await db.commit()
+        await db.refresh(user)
+        user_identities.put(user.telegram_id, UserIdentity.from_user(user))
+        return user
+
+    if _sync_profile(user, tg_user):
+        await db.commit()
+        await db.refresh(user)
+
+    return user
+
+
+def get_current_principal(
+    authorization: str | None = Header(None),
+    db: Session = Depends(get_db),
+) -> User | UserIdentity | SessionUser:
+    """Authenticate with a session token if given, else with Telegram init data.
+
+    Neither path necessarily loads the user row, so consumers that need the
+    full row must go through `load_user`.
+    """
+    if authorization and authorization.startswith("Bearer "):
+        try:
+            return decode_session_token(authorization[7:], db)
+        except ValueError as e:
+            raise _unauthorized(str(e))
+    return get_current_user(authorization, db)
+
+
+async def get_current_principal_async(
+    authorization: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+) -> User | UserIdentity | SessionUser:
+    """Async variant of `get_current_principal`."""
+    if authorization and authorization.startswith("Bearer "):
+        try:
+            return await decode_session_token_async(authorization[7:], db)
+        except ValueError as e:
+            raise _unauthorized(str(e))
+    return await get_current_user_async(authorization, db)
+
+
+def load_user(db: Session, principal: User | UserIdentity | SessionUser) -> User:
+    """Return the full user row for an authenticated principal."""
+    if isinstance(principal, User):
+        return principal
+    user = db.get(User, principal.id)
+    if user is None:
+        raise _unauthorized("User not found")
+    return user
+
+
+async def load_user_async(
+    db: AsyncSession, principal: User | UserIdentity | SessionUser
+) -> User:
+    """Async variant of `load_user`."""
+    if isinstance(principal, User):
+        return principal
+    user = await db.get(User, principal.id)
+    if user is None:
+        raise _unauthorized("User not found")
+    return user
+
+
+def _check_active(user: User | UserIdentity | SessionUser) -> None:
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Your account is pending approval.",
         )
-    return user
 
 
-def require_admin(user: User = Depends(require_active_user)) -> User:
-    """Dependency that requires the current user to be an admin."""
+def _check_admin(user: User | UserIdentity | SessionUser) -> None:
     if not user.is_admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required",
         )
+
+
+def require_active_user(
+    user: User | UserIdentity | SessionUser = Depends(get_current_principal),
+) -> User | UserIdentity | SessionUser:
+    """Dependency that requires the current user to be active (approved)."""
+    _check_active(user)
+    return user
+
+
+def require_admin(
+    user: User | UserIdentity | SessionUser = Depends(require_active_user),
+) -> User | UserIdentity | SessionUser:
+    """Dependency that requires the current user to be an admin."""
+    _check_admin(user)
+    return user
+
+
+async def require_active_user_async(
+    user: User | UserIdentity | SessionUser = Depends(get_current_principal_async),
+) -> User | UserIdentity | SessionUser:
+    """Async variant of `require_active_user`."""
+    _check_active(user)
     return user
@@ -5,10 +5,45 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     BOT_TOKEN: str = ""
     DATABASE_URL: str = "postgresql://piikki:piikki@db:5432/piikki"
+    DATABASE_READ_URL: str = ""
+    READ_AFTER_WRITE_SECONDS: int = 5
+    ASYNC_DB: bool = False
+    ASYNC_DATABASE_URL: str = ""
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_LIVENESS: str = "pre_ping"  # "pre_ping", "idle" or "none"
+    DB_POOL_IDLE_PING_SECONDS: float = 30.0
+    SQL_DEBUG: bool = False
+    SLOW_QUERY_MS: float = 200.0
+    N_PLUS_ONE_THRESHOLD: int = 5
     ADMIN_TELEGRAM_IDS: str = ""
     AUTO_APPROVE_PURCHASES: bool = True
     CORS_ORIGINS: str = "*"
+    COUNT_ESTIMATE_THRESHOLD: int = 10000
     DEV_MODE: bool = False
+    EXPORT_YIELD_PER: int = 1000
+    IDEMPOTENCY_KEY_TTL_HOURS: int = 24
+    IDEMPOTENCY_CACHE_SIZE: int = 1024
+    INIT_DATA_CACHE_SIZE: int = 4096
+    LEDGER_SNAPSHOT_INTERVAL_MINUTES: int = 60
+    LEDGER_SNAPSHOT_LAG_SECONDS: int = 60
+    PAGE_SIZE_DEFAULT: int = 100
+    PAGE_SIZE_MAX: int = 500
+    PARTITION_MONTHS_AHEAD: int = 3
+    PURCHASE_GROUP_COMMIT: bool = False
+    PURCHASE_BATCH_WINDOW_MS: float = 5.0
+    PURCHASE_BATCH_MAX_SIZE: int = 100
+    PURCHASE_BATCH_WRITE_TIMEOUT_SECONDS: float = 5.0
+    PROFILE_SYNC_MODE: str = "changed"  # "changed" or "batched"
+    PROFILE_SYNC_BATCH_SIZE: int = 100
+    PROFILE_SYNC_FLUSH_SECONDS: int = 30
+    SESSION_SECRET: str = ""
+    SESSION_TOKEN_TTL_SECONDS: int = 900
+    SESSION_GENERATION_CHECK_SECONDS: int = 30
+    USER_CACHE_SIZE: int = 2048
+    USER_CACHE_TTL_SECONDS: int = 60
 
     model_config = {"env_file": ".env", "secrets_dir": "/run/secrets"}
 
@@ -19,6 +54,17 @@ class Settings(BaseSettings):
             return []
         return [int(x.strip()) for x in self.ADMIN_TELEGRAM_IDS.split(",") if x.strip()]
 
+    @computed_field
+    @property
+    def async_database_url(self) -> str:
+        if self.ASYNC_DATABASE_URL:
+            return self.ASYNC_DATABASE_URL
+        if self.DATABASE_URL.startswith("postgresql://"):
+            return "postgresql+asyncpg://" + self.DATABASE_URL.removeprefix("postgresql://")
+        if self.DATABASE_URL.startswith("sqlite://"):
+            return "sqlite+aiosqlite://" + self.DATABASE_URL.removeprefix("sqlite://")
+        return self.DATABASE_URL
+
     @computed_field
     @property
     def cors_origins_list(self) -> list[str]:
@@ -1,7 +1,14 @@
+import time
+
+from fastapi import Request
 from sqlalchemy import MetaData, create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
 
 from app.config import settings
+from app.pool_metrics import PoolMetrics, install_idle_ping, instrumented_pool_class
+from app.sql_metrics import instrument_engine
 
 naming_convention = {
     "ix": "ix_%(table_name)s_%(column_0_name)s",
@@ -11,13 +18,63 @@ naming_convention = {
     "pk": "pk_%(table_name)s",
 }
 
+
+def _pool_options(base_pool: type[Pool], metrics: PoolMetrics) -> dict:
+    return {
+        "poolclass": instrumented_pool_class(base_pool, metrics),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_LIVENESS == "pre_ping",
+    }
+
+
+def _instrument(engine, metrics: PoolMetrics) -> None:
+    if settings.DB_POOL_LIVENESS == "idle":
+        install_idle_ping(engine, metrics, settings.DB_POOL_IDLE_PING_SECONDS)
+    instrument_engine(engine)
+
+
+pool_metrics = PoolMetrics()
 engine = create_engine(
     settings.DATABASE_URL,
-    pool_pre_ping=True,
+    **_pool_options(QueuePool, pool_metrics),
 )
+_instrument(engine, pool_metrics)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional streaming replica for read-heavy endpoints, see `get_read_db`
+read_pool_metrics = PoolMetrics()
+read_engine = None
+ReadSessionLocal = SessionLocal
+if settings.DATABASE_READ_URL:
+    read_engine = create_engine(
+        settings.DATABASE_READ_URL,
+        **_pool_options(QueuePool, read_pool_metrics),
+    )
+    _instrument(read_engine, read_pool_metrics)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Set on responses to writes; clients echo it back so their next reads stay
+# on the primary until the replica has caught up with their own writes
+READ_PRIMARY_HEADER = "X-Read-Primary-Until"
+
+# The async stack is only built when ASYNC_DB is enabled
+async_pool_metrics = PoolMetrics()
+async_engine = None
+AsyncSessionLocal = None
+if settings.ASYNC_DB:
+    async_engine = create_async_engine(
+        settings.async_database_url,
+        **_pool_options(AsyncAdaptedQueuePool, async_pool_metrics),
+    )
+    _instrument(async_engine, async_pool_metrics)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False
+    )
+
 
 class Base(DeclarativeBase):
     metadata = MetaData(naming_convention=naming_convention)
@@ -29,3 +86,21 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: the replica, unless the client wrote recently."""
+    factory = ReadSessionLocal
+    primary_until = request.headers.get(READ_PRIMARY_HEADER)
+    if primary_until and primary_until.isdigit() and time.time() < int(primary_until):
+        factory = SessionLocal
+    db = factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
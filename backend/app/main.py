@@ -1,12 +1,16 @@
+import time
 from contextlib import asynccontextmanager
 
 from alembic import command
 from alembic.config import Config
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.routers import fiscal, messages, products, rewards, slot_machine, transactions, users
+from app.database import READ_PRIMARY_HEADER
+from app.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_ESTIMATED_HEADER, TOTAL_COUNT_HEADER
+from app.sql_metrics import capture_queries, report_request
+from app.routers import auth, exports, fiscal, messages, metrics, products, rewards, slot_machine, transactions, users
 
 
 def run_migrations():
@@ -29,6 +33,13 @@ async def lifespan(app: FastAPI):
     # Stop scheduler on shutdown
     stop_scheduler()
 
+    from app.services.purchases import purchase_batcher
+    purchase_batcher.stop()
+
+    from app.database import async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 app = FastAPI(title="SkiltaPiikki", lifespan=lifespan)
 
@@ -38,8 +49,44 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        READ_PRIMARY_HEADER,
+        NEXT_CURSOR_HEADER,
+        TOTAL_COUNT_HEADER,
+        TOTAL_COUNT_ESTIMATED_HEADER,
+        "X-DB-Queries",
+        "X-DB-Time",
+        "X-DB-N-Plus-One",
+    ],
 )
 
+
+@app.middleware("http")
+async def stick_to_primary_after_write(request: Request, call_next):
+    response = await call_next(request)
+    if (
+        settings.DATABASE_READ_URL
+        and request.method not in ("GET", "HEAD", "OPTIONS")
+        and response.status_code < 400
+    ):
+        response.headers[READ_PRIMARY_HEADER] = str(int(time.time()) + settings.READ_AFTER_WRITE_SECONDS)
+    return response
+
+
+@app.middleware("http")
+async def sql_instrumentation(request: Request, call_next):
+    with capture_queries() as stats:
+        response = await call_next(request)
+    response.headers.update(report_request(stats, request.method, request.url.path))
+    return response
+
+
+# Async hot-path handlers must be registered first to shadow their sync twins
+if settings.ASYNC_DB:
+    from app.routers import async_routes
+    app.include_router(async_routes.router, prefix="/api")
+
+app.include_router(auth.router, prefix="/api")
 app.include_router(users.router, prefix="/api")
 app.include_router(products.router, prefix="/api")
 app.include_router(transactions.router, prefix="/api")
@@ -47,3 +94,5 @@ app.include_router(fiscal.router, prefix="/api")
 app.include_router(messages.router, prefix="/api")
 app.include_router(rewards.router, prefix="/api")
 app.include_router(slot_machine.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(exports.router, prefix="/api")
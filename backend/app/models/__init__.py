@@ -1,6 +1,10 @@
 from app.models.app_setting import AppSetting
+from app.models.balance_snapshot import BalanceSnapshot
 from app.models.fiscal_debt import FiscalDebt
 from app.models.fiscal_period import FiscalPeriod
+from app.models.fiscal_period_rollup import FiscalPeriodRollup
+from app.models.idempotency_key import IdempotencyKey
+from app.models.ledger_entry import LedgerEntry
 from app.models.message_template import MessageTemplate
 from app.models.product import Product
 from app.models.reward import Reward
@@ -11,8 +15,12 @@ from app.models.user import User
 
 __all__ = [
     "AppSetting",
+    "BalanceSnapshot",
     "FiscalDebt",
     "FiscalPeriod",
+    "FiscalPeriodRollup",
+    "IdempotencyKey",
+    "LedgerEntry",
     "MessageTemplate",
     "Product",
     "Reward",
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class BalanceSnapshot(Base):
+    """A user's balance including every ledger entry created up to `taken_at`."""
+
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (
+        Index("ix_balance_snapshots_user_id_taken_at", "user_id", "taken_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="RESTRICT"), nullable=False
+    )
+    balance: Mapped[float] = mapped_column(Float, nullable=False)
+    taken_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import CheckConstraint, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import CheckConstraint, DateTime, Float, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -15,6 +15,13 @@ class FiscalDebt(Base):
             "status IN ('unpaid', 'payment_pending', 'paid')",
             name="ck_fiscal_debt_status",
         ),
+        Index("ix_fiscal_debts_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_fiscal_debts_fiscal_period_id_amount", "fiscal_period_id", "amount"),
+        # Debt totals of /me and /my/debts only look at debts still owed
+        Index(
+            "ix_fiscal_debts_user_id_outstanding", "user_id", "created_at",
+            postgresql_where=text("status IN ('unpaid', 'payment_pending')"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, Integer
+from sqlalchemy import DateTime, Integer, select
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
@@ -19,3 +19,19 @@ class FiscalPeriod(Base):
     )
 
     debts: Mapped[list["FiscalDebt"]] = relationship(back_populates="fiscal_period")  # noqa: F821
+
+
+def open_period_id():
+    """INSERT default of the fiscal_period_id columns: the open period, read
+    by the INSERT itself so a batch of rows needs no separate query.
+
+    FOR SHARE orders the stamp against a close: the close waits for writers
+    that stamped the period, and writers arriving meanwhile wait for the
+    close and then see the new period, see close_fiscal_period.
+    """
+    return (
+        select(FiscalPeriod.id)
+        .where(FiscalPeriod.ended_at.is_(None))
+        .with_for_update(read=True)
+        .scalar_subquery()
+    )
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class FiscalPeriodRollup(Base):
+    """Statistics of a closed fiscal period, frozen when it was closed.
+
+    Afterwards `debt_collected` grows as the period's debts are paid, and the
+    transaction totals as its pending transactions are approved.
+    """
+
+    __tablename__ = "fiscal_period_stats"
+
+    fiscal_period_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("fiscal_periods.id"), primary_key=True
+    )
+    total_purchases: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_purchase_amount: Mapped[float] = mapped_column(Float, nullable=False)
+    total_payments: Mapped[int] = mapped_column(Integer, nullable=False)
+    total_payment_amount: Mapped[float] = mapped_column(Float, nullable=False)
+    total_debt: Mapped[float] = mapped_column(Float, nullable=False)
+    debt_collected: Mapped[float] = mapped_column(Float, nullable=False)
+    computed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
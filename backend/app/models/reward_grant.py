@@ -1,11 +1,17 @@
 from datetime import datetime, timezone
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
+from app.models.fiscal_period import open_period_id
 
 
 class RewardGrant(Base):
     __tablename__ = "reward_grants"
+    __table_args__ = (
+        Index("ix_reward_grants_user_id_granted_at_id", "user_id", "granted_at", "id"),
+        Index("ix_reward_grants_granted_at_id", "granted_at", "id"),
+        Index("ix_reward_grants_fiscal_period_id", "fiscal_period_id"),
+    )
 
     # Primary key
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -13,6 +19,10 @@ class RewardGrant(Base):
     # References
     reward_id: Mapped[int] = mapped_column(Integer, ForeignKey("rewards.id"), nullable=False)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    # Open period at insert time
+    fiscal_period_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("fiscal_periods.id"), nullable=True, default=open_period_id()
+    )
 
     # Grant details (denormalized for history)
     reward_name: Mapped[str] = mapped_column(String, nullable=False)
@@ -1,20 +1,31 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import DateTime, Float, Integer, ForeignKey, String
+from sqlalchemy import DateTime, Float, Index, Integer, ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
+from app.models.fiscal_period import open_period_id
 from app.models.user import User
 
 
 class SlotMachineSpin(Base):
+    # Range-partitioned by month on Postgres, see app.services.partitions
     __tablename__ = "slot_machine_spins"
+    __table_args__ = (
+        Index("ix_slot_machine_spins_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Period statistics, grouped by user for the top winners
+        Index("ix_slot_machine_spins_fiscal_period_id_user_id", "fiscal_period_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     bet_amount: Mapped[float] = mapped_column(Float, nullable=False)
     win_amount: Mapped[float] = mapped_column(Float, nullable=False)
     symbols: Mapped[str] = mapped_column(String, nullable=False)  # JSON string of symbols
+    # Open period at insert time
+    fiscal_period_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("fiscal_periods.id"), nullable=True, default=open_period_id()
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, default=lambda: datetime.now(timezone.utc)
     )
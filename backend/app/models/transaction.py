@@ -1,14 +1,16 @@
 from datetime import datetime, timezone
 
-from sqlalchemy import CheckConstraint, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import DDL, CheckConstraint, DateTime, Float, ForeignKey, Index, Integer, String, event, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database import Base
+from app.models.fiscal_period import open_period_id
 from app.models.product import Product
 from app.models.user import User
 
 
 class Transaction(Base):
+    # Range-partitioned by month on Postgres, see app.services.partitions
     __tablename__ = "transactions"
     __table_args__ = (
         CheckConstraint("type IN ('purchase', 'payment')", name="ck_transaction_type"),
@@ -16,6 +18,23 @@ class Transaction(Base):
             "status IN ('pending', 'approved', 'rejected')",
             name="ck_transaction_status",
         ),
+        # Keyset pagination of /transactions/mine and /transactions/pending
+        Index("ix_transactions_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_transactions_status_created_at_id", "status", "created_at", "id"),
+        # The admin queue only ever reads the few pending rows
+        Index(
+            "ix_transactions_pending_created_at_id", "created_at", "id",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # /transactions/search: date ranges, product filter and note substrings
+        Index("ix_transactions_created_at_id", "created_at", "id"),
+        Index("ix_transactions_product_id_created_at_id", "product_id", "created_at", "id"),
+        # Period statistics
+        Index("ix_transactions_fiscal_period_id_status", "fiscal_period_id", "status"),
+        Index(
+            "ix_transactions_note_trgm", "note",
+            postgresql_using="gin", postgresql_ops={"note": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -32,6 +51,10 @@ class Transaction(Base):
     created_by_id: Mapped[int | None] = mapped_column(
         Integer, ForeignKey("users.id"), nullable=True
     )
+    # Open period at insert time
+    fiscal_period_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("fiscal_periods.id"), nullable=True, default=open_period_id()
+    )
     quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
     note: Mapped[str | None] = mapped_column(String, nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -48,3 +71,10 @@ class Transaction(Base):
     product: Mapped[Product | None] = relationship()
     approved_by: Mapped[User | None] = relationship(foreign_keys=[approved_by_id])
     created_by: Mapped[User | None] = relationship(foreign_keys=[created_by_id])
+
+
+event.listen(
+    Transaction.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
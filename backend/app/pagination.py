@@ -0,0 +1,158 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+A page is ordered by a unique sort key, e.g. `(created_at DESC, id DESC)`.
+The cursor is an opaque encoding of the last row's key values, and the
+next page continues strictly after it. With an index on the same columns
+every page is an index range scan, however deep the client pages.
+
+List endpoints keep returning plain JSON arrays; the cursor of the next
+page is sent in the X-Next-Cursor response header, absent on the last page.
+Endpoints that report a total send it in X-Total-Count.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, and_, func, literal, or_, select, tuple_
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_ESTIMATED_HEADER = "X-Total-Count-Estimated"
+
+
+@dataclass(frozen=True)
+class SortKey:
+    column: Any  # mapped attribute or labelled column
+    descending: bool = False
+
+    @property
+    def name(self) -> str:
+        return self.column.key
+
+
+def desc(column) -> SortKey:
+    return SortKey(column, descending=True)
+
+
+def asc(column) -> SortKey:
+    return SortKey(column)
+
+
+@dataclass(frozen=True)
+class PageParams:
+    cursor: str | None
+    limit: int
+
+
+def page_params(default_limit: int = settings.PAGE_SIZE_DEFAULT):
+    """Dependency factory reading `?cursor=` and `?limit=`."""
+
+    def dependency(
+        cursor: str | None = Query(None),
+        limit: int = Query(default_limit, ge=1, le=settings.PAGE_SIZE_MAX),
+    ) -> PageParams:
+        return PageParams(cursor=cursor, limit=limit)
+
+    return dependency
+
+
+def _encode_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def encode_cursor(keys: list[SortKey], row) -> str:
+    values = [_encode_value(getattr(row, key.name)) for key in keys]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def _decode_value(key: SortKey, value):
+    if value is None:
+        return None
+    if isinstance(key.column.type, DateTime):
+        return datetime.fromisoformat(value)
+    python_type = key.column.type.python_type
+    if python_type is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, python_type):
+        raise ValueError(f"{key.name} is not a {python_type.__name__}")
+    return value
+
+
+def decode_cursor(keys: list[SortKey], cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [_decode_value(key, value) for key, value in zip(keys, values)]
+    except (ValueError, TypeError):
+        # TypeError: a well-formed cursor with e.g. a number where a timestamp belongs
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(keys: list[SortKey], values: list) -> ColumnElement:
+    """Rows strictly after `values` in the order of `keys`."""
+    values = [literal(value, key.column.type) for key, value in zip(keys, values)]
+    if all(key.descending == keys[0].descending for key in keys):
+        # Row-value comparison, which the planner turns into one index range
+        columns = tuple_(*(key.column for key in keys))
+        bound = tuple_(*values)
+        return columns < bound if keys[0].descending else columns > bound
+    clauses = []
+    for i, key in enumerate(keys):
+        step = key.column < values[i] if key.descending else key.column > values[i]
+        clauses.append(and_(*(keys[j].column == values[j] for j in range(i)), step))
+    return or_(*clauses)
+
+
+def keyset(query, keys: list[SortKey], page: PageParams):
+    """Order, filter and limit a Query or Select to the requested page.
+
+    Fetches one row more than the page size to know whether a next page exists.
+    """
+    if page.cursor:
+        query = query.filter(_after(keys, decode_cursor(keys, page.cursor)))
+    order = [key.column.desc() if key.descending else key.column.asc() for key in keys]
+    return query.order_by(*order).limit(page.limit + 1)
+
+
+def page_rows(rows: list, keys: list[SortKey], page: PageParams, response: Response) -> list:
+    """Trim the extra row fetched by `keyset` and set the next-page cursor."""
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(keys, rows[-1])
+    return rows
+
+
+def _planner_rows(db: Session, stmt) -> int:
+    compiled = stmt.compile(bind=db.get_bind(), compile_kwargs={"render_postcompile": True})
+    [plan] = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    return int(plan["Plan"]["Plan Rows"])
+
+
+def count_rows(db: Session, stmt) -> tuple[int, bool]:
+    """Number of rows `stmt` returns, and whether it is an estimate.
+
+    On Postgres the planner's estimate is used when it is above
+    COUNT_ESTIMATE_THRESHOLD, since an exact COUNT(*) reads every matching
+    row; smaller results are counted exactly.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        estimate = _planner_rows(db, stmt)
+        if estimate > settings.COUNT_ESTIMATE_THRESHOLD:
+            return estimate, True
+    return db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one(), False
+
+
+def set_total(response: Response, total: int, estimated: bool) -> None:
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    response.headers[TOTAL_COUNT_ESTIMATED_HEADER] = "true" if estimated else "false"
@@ -0,0 +1,123 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """Checkout counters of one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+        self.pings = 0
+        self.ping_seconds = 0.0
+        self.ping_failures = 0
+
+    def record_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_seconds += seconds
+            self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def record_ping(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.pings += 1
+            self.ping_seconds += seconds
+            if not ok:
+                self.ping_failures += 1
+
+    def snapshot(self, pool: Pool) -> dict:
+        with self._lock:
+            checkouts = self.checkouts or 1
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "avg_checkout_ms": self.checkout_seconds / checkouts * 1000,
+                "max_checkout_ms": self.max_checkout_seconds * 1000,
+                "avg_wait_ms": self.wait_seconds / checkouts * 1000,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "timeouts": self.timeouts,
+                "pings": self.pings,
+                "avg_ping_ms": self.ping_seconds / (self.pings or 1) * 1000,
+                "ping_failures": self.ping_failures,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Times checkouts: `connect` covers the whole checkout including any
+    liveness ping, `_do_get` only the wait for a free connection."""
+
+    metrics: PoolMetrics
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.metrics.record_checkout(time.perf_counter() - start)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out)
+
+
+def instrumented_pool_class(base: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """Subclass `base` so that every pool it creates, including pools
+    recreated after a dispose, reports into `metrics`."""
+    return type(f"Instrumented{base.__name__}", (_InstrumentedPoolMixin, base), {"metrics": metrics})
+
+
+def install_idle_ping(engine: Engine, metrics: PoolMetrics, idle_seconds: float) -> None:
+    """Ping connections only when they sat idle in the pool for a while.
+
+    A cheaper alternative to `pool_pre_ping`, which pings on every checkout.
+    A failed ping discards the connection and the pool retries the checkout.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        start = time.perf_counter()
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception:
+            metrics.record_ping(time.perf_counter() - start, ok=False)
+            logger.warning("Discarding dead pooled connection after %.0fs idle", time.monotonic() - checked_in_at)
+            raise exc.DisconnectionError()
+        metrics.record_ping(time.perf_counter() - start, ok=True)
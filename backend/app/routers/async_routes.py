@@ -0,0 +1,153 @@
+"""Async versions of the hot Mini App endpoints.
+
+Only mounted when ASYNC_DB is enabled. The router is included ahead of the
+sync routers, so these handlers take precedence for the same paths while
+everything else keeps running on the thread pool.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.telegram import (
+    get_current_principal_async,
+    load_user_async,
+    require_active_user_async,
+)
+from app.config import settings
+from app.database import get_async_db
+from app.pagination import PageParams, keyset, page_params, page_rows
+from app.models.app_setting import AppSetting
+from app.models.product import Product
+from app.models.user import User
+from app.routers.slot_machine import _blacklisted, _play_spin, _spin_balance_args, _spin_response
+from app.routers.users import _LEADERBOARD_PAGE_KEYS, _me_out
+from app.schemas.product import ProductOut
+from app.schemas.slot_machine import SlotMachineSpinRequest, SlotMachineSpinResponse
+from app.schemas.transaction import PurchaseRequest, TransactionOut
+from app.schemas.user import MeOut, UserOut
+from app.services.balance import apply_delta_async
+from app.services.idempotency import (
+    IdempotentRequest,
+    commit_response_async,
+    get_idempotency_key,
+    replay_response_async,
+)
+from app.services.purchases import new_purchase, purchase_batcher
+
+router = APIRouter()
+
+
+@router.get("/me", response_model=MeOut)
+async def get_me_async(
+    principal: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return _me_out(await load_user_async(db, principal))
+
+
+@router.get("/products", response_model=list[ProductOut])
+async def list_products_async(
+    _user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    result = await db.scalars(
+        select(Product)
+        .where(Product.is_active == True)  # noqa: E712
+        .order_by(Product.sort_order, Product.name)
+    )
+    return result.all()
+
+
+@router.get("/leaderboard", response_model=list[UserOut])
+async def leaderboard_async(
+    response: Response,
+    page: PageParams = Depends(page_params()),
+    _user: User = Depends(get_current_principal_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    query = select(User).where(User.is_active == True)  # noqa: E712
+    result = await db.scalars(keyset(query, _LEADERBOARD_PAGE_KEYS, page))
+    return page_rows(result.all(), _LEADERBOARD_PAGE_KEYS, page, response)
+
+
+@router.post("/transactions/purchase", response_model=TransactionOut)
+async def create_purchase_async(
+    data: PurchaseRequest,
+    principal: User = Depends(require_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: IdempotentRequest | None = Depends(get_idempotency_key),
+):
+    stored = await replay_response_async(db, principal.id, idempotency_key)
+    if stored is not None:
+        return stored
+
+    if settings.PURCHASE_GROUP_COMMIT:
+        await db.close()
+        return await purchase_batcher.result_async(
+            purchase_batcher.submit(principal.id, data.product_id, data.quantity, idempotency_key)
+        )
+
+    product = await db.scalar(
+        select(Product).where(Product.id == data.product_id, Product.is_active == True)  # noqa: E712
+    )
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    user = await load_user_async(db, principal)
+    tx = new_purchase(user.id, product, data.quantity)
+    db.add(tx)
+    await db.flush()
+
+    if tx.status == "approved":
+        await apply_delta_async(db, user.id, tx.amount, "purchase", tx.id)
+
+    out = TransactionOut(
+        id=tx.id,
+        user_id=tx.user_id,
+        product_id=tx.product_id,
+        type=tx.type,
+        amount=tx.amount,
+        status=tx.status,
+        approved_by_id=tx.approved_by_id,
+        created_by_id=tx.created_by_id,
+        created_by_name=user.first_name,
+        quantity=tx.quantity,
+        note=tx.note,
+        created_at=tx.created_at,
+        product_name=product.name,
+        user_name=user.first_name,
+    )
+    return await commit_response_async(db, user.id, idempotency_key, out)
+
+
+@router.post("/slot-machine/spin", response_model=SlotMachineSpinResponse)
+async def spin_slot_machine_async(
+    data: SlotMachineSpinRequest,
+    principal: User = Depends(require_active_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idempotency_key: IdempotentRequest | None = Depends(get_idempotency_key),
+):
+    stored = await replay_response_async(db, principal.id, idempotency_key)
+    if stored is not None:
+        return stored
+
+    enabled = await db.scalar(
+        select(AppSetting.value).where(AppSetting.key == "slot_machine_enabled")
+    )
+    if enabled is not None and enabled != "true":
+        raise HTTPException(
+            status_code=403,
+            detail="Slot machine is currently disabled."
+        )
+
+    spin_record = _play_spin(principal.id)
+    db.add(spin_record)
+    await db.flush()
+    new_balance = await apply_delta_async(db, principal.id, **_spin_balance_args(spin_record))
+    if new_balance is None:
+        await db.rollback()
+        raise _blacklisted()
+    return await commit_response_async(
+        db, principal.id, idempotency_key, _spin_response(spin_record, new_balance)
+    )
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+
+from app.auth.session import create_session_token
+from app.auth.telegram import get_current_user, load_user
+from app.database import get_db
+from app.models.user import User
+from app.schemas.user import SessionTokenOut
+
+router = APIRouter()
+
+
+@router.post("/auth/session", response_model=SessionTokenOut)
+def create_session(
+    principal: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Exchange validated Telegram init data for a short-lived session token."""
+    # Read the row so the token never carries a stale cached role or generation
+    user = load_user(db, principal)
+    token, expires_at = create_session_token(user)
+    return SessionTokenOut(
+        token=token,
+        expires_at=datetime.fromtimestamp(expires_at, timezone.utc),
+        is_active=user.is_active,
+        is_admin=user.is_admin,
+    )
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.auth.telegram import require_admin
+from app.database import get_read_db
+from app.models.fiscal_period import FiscalPeriod
+from app.models.user import User
+from app.services.export import EXPORT_FORMATS, export_rows
+
+router = APIRouter()
+
+
+@router.get("/admin/export/{dataset}")
+def export_dataset(
+    dataset: Literal["transactions", "grants", "spins"],
+    fmt: Literal["csv", "ndjson"] = Query("csv", alias="format"),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    fiscal_period_id: int | None = None,
+    _admin: User = Depends(require_admin),
+    db: Session = Depends(get_read_db),
+):
+    """Stream every row of a dataset in a date range or fiscal period.
+
+    The range is `start <= time < end`; either bound may be left out.
+    """
+    if fiscal_period_id is not None:
+        if start or end:
+            raise HTTPException(status_code=400, detail="Give either a fiscal period or a date range")
+        period = db.query(FiscalPeriod).filter(FiscalPeriod.id == fiscal_period_id).first()
+        if not period:
+            raise HTTPException(status_code=404, detail="Period not found")
+        start, end = period.started_at, period.ended_at
+
+    return StreamingResponse(
+        export_rows(dataset, fmt, start, end),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{fmt}"'},
+    )
@@ -1,20 +1,36 @@
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session, joinedload
 
 from app.auth.telegram import require_active_user, require_admin
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.pagination import PageParams, desc, keyset, page_params, page_rows
 from app.models.fiscal_debt import FiscalDebt
 from app.models.fiscal_period import FiscalPeriod
-from app.models.transaction import Transaction
+from app.models.fiscal_period_rollup import FiscalPeriodRollup
 from app.models.user import User
 from app.schemas.fiscal import CloseResult, FiscalDebtOut, FiscalPeriodOut, FiscalPeriodStats
-from app.services.messaging import send_bulk_event_message
+from app.services.fiscal import (
+    OUTSTANDING_STATUSES,
+    freeze_period_stats,
+    notify_debtors,
+    pay_debt,
+    period_stats,
+    settle_period,
+)
 
 router = APIRouter()
 
+# Everything _debt_to_out reads, loaded with the debts instead of one query per row
+_DEBT_OUT_OPTIONS = (
+    joinedload(FiscalDebt.user),
+    joinedload(FiscalDebt.fiscal_period),
+)
+
+_DEBT_PAGE_KEYS = [desc(FiscalDebt.created_at), desc(FiscalDebt.id)]
+
 
 def _debt_to_out(debt: FiscalDebt) -> FiscalDebtOut:
     return FiscalDebtOut(
@@ -56,53 +72,42 @@ def get_current_period(
 
 @router.post("/fiscal-periods/close", response_model=CloseResult)
 def close_fiscal_period(
+    background_tasks: BackgroundTasks,
     _admin: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    current = db.query(FiscalPeriod).filter(FiscalPeriod.ended_at.is_(None)).first()
-    if not current:
-        raise HTTPException(status_code=400, detail="No active fiscal period to close")
-
     now = datetime.now(timezone.utc)
-    current.ended_at = now
-
-    # Create debts for users with negative balance
-    debtors = (
-        db.query(User)
-        .filter(User.is_active == True, User.balance < 0)  # noqa: E712
-        .all()
-    )
-    debts_created = 0
-    users_and_vars: list[tuple[User, dict]] = []
-    for user in debtors:
-        debt = FiscalDebt(
-            fiscal_period_id=current.id,
-            user_id=user.id,
-            amount=abs(user.balance),
-            status="unpaid",
-        )
-        db.add(debt)
-        debts_created += 1
-        users_and_vars.append((user, {
-            "user": user.first_name,
-            "amount": f"{abs(user.balance):.2f}",
-        }))
+    if db.get_bind().dialect.name == "postgresql":
+        # Conflicts with the FOR SHARE of open_period_id: waits for writers
+        # that stamped the closing period, so the frozen statistics include
+        # their rows, and holds new ones off until the new period is visible
+        db.execute(text("LOCK TABLE fiscal_periods IN EXCLUSIVE MODE"))
+    # Claiming the period with a conditional update makes a concurrent
+    # second close find nothing to close instead of settling twice
+    closed = db.execute(
+        update(FiscalPeriod)
+        .where(FiscalPeriod.ended_at.is_(None))
+        .values(ended_at=now)
+        .returning(FiscalPeriod.id, FiscalPeriod.started_at)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if closed is None:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="No active fiscal period to close")
+    closed_period_id, started_at = closed
 
-    # Reset only non-positive balances to 0; keep positive balances intact
-    db.query(User).filter(User.balance < 0).update({User.balance: 0.0})
+    debts_created = settle_period(db, closed_period_id, now)
+    freeze_period_stats(db, closed_period_id, started_at, now)
 
-    # Create new fiscal period
     new_period = FiscalPeriod(started_at=now)
     db.add(new_period)
     db.commit()
-    db.refresh(new_period)
 
-    # Send messages to debtors
-    if users_and_vars:
-        send_bulk_event_message(db, "fiscal_period_closed", users_and_vars)
+    if debts_created:
+        background_tasks.add_task(notify_debtors, closed_period_id)
 
     return CloseResult(
-        closed_period_id=current.id,
+        closed_period_id=closed_period_id,
         debts_created=debts_created,
         new_period_id=new_period.id,
     )
@@ -112,67 +117,34 @@ def close_fiscal_period(
 def get_period_stats(
     period_id: int,
     _admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    period = db.query(FiscalPeriod).filter(FiscalPeriod.id == period_id).first()
-    if not period:
-        raise HTTPException(status_code=404, detail="Period not found")
-
-    end = period.ended_at or datetime.now(timezone.utc)
-
-    # Purchase stats
-    purchase_stats = (
-        db.query(
-            func.count(Transaction.id),
-            func.coalesce(func.sum(Transaction.amount), 0.0),
-        )
-        .filter(
-            Transaction.type == "purchase",
-            Transaction.status == "approved",
-            Transaction.created_at >= period.started_at,
-            Transaction.created_at <= end,
-        )
-        .first()
-    )
-
-    # Payment stats
-    payment_stats = (
-        db.query(
-            func.count(Transaction.id),
-            func.coalesce(func.sum(Transaction.amount), 0.0),
-        )
-        .filter(
-            Transaction.type == "payment",
-            Transaction.status == "approved",
-            Transaction.created_at >= period.started_at,
-            Transaction.created_at <= end,
-        )
+    row = (
+        db.query(FiscalPeriod, FiscalPeriodRollup)
+        .outerjoin(FiscalPeriodRollup, FiscalPeriodRollup.fiscal_period_id == FiscalPeriod.id)
+        .filter(FiscalPeriod.id == period_id)
         .first()
     )
+    if not row:
+        raise HTTPException(status_code=404, detail="Period not found")
+    period, stats = row
 
-    # Debt stats
-    total_debt = (
-        db.query(func.coalesce(func.sum(FiscalDebt.amount), 0.0))
-        .filter(FiscalDebt.fiscal_period_id == period_id)
-        .scalar()
-    )
-    debt_collected = (
-        db.query(func.coalesce(func.sum(FiscalDebt.amount), 0.0))
-        .filter(FiscalDebt.fiscal_period_id == period_id, FiscalDebt.status == "paid")
-        .scalar()
-    )
+    # Closed periods read their frozen statistics; open ones (and periods
+    # closed before statistics were stored) are aggregated on the fly
+    if stats is None:
+        stats = db.execute(period_stats(period.id, period.started_at)).one()
 
     return FiscalPeriodStats(
         id=period.id,
         started_at=period.started_at,
         ended_at=period.ended_at,
-        total_purchases=purchase_stats[0] or 0,
-        total_purchase_amount=abs(float(purchase_stats[1] or 0)),
-        total_payments=payment_stats[0] or 0,
-        total_payment_amount=float(payment_stats[1] or 0),
-        total_debt=float(total_debt or 0),
-        debt_collected=float(debt_collected or 0),
-        debt_outstanding=float(total_debt or 0) - float(debt_collected or 0),
+        total_purchases=stats.total_purchases,
+        total_purchase_amount=float(stats.total_purchase_amount),
+        total_payments=stats.total_payments,
+        total_payment_amount=float(stats.total_payment_amount),
+        total_debt=float(stats.total_debt),
+        debt_collected=float(stats.debt_collected),
+        debt_outstanding=float(stats.total_debt) - float(stats.debt_collected),
     )
 
 
@@ -184,6 +156,7 @@ def get_period_debts(
 ):
     debts = (
         db.query(FiscalDebt)
+        .options(*_DEBT_OUT_OPTIONS)
         .filter(FiscalDebt.fiscal_period_id == period_id)
         .order_by(FiscalDebt.amount.desc())
         .all()
@@ -193,16 +166,18 @@ def get_period_debts(
 
 @router.get("/fiscal-debts/pending", response_model=list[FiscalDebtOut])
 def get_all_pending_debts(
+    response: Response,
+    page: PageParams = Depends(page_params()),
     _admin: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
     """Get all pending debt payments across all fiscal periods."""
-    debts = (
+    query = (
         db.query(FiscalDebt)
+        .options(*_DEBT_OUT_OPTIONS)
         .filter(FiscalDebt.status == "payment_pending")
-        .order_by(FiscalDebt.created_at.desc())
-        .all()
     )
+    debts = page_rows(keyset(query, _DEBT_PAGE_KEYS, page).all(), _DEBT_PAGE_KEYS, page, response)
     return [_debt_to_out(d) for d in debts]
 
 
@@ -213,9 +188,10 @@ def get_my_debts(
 ):
     debts = (
         db.query(FiscalDebt)
+        .options(*_DEBT_OUT_OPTIONS)
         .filter(
             FiscalDebt.user_id == user.id,
-            FiscalDebt.status.in_(["unpaid", "payment_pending"]),
+            FiscalDebt.status.in_(OUTSTANDING_STATUSES),
         )
         .order_by(FiscalDebt.created_at.desc())
         .all()
@@ -252,11 +228,9 @@ def approve_debt_payment(
     debt = db.query(FiscalDebt).filter(FiscalDebt.id == debt_id).first()
     if not debt:
         raise HTTPException(status_code=404, detail="Debt not found")
-    if debt.status != "payment_pending":
+    if not pay_debt(db, debt, ("payment_pending",), datetime.now(timezone.utc)):
+        db.rollback()
         raise HTTPException(status_code=400, detail="Debt payment is not pending")
-
-    debt.status = "paid"
-    debt.paid_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(debt)
 
@@ -303,11 +277,9 @@ def mark_debt_paid(
     debt = db.query(FiscalDebt).filter(FiscalDebt.id == debt_id).first()
     if not debt:
         raise HTTPException(status_code=404, detail="Debt not found")
-    if debt.status == "paid":
+    if not pay_debt(db, debt, OUTSTANDING_STATUSES, datetime.now(timezone.utc)):
+        db.rollback()
         raise HTTPException(status_code=400, detail="Debt is already paid")
-
-    debt.status = "paid"
-    debt.paid_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(debt)
 
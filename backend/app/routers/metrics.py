@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+
+from app.auth.identity import user_identities
+from app.auth.telegram import init_data_cache, require_admin
+from app.config import settings
+from app.database import (
+    async_engine,
+    async_pool_metrics,
+    engine,
+    pool_metrics,
+    read_engine,
+    read_pool_metrics,
+)
+from app.models.user import User
+from app.services.idempotency import idempotency_cache
+from app.schemas.metrics import MetricsOut
+
+router = APIRouter()
+
+
+def _pool_stats() -> dict:
+    pools = {"primary": pool_metrics.snapshot(engine.pool)}
+    if read_engine is not None:
+        pools["replica"] = read_pool_metrics.snapshot(read_engine.pool)
+    if async_engine is not None:
+        pools["async"] = async_pool_metrics.snapshot(async_engine.pool)
+    return {
+        name: {"liveness": settings.DB_POOL_LIVENESS, **stats}
+        for name, stats in pools.items()
+    }
+
+
+@router.get("/admin/metrics", response_model=MetricsOut)
+def get_metrics(_admin: User = Depends(require_admin)):
+    """In-process metrics of this worker.
+
+    The gap between avg_checkout_ms and avg_wait_ms is the per-checkout cost
+    of the liveness strategy (e.g. the pre-ping round trip).
+    """
+    return MetricsOut(
+        caches={
+            "init_data": init_data_cache.stats(),
+            "user_identity": user_identities.stats(),
+            "idempotency": idempotency_cache.stats(),
+        },
+        pools=_pool_stats(),
+    )
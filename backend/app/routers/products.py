@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
-from app.auth.telegram import get_current_user, require_admin
+from app.auth.telegram import get_current_principal, require_admin
 from app.database import get_db
 from app.models.product import Product
 from app.models.user import User
@@ -12,7 +12,7 @@ router = APIRouter()
 
 @router.get("/products", response_model=list[ProductOut])
 def list_products(
-    _user: User = Depends(get_current_user),
+    _user: User = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     return (
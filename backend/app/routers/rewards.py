@@ -1,10 +1,11 @@
 import json
 from datetime import datetime, timezone, timedelta
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.orm import Session, joinedload
 
 from app.auth.telegram import require_admin
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.pagination import PageParams, desc, keyset, page_params, page_rows
 from app.models.reward import Reward
 from app.models.reward_grant import RewardGrant
 from app.models.user import User
@@ -15,10 +16,13 @@ from app.schemas.reward import (
     RewardGrantOut,
     GrantRewardRequest,
 )
+from app.services.balance import credit_users
 from app.services.messaging import send_event_message
 
 router = APIRouter()
 
+_GRANT_PAGE_KEYS = [desc(RewardGrant.granted_at), desc(RewardGrant.id)]
+
 
 def _calculate_next_grant_date(frequency: str) -> datetime:
     """Calculate next grant date based on frequency"""
@@ -84,19 +88,6 @@ def list_rewards(
     return [_reward_to_out(r) for r in rewards]
 
 
-@router.get("/rewards/{reward_id}", response_model=RewardOut)
-def get_reward(
-    reward_id: int,
-    _admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
-):
-    """Get single reward by ID"""
-    reward = db.query(Reward).filter(Reward.id == reward_id).first()
-    if not reward:
-        raise HTTPException(status_code=404, detail="Reward not found")
-    return _reward_to_out(reward)
-
-
 @router.post("/rewards", response_model=RewardOut)
 def create_reward(
     data: RewardCreate,
@@ -224,12 +215,14 @@ def grant_reward_manually(
             granted_by_scheduler=False,
         )
         db.add(grant)
-
-        # Update user balance (auto-approved)
-        user.balance += reward.amount
-
         grants.append(grant)
 
+    # Update user balances (auto-approved)
+    db.flush()
+    credit_users(
+        db, [user.id for user in users], reward.amount, "reward",
+        {grant.user_id: grant.id for grant in grants},
+    )
     db.commit()
 
     # Send notifications
@@ -251,31 +244,43 @@ def grant_reward_manually(
 
 @router.get("/rewards/grants", response_model=list[RewardGrantOut])
 def list_all_grants(
+    response: Response,
+    page: PageParams = Depends(page_params()),
     _admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
-    limit: int = 100,
+    db: Session = Depends(get_read_db),
 ):
     """List recent reward grants (admin view)"""
-    grants = (
-        db.query(RewardGrant)
-        .order_by(RewardGrant.granted_at.desc())
-        .limit(limit)
-        .all()
-    )
+    query = db.query(RewardGrant).options(joinedload(RewardGrant.user))
+    grants = page_rows(keyset(query, _GRANT_PAGE_KEYS, page).all(), _GRANT_PAGE_KEYS, page, response)
     return [_grant_to_out(g) for g in grants]
 
 
 @router.get("/rewards/grants/user/{user_id}", response_model=list[RewardGrantOut])
 def list_user_grants(
     user_id: int,
+    response: Response,
+    page: PageParams = Depends(page_params()),
     _admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """List all grants for a specific user"""
-    grants = (
+    query = (
         db.query(RewardGrant)
+        .options(joinedload(RewardGrant.user))
         .filter(RewardGrant.user_id == user_id)
-        .order_by(RewardGrant.granted_at.desc())
-        .all()
     )
+    grants = page_rows(keyset(query, _GRANT_PAGE_KEYS, page).all(), _GRANT_PAGE_KEYS, page, response)
     return [_grant_to_out(g) for g in grants]
+
+
+@router.get("/rewards/{reward_id}", response_model=RewardOut)
+def get_reward(
+    reward_id: int,
+    _admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Get single reward by ID"""
+    reward = db.query(Reward).filter(Reward.id == reward_id).first()
+    if not reward:
+        raise HTTPException(status_code=404, detail="Reward not found")
+    return _reward_to_out(reward)
@@ -1,12 +1,14 @@
 import json
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import func
 
 from app.auth.telegram import require_active_user, require_admin
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.pagination import PageParams, desc, keyset, page_params, page_rows
 from app.models.app_setting import AppSetting
 from app.models.fiscal_period import FiscalPeriod
 from app.models.slot_machine_spin import SlotMachineSpin
@@ -21,10 +23,20 @@ from app.schemas.slot_machine import (
     SlotMachineToggleRequest,
     SlotMachineTopWinner,
 )
+from app.services.balance import apply_delta
+from app.services.idempotency import (
+    IdempotentRequest,
+    commit_response,
+    get_idempotency_key,
+    replay_response,
+)
+from app.services.partitions import partition_floor
 from app.services.slot_machine import SlotMachineService
 
 router = APIRouter()
 
+_SPIN_PAGE_KEYS = [desc(SlotMachineSpin.created_at), desc(SlotMachineSpin.id)]
+
 
 def _is_slot_machine_enabled(db: Session) -> bool:
     setting = db.query(AppSetting).filter(AppSetting.key == "slot_machine_enabled").first()
@@ -33,6 +45,50 @@ def _is_slot_machine_enabled(db: Session) -> bool:
     return setting.value == "true"
 
 
+# Spins are refused once the bet would take the balance below this
+BLACKLIST_LIMIT = -50.0
+
+
+def _play_spin(user_id: int) -> SlotMachineSpin:
+    """Spin for the user; the balance change is applied by the caller."""
+    bet_amount = SlotMachineService.BET_AMOUNT
+    symbols, win_amount = SlotMachineService.spin(bet_amount)
+    return SlotMachineSpin(
+        user_id=user_id,
+        bet_amount=bet_amount,
+        win_amount=win_amount,
+        symbols=json.dumps(symbols),
+    )
+
+
+def _spin_balance_args(spin: SlotMachineSpin) -> dict:
+    """`apply_delta` arguments of a flushed spin: bet and win in one update,
+    with only the bet checked against the blacklist limit."""
+    return {
+        "delta": spin.win_amount - spin.bet_amount,
+        "kind": "spin",
+        "reference_id": spin.id,
+        "floor": BLACKLIST_LIMIT,
+        "floor_delta": -spin.bet_amount,
+    }
+
+
+def _blacklisted() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"You have reached the blacklist limit ({BLACKLIST_LIMIT:.2f}€). Cannot gamble further!"
+    )
+
+
+def _spin_response(spin: SlotMachineSpin, new_balance: float) -> SlotMachineSpinResponse:
+    return SlotMachineSpinResponse(
+        symbols=json.loads(spin.symbols),
+        win_amount=spin.win_amount,
+        bet_amount=spin.bet_amount,
+        new_balance=new_balance,
+    )
+
+
 @router.get("/slot-machine/status", response_model=SlotMachineStatusResponse)
 def get_slot_machine_status(
     _user: User = Depends(require_active_user),
@@ -46,6 +102,7 @@ def spin_slot_machine(
     data: SlotMachineSpinRequest,
     user: User = Depends(require_active_user),
     db: Session = Depends(get_db),
+    idempotency_key: IdempotentRequest | None = Depends(get_idempotency_key),
 ):
     """
     Spin the slot machine.
@@ -55,6 +112,10 @@ def spin_slot_machine(
     - Adds win amount (if any) to user balance
     - Records the spin in history
     """
+    stored = replay_response(db, user.id, idempotency_key)
+    if stored is not None:
+        return stored
+
     # Check if slot machine is enabled
     if not _is_slot_machine_enabled(db):
         raise HTTPException(
@@ -62,64 +123,32 @@ def spin_slot_machine(
             detail="Slot machine is currently disabled."
         )
 
-    bet_amount = SlotMachineService.BET_AMOUNT
-    BLACKLIST_LIMIT = -50.0
-
-    # Check if user has reached blacklist limit (-50€)
-    if user.balance < -49:
-        raise HTTPException(
-            status_code=400,
-            detail=f"You have reached the blacklist limit ({BLACKLIST_LIMIT:.2f}€). Cannot gamble further!"
-        )
-
-    # Deduct bet amount
-    user.balance -= bet_amount
-
-    # Spin the slot machine
-    symbols, win_amount = SlotMachineService.spin(bet_amount)
-
-    # Add win amount to balance
-    user.balance += win_amount
-
-    # Record the spin
-    spin_record = SlotMachineSpin(
-        user_id=user.id,
-        bet_amount=bet_amount,
-        win_amount=win_amount,
-        symbols=json.dumps(symbols),
-    )
+    spin_record = _play_spin(user.id)
     db.add(spin_record)
+    db.flush()
+    new_balance = apply_delta(db, user.id, **_spin_balance_args(spin_record))
+    if new_balance is None:
+        db.rollback()
+        raise _blacklisted()
 
     # Commit all changes
-    db.commit()
-    db.refresh(user)
-
-    return SlotMachineSpinResponse(
-        symbols=symbols,
-        win_amount=win_amount,
-        bet_amount=bet_amount,
-        new_balance=user.balance,
-    )
+    return commit_response(db, user.id, idempotency_key, _spin_response(spin_record, new_balance))
 
 
 @router.get("/slot-machine/history", response_model=list[SlotMachineHistory])
 def get_slot_machine_history(
+    response: Response,
+    page: PageParams = Depends(page_params(50)),
     user: User = Depends(require_active_user),
     db: Session = Depends(get_db),
-    limit: int = 50,
 ):
     """
     Get user's slot machine history.
 
-    Returns up to `limit` most recent spins.
+    Returns up to `limit` most recent spins, older ones via `cursor`.
     """
-    spins = (
-        db.query(SlotMachineSpin)
-        .filter(SlotMachineSpin.user_id == user.id)
-        .order_by(desc(SlotMachineSpin.created_at))
-        .limit(limit)
-        .all()
-    )
+    query = db.query(SlotMachineSpin).filter(SlotMachineSpin.user_id == user.id)
+    spins = page_rows(keyset(query, _SPIN_PAGE_KEYS, page).all(), _SPIN_PAGE_KEYS, page, response)
 
     return [
         SlotMachineHistory(
@@ -178,14 +207,16 @@ def get_slot_machine_stats(
 @router.get("/slot-machine/admin/stats", response_model=SlotMachineAdminStats)
 def get_admin_slot_machine_stats(
     scope: str = "fiscal_period",
+    top: int = Query(10, ge=1, le=settings.PAGE_SIZE_MAX),
     _admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get global slot machine statistics.
     
     Args:
         scope: "fiscal_period" (default) or "all_time"
+        top: number of top winners to return
     """
     # Get current fiscal period
     current_period = db.query(FiscalPeriod).filter(FiscalPeriod.ended_at.is_(None)).first()
@@ -196,7 +227,10 @@ def get_admin_slot_machine_stats(
     # Base query filter for fiscal period
     period_filter = []
     if scope == "fiscal_period" and period_start:
-        period_filter.append(SlotMachineSpin.created_at >= period_start)
+        period_filter += [
+            SlotMachineSpin.fiscal_period_id == current_period.id,
+            SlotMachineSpin.created_at >= partition_floor(period_start),
+        ]
 
     # Global stats
     stats = (
@@ -229,6 +263,7 @@ def get_admin_slot_machine_stats(
         .filter(*period_filter)
         .group_by(SlotMachineSpin.user_id, User.first_name)
         .order_by((func.sum(SlotMachineSpin.win_amount) - func.sum(SlotMachineSpin.bet_amount)).desc())
+        .limit(top)
         .all()
     )
 
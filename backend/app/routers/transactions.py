@@ -1,14 +1,32 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
 
 from app.auth.telegram import require_active_user, require_admin
 from app.config import settings
-from app.database import get_db
-from app.services.messaging import send_event_message
+from app.database import get_db, get_read_db
+from app.pagination import PageParams, count_rows, desc, keyset, page_params, page_rows, set_total
+from app.services.balance import apply_batch, apply_delta, apply_deltas
+from app.services.fiscal import add_late_approvals
+from app.services.idempotency import (
+    IdempotentRequest,
+    commit_response,
+    get_idempotency_key,
+    replay_response,
+)
+from app.services.messaging import dispatch_bulk_event_message, send_event_message
+from app.services.purchases import new_purchase, purchase_batcher
 from app.models.product import Product
 from app.models.transaction import Transaction
 from app.models.user import User
 from app.schemas.transaction import (
+    BulkTransactionRequest,
+    BulkTransactionResult,
+    CheckoutOut,
+    CheckoutRequest,
     PaymentRequest,
     PurchaseRequest,
     TransactionOut,
@@ -17,6 +35,15 @@ from app.schemas.transaction import (
 
 router = APIRouter()
 
+# Everything _to_out reads, loaded with the transactions instead of one query per row
+_TX_OUT_OPTIONS = (
+    joinedload(Transaction.user),
+    joinedload(Transaction.product),
+    joinedload(Transaction.created_by),
+)
+
+_TX_PAGE_KEYS = [desc(Transaction.created_at), desc(Transaction.id)]
+
 
 def _to_out(tx: Transaction) -> TransactionOut:
     return TransactionOut(
@@ -42,30 +69,72 @@ def create_purchase(
     data: PurchaseRequest,
     user: User = Depends(require_active_user),
     db: Session = Depends(get_db),
+    idempotency_key: IdempotentRequest | None = Depends(get_idempotency_key),
 ):
+    stored = replay_response(db, user.id, idempotency_key)
+    if stored is not None:
+        return stored
+
+    if settings.PURCHASE_GROUP_COMMIT:
+        # Hand the connection back while waiting; the batch writer needs one
+        db.close()
+        return purchase_batcher.result(
+            purchase_batcher.submit(user.id, data.product_id, data.quantity, idempotency_key)
+        )
+
     product = db.query(Product).filter(Product.id == data.product_id, Product.is_active == True).first()  # noqa: E712
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    quantity = max(1, data.quantity)
-    auto_approve = settings.AUTO_APPROVE_PURCHASES
-    tx = Transaction(
-        user_id=user.id,
-        product_id=product.id,
-        type="purchase",
-        amount=-(product.price * quantity),
-        quantity=quantity,
-        status="approved" if auto_approve else "pending",
-        created_by_id=user.id,
-    )
+    tx = new_purchase(user.id, product, data.quantity)
     db.add(tx)
+    db.flush()
 
-    if auto_approve:
-        user.balance += tx.amount
+    if tx.status == "approved":
+        apply_delta(db, user.id, tx.amount, "purchase", tx.id)
 
-    db.commit()
     db.refresh(tx)
-    return _to_out(tx)
+    return commit_response(db, user.id, idempotency_key, _to_out(tx))
+
+
+@router.post("/transactions/checkout", response_model=CheckoutOut)
+def checkout(
+    data: CheckoutRequest,
+    user: User = Depends(require_active_user),
+    db: Session = Depends(get_db),
+):
+    """Buy several products at once: one insert, one balance update, one commit."""
+    if not data.items:
+        raise HTTPException(status_code=400, detail="Cart is empty")
+
+    product_ids = {item.product_id for item in data.items}
+    products = {
+        p.id: p
+        for p in db.query(Product).filter(Product.id.in_(product_ids), Product.is_active == True)  # noqa: E712
+    }
+    if len(products) != len(product_ids):
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    txs = [new_purchase(user.id, products[item.product_id], item.quantity) for item in data.items]
+    db.add_all(txs)
+    db.flush()
+
+    approved = {tx.id: tx.amount for tx in txs if tx.status == "approved"}
+    if approved:
+        new_balance = apply_deltas(db, user.id, "purchase", approved)
+    else:
+        new_balance = db.query(User.balance).filter(User.id == user.id).scalar()
+    tx_ids = [tx.id for tx in txs]
+    db.commit()
+
+    txs = (
+        db.query(Transaction)
+        .options(*_TX_OUT_OPTIONS)
+        .filter(Transaction.id.in_(tx_ids))
+        .order_by(Transaction.id)
+        .all()
+    )
+    return CheckoutOut(transactions=[_to_out(tx) for tx in txs], new_balance=new_balance)
 
 
 @router.post("/transactions/payment", response_model=TransactionOut)
@@ -100,7 +169,12 @@ def create_payment_request(
     data: UserPaymentRequest,
     user: User = Depends(require_active_user),
     db: Session = Depends(get_db),
+    idempotency_key: IdempotentRequest | None = Depends(get_idempotency_key),
 ):
+    stored = replay_response(db, user.id, idempotency_key)
+    if stored is not None:
+        return stored
+
     if data.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be positive")
 
@@ -113,40 +187,178 @@ def create_payment_request(
         created_by_id=user.id,
     )
     db.add(tx)
-    db.commit()
+    db.flush()
     db.refresh(tx)
-    return _to_out(tx)
+    return commit_response(db, user.id, idempotency_key, _to_out(tx))
 
 
 @router.get("/transactions/mine", response_model=list[TransactionOut])
 def my_transactions(
+    response: Response,
+    page: PageParams = Depends(page_params(50)),
     user: User = Depends(require_active_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    txs = (
+    query = (
         db.query(Transaction)
+        .options(*_TX_OUT_OPTIONS)
         .filter(Transaction.user_id == user.id)
-        .order_by(Transaction.created_at.desc())
-        .limit(50)
-        .all()
     )
+    txs = page_rows(keyset(query, _TX_PAGE_KEYS, page).all(), _TX_PAGE_KEYS, page, response)
     return [_to_out(tx) for tx in txs]
 
 
 @router.get("/transactions/pending", response_model=list[TransactionOut])
 def pending_transactions(
+    response: Response,
+    page: PageParams = Depends(page_params()),
     _admin: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
-    txs = (
+    query = (
         db.query(Transaction)
+        .options(*_TX_OUT_OPTIONS)
         .filter(Transaction.status == "pending")
-        .order_by(Transaction.created_at.desc())
-        .all()
     )
+    txs = page_rows(keyset(query, _TX_PAGE_KEYS, page).all(), _TX_PAGE_KEYS, page, response)
     return [_to_out(tx) for tx in txs]
 
 
+@router.get("/transactions/search", response_model=list[TransactionOut])
+def search_transactions(
+    response: Response,
+    page: PageParams = Depends(page_params()),
+    user_id: int | None = None,
+    tx_type: Literal["purchase", "payment"] | None = Query(None, alias="type"),
+    status: Literal["pending", "approved", "rejected"] | None = None,
+    product_id: int | None = None,
+    min_amount: float | None = None,
+    max_amount: float | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    note: str | None = Query(None, min_length=1),
+    _admin: User = Depends(require_admin),
+    db: Session = Depends(get_read_db),
+):
+    """Search all transactions, newest first.
+
+    Amounts are signed (purchases are negative) and the date range is
+    `start <= created_at < end`. The first page carries the number of
+    matches in X-Total-Count, estimated by the planner for large results.
+    """
+    filters = []
+    if user_id is not None:
+        filters.append(Transaction.user_id == user_id)
+    if tx_type is not None:
+        filters.append(Transaction.type == tx_type)
+    if status is not None:
+        filters.append(Transaction.status == status)
+    if product_id is not None:
+        filters.append(Transaction.product_id == product_id)
+    if min_amount is not None:
+        filters.append(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        filters.append(Transaction.amount <= max_amount)
+    if start is not None:
+        filters.append(Transaction.created_at >= start)
+    if end is not None:
+        filters.append(Transaction.created_at < end)
+    if note is not None:
+        escaped = note.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        filters.append(Transaction.note.ilike(f"%{escaped}%", escape="\\"))
+
+    query = db.query(Transaction).filter(*filters)
+    if page.cursor is None:
+        set_total(response, *count_rows(db, query.statement))
+    txs = keyset(query.options(*_TX_OUT_OPTIONS), _TX_PAGE_KEYS, page).all()
+    return [_to_out(tx) for tx in page_rows(txs, _TX_PAGE_KEYS, page, response)]
+
+
+def _claim_pending(db: Session, tx_ids: list[int], status: str, admin_id: int) -> list:
+    """Move the still pending transactions among `tx_ids` to `status` in one
+    UPDATE; rows another admin handled first are left out."""
+    return db.execute(
+        update(Transaction)
+        .where(Transaction.id.in_(tx_ids), Transaction.status == "pending")
+        .values(status=status, approved_by_id=admin_id)
+        .returning(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.type,
+            Transaction.amount,
+            Transaction.fiscal_period_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+
+def _bulk_result(
+    db: Session,
+    tx_ids: list[int],
+    claimed: list,
+    background_tasks: BackgroundTasks,
+    event_type: str,
+) -> BulkTransactionResult:
+    txs = (
+        db.query(Transaction)
+        .options(*_TX_OUT_OPTIONS)
+        .filter(Transaction.id.in_([row.id for row in claimed]))
+        .order_by(Transaction.id)
+        .all()
+    )
+    # Sent after the response, all through one template lookup
+    payments = [
+        (tx.user, {"user": tx.user.first_name, "amount": f"{tx.amount:.2f}"})
+        for tx in txs if tx.type == "payment"
+    ]
+    if payments:
+        background_tasks.add_task(dispatch_bulk_event_message, event_type, payments)
+
+    claimed_ids = {tx.id for tx in txs}
+    return BulkTransactionResult(
+        transactions=[_to_out(tx) for tx in txs],
+        skipped_ids=[tx_id for tx_id in tx_ids if tx_id not in claimed_ids],
+    )
+
+
+@router.post("/transactions/bulk-approve", response_model=BulkTransactionResult)
+def bulk_approve_transactions(
+    data: BulkTransactionRequest,
+    background_tasks: BackgroundTasks,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Approve many pending transactions with one status UPDATE and one
+    balance UPDATE. Ids that are missing or no longer pending are skipped."""
+    tx_ids = list(dict.fromkeys(data.transaction_ids))
+    if not tx_ids:
+        raise HTTPException(status_code=400, detail="No transactions given")
+
+    claimed = _claim_pending(db, tx_ids, "approved", admin.id)
+    apply_batch(db, [(row.user_id, row.type, row.id, row.amount) for row in claimed])
+    add_late_approvals(db, [(row.fiscal_period_id, row.type, row.amount) for row in claimed])
+    db.commit()
+    return _bulk_result(db, tx_ids, claimed, background_tasks, "payment_approved")
+
+
+@router.post("/transactions/bulk-reject", response_model=BulkTransactionResult)
+def bulk_reject_transactions(
+    data: BulkTransactionRequest,
+    background_tasks: BackgroundTasks,
+    admin: User = Depends(require_admin),
+    db: Session = Depends(get_db),
+):
+    """Reject many pending transactions with one status UPDATE. Ids that are
+    missing or no longer pending are skipped."""
+    tx_ids = list(dict.fromkeys(data.transaction_ids))
+    if not tx_ids:
+        raise HTTPException(status_code=400, detail="No transactions given")
+
+    claimed = _claim_pending(db, tx_ids, "rejected", admin.id)
+    db.commit()
+    return _bulk_result(db, tx_ids, claimed, background_tasks, "payment_rejected")
+
+
 @router.put("/transactions/{tx_id}/approve", response_model=TransactionOut)
 def approve_transaction(
     tx_id: int,
@@ -159,15 +371,26 @@ def approve_transaction(
     if tx.status != "pending":
         raise HTTPException(status_code=400, detail="Transaction is not pending")
 
-    tx.status = "approved"
-    tx.approved_by_id = admin.id
-
     target_user = db.query(User).filter(User.id == tx.user_id).first()
-    
     if not target_user:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    target_user.balance += tx.amount
+
+    # Claim the transaction in the UPDATE itself so that two concurrent
+    # approvals cannot both apply it to the balance
+    claimed = (
+        db.query(Transaction)
+        .filter(Transaction.id == tx.id, Transaction.status == "pending")
+        .update(
+            {Transaction.status: "approved", Transaction.approved_by_id: admin.id},
+            synchronize_session=False,
+        )
+    )
+    if not claimed:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Transaction is not pending")
+
+    apply_delta(db, target_user.id, tx.amount, tx.type, tx.id)
+    add_late_approvals(db, [(tx.fiscal_period_id, tx.type, tx.amount)])
 
     db.commit()
     db.refresh(tx)
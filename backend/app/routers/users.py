@@ -1,28 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
-from app.auth.telegram import get_current_user, require_admin
-from app.database import get_db
-from app.models.fiscal_debt import FiscalDebt
+from app.auth.identity import user_identities
+from app.auth.session import revoke_sessions, session_generations
+from app.auth.telegram import get_current_principal, load_user, require_admin
+from app.database import get_db, get_read_db
+from app.pagination import PageParams, asc, keyset, page_params, page_rows
 from app.models.user import User
-from app.schemas.user import MeOut, UserBulkCreate, UserCreate, UserOut
+from app.schemas.user import BalanceAsOfOut, MeOut, UserBulkCreate, UserCreate, UserOut
+from app.services.ledger import balance_as_of, record_balance_resets
 from app.services.messaging import send_event_message
 
 router = APIRouter()
 
+_USER_PAGE_KEYS = [asc(User.first_name), asc(User.id)]
+_LEADERBOARD_PAGE_KEYS = [asc(User.balance), asc(User.id)]
 
-@router.get("/me", response_model=MeOut)
-def get_me(user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    debt_total = (
-        db.query(func.coalesce(func.sum(FiscalDebt.amount), 0.0))
-        .filter(
-            FiscalDebt.user_id == user.id,
-            FiscalDebt.status.in_(["unpaid", "payment_pending"]),
-        )
-        .scalar()
-    )
-    debt_total = float(debt_total or 0)
+
+def _me_out(user: User) -> MeOut:
     return MeOut(
         id=user.id,
         telegram_id=user.telegram_id,
@@ -33,29 +31,56 @@ def get_me(user: User = Depends(get_current_user), db: Session = Depends(get_db)
         is_active=user.is_active,
         balance=user.balance,
         created_at=user.created_at,
-        fiscal_debt_total=debt_total,
-        total_balance=user.balance - debt_total,
+        fiscal_debt_total=user.fiscal_debt_total,
+        total_balance=user.balance - user.fiscal_debt_total,
     )
 
 
+@router.get("/me", response_model=MeOut)
+def get_me(principal: User = Depends(get_current_principal), db: Session = Depends(get_db)):
+    return _me_out(load_user(db, principal))
+
+
 @router.get("/users", response_model=list[UserOut])
 def list_users(
+    response: Response,
+    page: PageParams = Depends(page_params()),
     admin: User = Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    return db.query(User).order_by(User.first_name).all()
+    users = keyset(db.query(User), _USER_PAGE_KEYS, page).all()
+    return page_rows(users, _USER_PAGE_KEYS, page, response)
 
 
 @router.get("/leaderboard", response_model=list[UserOut])
 def leaderboard(
-    _user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    response: Response,
+    page: PageParams = Depends(page_params()),
+    _user: User = Depends(get_current_principal),
+    db: Session = Depends(get_read_db),
+):
+    query = db.query(User).filter(User.is_active == True)  # noqa: E712
+    users = keyset(query, _LEADERBOARD_PAGE_KEYS, page).all()
+    return page_rows(users, _LEADERBOARD_PAGE_KEYS, page, response)
+
+
+@router.get("/users/{user_id}/balance", response_model=BalanceAsOfOut)
+def get_user_balance(
+    user_id: int,
+    as_of: datetime | None = None,
+    _admin: User = Depends(require_admin),
+    db: Session = Depends(get_read_db),
 ):
-    return (
-        db.query(User)
-        .filter(User.is_active == True)  # noqa: E712
-        .order_by(User.balance.asc())
-        .all()
+    """Balance at a point in time, computed from the ledger."""
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    as_of = as_of or datetime.now(timezone.utc)
+    return BalanceAsOfOut(
+        user_id=user.id,
+        as_of=as_of,
+        balance=balance_as_of(db, user.id, as_of),
+        current_balance=user.balance,
     )
 
 
@@ -113,13 +138,16 @@ def delete_all_non_admin_users(
     admin: User = Depends(require_admin),
     db: Session = Depends(get_db),
 ):
+    record_balance_resets(db, User.is_admin == False, kind="adjustment")  # noqa: E712
     users = db.query(User).filter(User.is_admin == False).all()  # noqa: E712
     count = 0
     for user in users:
         user.is_active = False
         user.balance = 0.0
+        revoke_sessions(user)
         count += 1
     db.commit()
+    user_identities.clear()
     return {"deactivated": count}
 
 
@@ -133,8 +161,10 @@ def activate_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.is_active = True
+    revoke_sessions(user)
     db.commit()
     db.refresh(user)
+    user_identities.invalidate(user.telegram_id)
 
     send_event_message(db, "user_approved", user, {"user": user.first_name})
 
@@ -153,8 +183,10 @@ def deactivate_user(
     if user.id == admin.id:
         raise HTTPException(status_code=400, detail="Cannot deactivate yourself")
     user.is_active = False
+    revoke_sessions(user)
     db.commit()
     db.refresh(user)
+    user_identities.invalidate(user.telegram_id)
 
     send_event_message(db, "user_deactivated", user, {"user": user.first_name})
 
@@ -171,8 +203,10 @@ def promote_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     user.is_admin = True
+    revoke_sessions(user)
     db.commit()
     db.refresh(user)
+    user_identities.invalidate(user.telegram_id)
 
     send_event_message(db, "user_promoted", user, {"user": user.first_name})
 
@@ -195,8 +229,10 @@ def demote_user(
     if admin_count <= 1:
         raise HTTPException(status_code=400, detail="Cannot demote the last admin")
     user.is_admin = False
+    revoke_sessions(user)
     db.commit()
     db.refresh(user)
+    user_identities.invalidate(user.telegram_id)
 
     send_event_message(db, "user_demoted", user, {"user": user.first_name})
 
@@ -218,9 +254,17 @@ def deny_user(
         raise HTTPException(status_code=400, detail="Cannot deny yourself")
     
     user_name = user.first_name
+    telegram_id = user.telegram_id
     
-    # Delete the user from the database
+    # Delete the user from the database; the ledger and their transactions
+    # keep a user with history from being removed
     db.delete(user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="User has balance history and cannot be removed")
+    session_generations.forget(user_id)
+    user_identities.invalidate(telegram_id)
     
     return {"message": f"User {user_name} has been denied and removed"}
@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+
+
+class CacheStatsOut(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    hit_rate: float
+
+
+class PoolStatsOut(BaseModel):
+    liveness: str
+    size: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    avg_checkout_ms: float
+    max_checkout_ms: float
+    avg_wait_ms: float
+    max_wait_ms: float
+    timeouts: int
+    pings: int
+    avg_ping_ms: float
+    ping_failures: int
+
+
+class MetricsOut(BaseModel):
+    caches: dict[str, CacheStatsOut]
+    pools: dict[str, PoolStatsOut]
@@ -8,6 +8,10 @@ class PurchaseRequest(BaseModel):
     quantity: int = 1
 
 
+class CheckoutRequest(BaseModel):
+    items: list[PurchaseRequest]
+
+
 class PaymentRequest(BaseModel):
     user_id: int
     amount: float
@@ -36,3 +40,17 @@ class TransactionOut(BaseModel):
     user_name: str | None = None
 
     model_config = {"from_attributes": True}
+
+
+class CheckoutOut(BaseModel):
+    transactions: list[TransactionOut]
+    new_balance: float
+
+
+class BulkTransactionRequest(BaseModel):
+    transaction_ids: list[int]
+
+
+class BulkTransactionResult(BaseModel):
+    transactions: list[TransactionOut]
+    skipped_ids: list[int]
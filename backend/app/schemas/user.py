@@ -31,3 +31,18 @@ class UserOut(BaseModel):
 class MeOut(UserOut):
     fiscal_debt_total: float = 0.0
     total_balance: float = 0.0
+
+
+class BalanceAsOfOut(BaseModel):
+    user_id: int
+    as_of: datetime
+    balance: float
+    current_balance: float
+
+
+class SessionTokenOut(BaseModel):
+    token: str
+    token_type: str = "bearer"
+    expires_at: datetime
+    is_active: bool
+    is_admin: bool
@@ -0,0 +1,138 @@
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+
+from app.models.ledger_entry import LedgerEntry
+from app.models.user import User
+
+
+def _delta_statement(user_id: int, delta: float, floor: float | None, floor_delta: float | None):
+    stmt = (
+        update(User)
+        .where(User.id == user_id)
+        .values(balance=User.balance + delta)
+        .returning(User.balance)
+        .execution_options(synchronize_session=False)
+    )
+    if floor is not None:
+        checked = delta if floor_delta is None else floor_delta
+        stmt = stmt.where(User.balance + checked >= floor)
+    return stmt
+
+
+def _sync_loaded_user(session: Session, user_id: int, balance: float) -> None:
+    # Keep an already loaded User in step without another round trip
+    user = session.identity_map.get(identity_key(User, user_id))
+    if user is not None:
+        set_committed_value(user, "balance", balance)
+
+
+def apply_delta(
+    db: Session,
+    user_id: int,
+    delta: float,
+    kind: str,
+    reference_id: int | None = None,
+    floor: float | None = None,
+    floor_delta: float | None = None,
+) -> float | None:
+    """Add `delta` to a user's balance in a single UPDATE, record it in the
+    ledger and return the new balance.
+
+    With `floor`, the update only happens if `balance + floor_delta` (by
+    default `delta`) stays at or above it; otherwise nothing changes and
+    None is returned. The check and the write are one statement, so
+    concurrent requests cannot overdraw the limit or lose updates.
+    """
+    balance = db.execute(_delta_statement(user_id, delta, floor, floor_delta)).scalar_one_or_none()
+    if balance is not None:
+        _sync_loaded_user(db, user_id, balance)
+        db.add(LedgerEntry(user_id=user_id, amount=delta, kind=kind, reference_id=reference_id))
+    return balance
+
+
+def apply_deltas(db: Session, user_id: int, kind: str, deltas: dict[int, float]) -> float | None:
+    """Apply several deltas of one user, keyed by reference id, as a single
+    balance UPDATE with a ledger entry for each; returns the new balance."""
+    balance = db.execute(
+        _delta_statement(user_id, sum(deltas.values()), None, None)
+    ).scalar_one_or_none()
+    if balance is not None:
+        _sync_loaded_user(db, user_id, balance)
+        db.add_all(
+            LedgerEntry(user_id=user_id, amount=delta, kind=kind, reference_id=reference_id)
+            for reference_id, delta in deltas.items()
+        )
+    return balance
+
+
+def apply_batch(db: Session, entries: list[tuple[int, str, int | None, float]]) -> dict[int, float]:
+    """Apply (user_id, kind, reference_id, delta) entries of many users as
+    one set-based UPDATE with a ledger entry each; returns the new balances."""
+    totals: dict[int, float] = {}
+    for user_id, _, _, delta in entries:
+        totals[user_id] = totals.get(user_id, 0.0) + delta
+    if not totals:
+        return {}
+    rows = db.execute(
+        update(User)
+        .where(User.id.in_(totals))
+        .values(balance=User.balance + case(totals, value=User.id))
+        .returning(User.id, User.balance)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for user_id, balance in rows:
+        _sync_loaded_user(db, user_id, balance)
+    db.add_all(
+        LedgerEntry(user_id=user_id, amount=delta, kind=kind, reference_id=reference_id)
+        for user_id, kind, reference_id, delta in entries
+    )
+    return dict(rows)
+
+
+async def apply_delta_async(
+    db: AsyncSession,
+    user_id: int,
+    delta: float,
+    kind: str,
+    reference_id: int | None = None,
+    floor: float | None = None,
+    floor_delta: float | None = None,
+) -> float | None:
+    """Async variant of `apply_delta`."""
+    result = await db.execute(_delta_statement(user_id, delta, floor, floor_delta))
+    balance = result.scalar_one_or_none()
+    if balance is not None:
+        _sync_loaded_user(db.sync_session, user_id, balance)
+        db.add(LedgerEntry(user_id=user_id, amount=delta, kind=kind, reference_id=reference_id))
+    return balance
+
+
+def credit_users(
+    db: Session,
+    user_ids: list[int],
+    amount: float,
+    kind: str,
+    reference_ids: dict[int, int] | None = None,
+) -> dict[int, float]:
+    """Add the same amount to several balances in one UPDATE and record it
+    in the ledger; returns the new balances."""
+    if not user_ids:
+        return {}
+    reference_ids = reference_ids or {}
+    rows = db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(balance=User.balance + amount)
+        .returning(User.id, User.balance)
+        .execution_options(synchronize_session=False)
+    ).all()
+    for user_id, balance in rows:
+        _sync_loaded_user(db, user_id, balance)
+    db.add_all(
+        LedgerEntry(user_id=user_id, amount=amount, kind=kind, reference_id=reference_ids.get(user_id))
+        for user_id, _ in rows
+    )
+    return dict(rows)
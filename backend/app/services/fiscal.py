@@ -0,0 +1,276 @@
+import argparse
+import logging
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, literal, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from app.database import SessionLocal
+from app.models.fiscal_debt import FiscalDebt
+from app.models.fiscal_period_rollup import FiscalPeriodRollup
+from app.models.ledger_entry import LedgerEntry
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.ledger import record_balance_resets
+from app.services.messaging import send_bulk_event_message
+from app.services.partitions import partition_floor
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_BATCH_SIZE = 500
+
+# Debt statuses counted in User.fiscal_debt_total
+OUTSTANDING_STATUSES = ("unpaid", "payment_pending")
+
+
+def settle_period(db: Session, period_id: int, now: datetime) -> int:
+    """Turn the negative balances at the end of a period into debts.
+
+    Every active user with a negative balance gets an unpaid debt, a ledger
+    entry, and their balance and debt total raised by the debt, each as one
+    set-based statement; returns the number of debts. Balances are raised by the
+    recorded debt rather than set to zero, so a purchase committing
+    meanwhile is kept for the next period instead of being lost.
+    """
+    debts_created = db.execute(
+        insert(FiscalDebt).from_select(
+            ["fiscal_period_id", "user_id", "amount", "status", "created_at"],
+            select(
+                literal(period_id),
+                User.id,
+                -User.balance,
+                literal("unpaid"),
+                literal(now, FiscalDebt.created_at.type),
+            ).where(User.is_active == True, User.balance < 0),  # noqa: E712
+        )
+    ).rowcount
+
+    period_debts = (FiscalDebt.fiscal_period_id == period_id, FiscalDebt.user_id == User.id)
+    db.execute(
+        insert(LedgerEntry).from_select(
+            ["user_id", "amount", "kind", "reference_id", "created_at"],
+            select(
+                FiscalDebt.user_id,
+                FiscalDebt.amount,
+                literal("fiscal_reset"),
+                literal(period_id),
+                literal(now, LedgerEntry.created_at.type),
+            ).where(FiscalDebt.fiscal_period_id == period_id),
+        )
+    )
+    db.execute(
+        update(User)
+        .where(*period_debts)
+        .values(
+            balance=User.balance + FiscalDebt.amount,
+            fiscal_debt_total=User.fiscal_debt_total + FiscalDebt.amount,
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # Inactive users get no debt; their negative balances are written off
+    inactive_debtors = (User.is_active == False, User.balance < 0)  # noqa: E712
+    record_balance_resets(db, *inactive_debtors, kind="fiscal_reset", reference_id=period_id)
+    db.execute(
+        update(User)
+        .where(*inactive_debtors)
+        .values(balance=0.0)
+        .execution_options(synchronize_session=False)
+    )
+    return debts_created
+
+
+def period_stats(period_id: int, started_at: datetime):
+    """Statement computing a period's statistics in a single pass over its
+    approved transactions, with the debt totals as subqueries.
+
+    Columns are named like those of FiscalPeriodRollup.
+    """
+    purchase = Transaction.type == "purchase"
+    payment = Transaction.type == "payment"
+    debt = select(func.coalesce(func.sum(FiscalDebt.amount), 0.0)).where(
+        FiscalDebt.fiscal_period_id == period_id
+    )
+    return select(
+        func.count(case((purchase, Transaction.id))).label("total_purchases"),
+        func.abs(func.coalesce(func.sum(case((purchase, Transaction.amount))), 0.0))
+        .label("total_purchase_amount"),
+        func.count(case((payment, Transaction.id))).label("total_payments"),
+        func.coalesce(func.sum(case((payment, Transaction.amount))), 0.0)
+        .label("total_payment_amount"),
+        debt.scalar_subquery().label("total_debt"),
+        debt.where(FiscalDebt.status == "paid").scalar_subquery().label("debt_collected"),
+    ).where(
+        Transaction.type.in_(["purchase", "payment"]),
+        Transaction.status == "approved",
+        Transaction.fiscal_period_id == period_id,
+        Transaction.created_at >= partition_floor(started_at),
+    )
+
+
+def freeze_period_stats(db: Session, period_id: int, started_at: datetime, now: datetime) -> None:
+    """Store the statistics of a period being closed; run after its debts
+    have been created, in the same transaction."""
+    stats = period_stats(period_id, started_at).subquery()
+    db.execute(
+        insert(FiscalPeriodRollup).from_select(
+            ["fiscal_period_id", *stats.c.keys(), "computed_at"],
+            select(
+                literal(period_id),
+                *stats.c,
+                literal(now, FiscalPeriodRollup.computed_at.type),
+            ),
+        )
+    )
+
+
+def add_debt_collected(db: Session, period_id: int, amount: float) -> None:
+    """Count a debt of the period as paid in its frozen statistics."""
+    db.execute(
+        update(FiscalPeriodRollup)
+        .where(FiscalPeriodRollup.fiscal_period_id == period_id)
+        .values(debt_collected=FiscalPeriodRollup.debt_collected + amount)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def add_late_approvals(db: Session, approved: list[tuple[int | None, str, float]]) -> None:
+    """Count transactions approved after their period was closed in its
+    frozen statistics.
+
+    `approved` holds the (fiscal_period_id, type, amount) of the newly
+    approved transactions; periods that are still open have no rollup row
+    and are left alone.
+    """
+    totals: dict[int, list] = {}
+    for period_id, tx_type, amount in approved:
+        if period_id is None or tx_type not in ("purchase", "payment"):
+            continue
+        counts = totals.setdefault(period_id, [0, 0.0, 0, 0.0])
+        if tx_type == "purchase":
+            counts[0] += 1
+            counts[1] += abs(amount)
+        else:
+            counts[2] += 1
+            counts[3] += amount
+    for period_id, (purchases, purchase_amount, payments, payment_amount) in totals.items():
+        db.execute(
+            update(FiscalPeriodRollup)
+            .where(FiscalPeriodRollup.fiscal_period_id == period_id)
+            .values(
+                total_purchases=FiscalPeriodRollup.total_purchases + purchases,
+                total_purchase_amount=FiscalPeriodRollup.total_purchase_amount + purchase_amount,
+                total_payments=FiscalPeriodRollup.total_payments + payments,
+                total_payment_amount=FiscalPeriodRollup.total_payment_amount + payment_amount,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def pay_debt(db: Session, debt: FiscalDebt, from_statuses: tuple[str, ...], now: datetime) -> bool:
+    """Mark `debt` paid if it is still in one of `from_statuses`, taking it
+    off the user's debt total and adding it to the period's collected debt.
+
+    Returns False, changing nothing, when a concurrent request got there
+    first.
+    """
+    paid = db.execute(
+        update(FiscalDebt)
+        .where(FiscalDebt.id == debt.id, FiscalDebt.status.in_(from_statuses))
+        .values(status="paid", paid_at=now)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not paid:
+        return False
+    db.execute(
+        update(User)
+        .where(User.id == debt.user_id)
+        .values(fiscal_debt_total=User.fiscal_debt_total - debt.amount)
+        .execution_options(synchronize_session=False)
+    )
+    add_debt_collected(db, debt.fiscal_period_id, debt.amount)
+    return True
+
+
+def check_debt_totals(db: Session, repair: bool = False) -> list[tuple[int, float, float]]:
+    """Compare every user's stored debt total with the sum of their
+    outstanding debts; returns (user_id, stored, actual) for each mismatch.
+
+    With `repair` the mismatching totals are overwritten with the actual
+    sums; the caller commits.
+    """
+    outstanding = (
+        select(FiscalDebt.user_id, func.sum(FiscalDebt.amount).label("total"))
+        .where(FiscalDebt.status.in_(OUTSTANDING_STATUSES))
+        .group_by(FiscalDebt.user_id)
+        .subquery()
+    )
+    actual = func.coalesce(outstanding.c.total, 0.0)
+    mismatches = db.execute(
+        select(User.id, User.fiscal_debt_total, actual)
+        .outerjoin(outstanding, outstanding.c.user_id == User.id)
+        # Sums of floats drift by rounding; only whole cents count
+        .where(func.abs(User.fiscal_debt_total - actual) >= 0.005)
+        .order_by(User.id)
+    ).all()
+    if repair and mismatches:
+        db.execute(
+            update(User)
+            .where(User.id.in_([row.id for row in mismatches]))
+            .values(
+                fiscal_debt_total=select(func.coalesce(func.sum(FiscalDebt.amount), 0.0))
+                .where(
+                    FiscalDebt.user_id == User.id,
+                    FiscalDebt.status.in_(OUTSTANDING_STATUSES),
+                )
+                .scalar_subquery()
+            )
+            .execution_options(synchronize_session=False)
+        )
+    return [tuple(row) for row in mismatches]
+
+
+def notify_debtors(period_id: int) -> int:
+    """Background task: send "fiscal_period_closed" to everyone who got a
+    debt from the period, reading the debts in batches."""
+    db = SessionLocal()
+    sent = 0
+    try:
+        debts = (
+            db.query(FiscalDebt)
+            .options(joinedload(FiscalDebt.user))
+            .filter(FiscalDebt.fiscal_period_id == period_id)
+            .order_by(FiscalDebt.id)
+            .yield_per(NOTIFY_BATCH_SIZE)
+        )
+        batch = []
+        for debt in debts:
+            batch.append((debt.user, {"user": debt.user.first_name, "amount": f"{debt.amount:.2f}"}))
+            if len(batch) == NOTIFY_BATCH_SIZE:
+                sent += send_bulk_event_message(db, "fiscal_period_closed", batch)
+                batch = []
+        if batch:
+            sent += send_bulk_event_message(db, "fiscal_period_closed", batch)
+        logger.info("Notified %d debtors of fiscal period %d", sent, period_id)
+        return sent
+    except Exception:
+        logger.exception("Failed to notify debtors of fiscal period %d", period_id)
+        return sent
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check users' stored fiscal debt totals against their outstanding debts."
+    )
+    parser.add_argument("--repair", action="store_true", help="overwrite mismatching totals")
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        found = check_debt_totals(session, repair=args.repair)
+        for user_id, stored, total in found:
+            print(f"user {user_id}: stored {stored:.2f}, outstanding debts {total:.2f}")
+        if args.repair:
+            session.commit()
+        print(f"{len(found)} mismatching totals" + (" repaired" if args.repair and found else ""))
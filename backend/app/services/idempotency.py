@@ -0,0 +1,182 @@
+"""Idempotency-Key support for money-moving endpoints.
+
+The stored response is inserted in the same database transaction as the
+request's own writes, keyed by (user_id, key). When the same key arrives
+concurrently, the second commit fails on the primary key, its writes are
+rolled back and the first request's response is returned instead, so a
+retry can never apply twice.
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Header, HTTPException, Request
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.cache import LRUCache
+from app.config import settings
+from app.database import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+# (user_id, key) -> (fingerprint, response) of committed requests
+idempotency_cache = LRUCache(
+    settings.IDEMPOTENCY_CACHE_SIZE, ttl=settings.IDEMPOTENCY_KEY_TTL_HOURS * 3600
+)
+
+
+@dataclass(frozen=True)
+class IdempotentRequest:
+    key: str
+    fingerprint: str
+
+
+async def get_idempotency_key(
+    request: Request,
+    key: str | None = Header(None, alias=IDEMPOTENCY_HEADER),
+) -> IdempotentRequest | None:
+    if key is None:
+        return None
+    if not key or len(key) > 255:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be 1-255 characters")
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(await request.body())
+    return IdempotentRequest(key=key, fingerprint=digest.hexdigest())
+
+
+def _remember(user_id: int, req: IdempotentRequest, fingerprint: str, response: dict) -> dict:
+    idempotency_cache.put((user_id, req.key), (fingerprint, response))
+    if fingerprint != req.fingerprint:
+        raise HTTPException(
+            status_code=422,
+            detail=f"{IDEMPOTENCY_HEADER} was already used for a different request",
+        )
+    return response
+
+
+def _from_cache(user_id: int, req: IdempotentRequest) -> dict | None:
+    cached = idempotency_cache.get((user_id, req.key))
+    if cached is None:
+        return None
+    return _remember(user_id, req, *cached)
+
+
+def replay_response(db: Session, user_id: int, req: IdempotentRequest | None) -> dict | None:
+    """Stored response of an earlier request with this key, if any."""
+    if req is None:
+        return None
+    cached = _from_cache(user_id, req)
+    if cached is not None:
+        return cached
+    row = db.get(IdempotencyKey, (user_id, req.key))
+    if row is None:
+        return None
+    return _remember(user_id, req, row.fingerprint, json.loads(row.response))
+
+
+async def replay_response_async(
+    db: AsyncSession, user_id: int, req: IdempotentRequest | None
+) -> dict | None:
+    """Async variant of `replay_response`."""
+    if req is None:
+        return None
+    cached = _from_cache(user_id, req)
+    if cached is not None:
+        return cached
+    row = await db.get(IdempotencyKey, (user_id, req.key))
+    if row is None:
+        return None
+    return _remember(user_id, req, row.fingerprint, json.loads(row.response))
+
+
+def _stored_row(user_id: int, req: IdempotentRequest, body: dict) -> IdempotencyKey:
+    return IdempotencyKey(
+        user_id=user_id,
+        key=req.key,
+        fingerprint=req.fingerprint,
+        response=json.dumps(body),
+    )
+
+
+def store_response(
+    db: Session | AsyncSession, user_id: int, req: IdempotentRequest, response: BaseModel
+) -> dict:
+    """Add the stored response of a request to `db`, to be committed with
+    the request's writes; returns it for `remember_response`."""
+    body = response.model_dump(mode="json")
+    db.add(_stored_row(user_id, req, body))
+    return body
+
+
+def remember_response(user_id: int, req: IdempotentRequest, body: dict) -> None:
+    """Cache a stored response once its commit succeeded."""
+    _remember(user_id, req, req.fingerprint, body)
+
+
+def commit_response(db: Session, user_id: int, req: IdempotentRequest | None, response: BaseModel):
+    """Commit the request's writes together with its stored response.
+
+    If a concurrent request with the same key committed first, everything
+    is rolled back and that request's response is returned instead.
+    """
+    if req is None:
+        db.commit()
+        return response
+    body = store_response(db, user_id, req, response)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        stored = replay_response(db, user_id, req)
+        if stored is None:
+            raise
+        return stored
+    remember_response(user_id, req, body)
+    return response
+
+
+async def commit_response_async(
+    db: AsyncSession, user_id: int, req: IdempotentRequest | None, response: BaseModel
+):
+    """Async variant of `commit_response`."""
+    if req is None:
+        await db.commit()
+        return response
+    body = store_response(db, user_id, req, response)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        stored = await replay_response_async(db, user_id, req)
+        if stored is None:
+            raise
+        return stored
+    remember_response(user_id, req, body)
+    return response
+
+
+def purge_expired_keys() -> int:
+    """Scheduled job: delete stored responses older than IDEMPOTENCY_KEY_TTL_HOURS."""
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    db = SessionLocal()
+    try:
+        count = db.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff)).rowcount
+        db.commit()
+        logger.info("Purged %d expired idempotency keys", count)
+        return count
+    except Exception:
+        logger.exception("Failed to purge expired idempotency keys")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
@@ -0,0 +1,128 @@
+"""Audit trail of balance changes.
+
+`users.balance` is still the running total that every request updates
+and reads; app.services.balance appends a ledger entry next to each
+update, in the same transaction. The ledger therefore adds one insert per
+change rather than taking writes off the user row. What it buys is
+history: periodic snapshots plus the entries since give any user's
+balance at any moment, and that can be checked against the stored total.
+
+benchmarks/bench_ledger_overhead.py measures the price: on Postgres a
+change with its entry costs about one more millisecond, and sustained
+throughput drops by roughly a quarter to a third, whether the writers hit
+one user or many. That is hundreds of changes a second, far above what
+the bar's purchases produce.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.balance_snapshot import BalanceSnapshot
+from app.models.ledger_entry import LedgerEntry
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def record_balance_resets(
+    db: Session, *criteria, kind: str, reference_id: int | None = None
+) -> int:
+    """Append entries zeroing the balance of every user matching `criteria`.
+
+    Must run before the balances themselves are reset, in the same
+    transaction. Returns the number of entries written.
+    """
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        insert(LedgerEntry).from_select(
+            ["user_id", "amount", "kind", "reference_id", "created_at"],
+            select(
+                User.id,
+                -User.balance,
+                literal(kind),
+                literal(reference_id),
+                literal(now, LedgerEntry.created_at.type),
+            ).where(User.balance != 0, *criteria),
+        )
+    )
+    return result.rowcount
+
+
+def take_snapshots(db: Session, taken_at: datetime) -> int:
+    """Snapshot the balance of every user with ledger entries since their
+    previous snapshot, in a single INSERT ... SELECT.
+
+    `taken_at` should lag behind the present so that transactions still in
+    flight cannot commit entries that belong before it.
+    """
+    latest = (
+        select(BalanceSnapshot.user_id, func.max(BalanceSnapshot.taken_at).label("taken_at"))
+        .group_by(BalanceSnapshot.user_id)
+        .subquery()
+    )
+    previous = (
+        select(BalanceSnapshot.user_id, BalanceSnapshot.balance, BalanceSnapshot.taken_at)
+        .join(
+            latest,
+            (latest.c.user_id == BalanceSnapshot.user_id)
+            & (latest.c.taken_at == BalanceSnapshot.taken_at),
+        )
+        .subquery()
+    )
+    rows = (
+        select(
+            LedgerEntry.user_id,
+            func.coalesce(previous.c.balance, 0.0) + func.sum(LedgerEntry.amount),
+            literal(taken_at, BalanceSnapshot.taken_at.type),
+        )
+        .outerjoin(previous, previous.c.user_id == LedgerEntry.user_id)
+        .where(
+            LedgerEntry.created_at <= taken_at,
+            or_(previous.c.taken_at.is_(None), LedgerEntry.created_at > previous.c.taken_at),
+        )
+        .group_by(LedgerEntry.user_id, previous.c.balance)
+    )
+    result = db.execute(
+        insert(BalanceSnapshot).from_select(["user_id", "balance", "taken_at"], rows)
+    )
+    return result.rowcount
+
+
+def balance_as_of(db: Session, user_id: int, as_of: datetime) -> float:
+    """A user's balance at `as_of`: the latest snapshot before it plus the
+    ledger entries created after that snapshot."""
+    snapshot = (
+        db.query(BalanceSnapshot)
+        .filter(BalanceSnapshot.user_id == user_id, BalanceSnapshot.taken_at <= as_of)
+        .order_by(BalanceSnapshot.taken_at.desc())
+        .first()
+    )
+    entries = db.query(func.coalesce(func.sum(LedgerEntry.amount), 0.0)).filter(
+        LedgerEntry.user_id == user_id, LedgerEntry.created_at <= as_of
+    )
+    if snapshot is None:
+        return float(entries.scalar())
+    entries = entries.filter(LedgerEntry.created_at > snapshot.taken_at)
+    return snapshot.balance + float(entries.scalar())
+
+
+def snapshot_balances() -> int:
+    """Scheduled job: snapshot balances up to LEDGER_SNAPSHOT_LAG_SECONDS ago."""
+    taken_at = datetime.now(timezone.utc) - timedelta(seconds=settings.LEDGER_SNAPSHOT_LAG_SECONDS)
+    db = SessionLocal()
+    try:
+        count = take_snapshots(db, taken_at)
+        db.commit()
+        logger.info("Took %d balance snapshots as of %s", count, taken_at.isoformat())
+        return count
+    except Exception:
+        logger.exception("Failed to take balance snapshots")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
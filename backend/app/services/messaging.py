@@ -2,6 +2,7 @@ import logging
 
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.models.message_template import MessageTemplate
 from app.models.user import User
 from app.services.telegram_bot import send_message
@@ -50,3 +51,13 @@ def send_bulk_event_message(
         if send_message(user.telegram_id, text):
             sent += 1
     return sent
+
+
+def dispatch_bulk_event_message(event_type: str, users_and_vars: list[tuple[User, dict]]) -> int:
+    """`send_bulk_event_message` with its own session, for running as a
+    background task after the response; the users must already be loaded."""
+    db = SessionLocal()
+    try:
+        return send_bulk_event_message(db, event_type, users_and_vars)
+    finally:
+        db.close()
@@ -0,0 +1,156 @@
+"""Monthly range partitions of the transactions and slot_machine_spins tables.
+
+On Postgres both tables are partitioned by `created_at` (see migration
+013), one partition per calendar month named like
+`transactions_y2026m10`. Partitions must exist before rows for their month
+arrive, so a scheduled job keeps PARTITION_MONTHS_AHEAD months created in
+advance. Old partitions can be detached and archived with pg_dump:
+
+    python -m app.services.partitions create
+    python -m app.services.partitions list
+    python -m app.services.partitions detach --before 2025-01
+
+On other databases the tables are plain and everything here is a no-op.
+"""
+
+import argparse
+import logging
+import re
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("transactions", "slot_machine_spins")
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_floor(started_at: datetime) -> datetime:
+    """Lower bound on created_at for rows stamped with a period starting at
+    `started_at`. Period filters add it only so that Postgres can skip older
+    partitions; it reaches back a whole month so that rows written by a
+    clock running behind are not lost."""
+    return add_months(month_start(started_at), -1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def _partition_month(table: str, name: str) -> datetime | None:
+    match = re.fullmatch(rf"{table}_y(\d{{4}})m(\d{{2}})", name)
+    return datetime(int(match[1]), int(match[2]), 1) if match else None
+
+
+def is_partitioned(db: Session, table: str) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table},
+    ).scalar()
+
+
+def list_partitions(db: Session, table: str) -> list[str]:
+    """Names of the partitions attached to `table`, oldest first."""
+    if not is_partitioned(db, table):
+        return []
+    return db.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+        ),
+        {"table": table},
+    ).scalars().all()
+
+
+def create_partitions(db: Session, start: datetime, end: datetime) -> list[str]:
+    """Create the missing monthly partitions covering `start` up to `end`;
+    returns their names. The caller commits."""
+    created = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(db, table):
+            continue
+        month = month_start(start)
+        while month < end:
+            following = add_months(month, 1)
+            name = partition_name(table, month)
+            exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+            if exists is None:
+                db.execute(text(
+                    f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                    f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+                ))
+                created.append(name)
+            month = following
+    return created
+
+
+def detach_partitions_before(db: Session, cutoff: datetime) -> list[str]:
+    """Detach every partition whose month ends on or before `cutoff`;
+    returns their names. The detached tables keep their rows and can be
+    dumped and dropped. The caller commits."""
+    detached = []
+    for table in PARTITIONED_TABLES:
+        for name in list_partitions(db, table):
+            month = _partition_month(table, name)
+            if month is not None and add_months(month, 1) <= cutoff:
+                db.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                detached.append(name)
+    return detached
+
+
+def maintain_partitions() -> int:
+    """Scheduled job: create partitions up to PARTITION_MONTHS_AHEAD months
+    past the current one."""
+    now = month_start(datetime.now(timezone.utc))
+    db = SessionLocal()
+    try:
+        created = create_partitions(db, now, add_months(now, settings.PARTITION_MONTHS_AHEAD + 1))
+        db.commit()
+        if created:
+            logger.info("Created partitions %s", ", ".join(created))
+        return len(created)
+    except Exception:
+        logger.exception("Failed to create partitions")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the monthly table partitions.")
+    parser.add_argument("action", choices=["create", "list", "detach"])
+    parser.add_argument(
+        "--before", type=lambda value: datetime.strptime(value, "%Y-%m"),
+        help="detach partitions of months before this one (YYYY-MM)",
+    )
+    args = parser.parse_args()
+
+    if args.action == "create":
+        print(f"created {maintain_partitions()} partitions")
+    else:
+        with SessionLocal() as session:
+            if args.action == "list":
+                for partitioned in PARTITIONED_TABLES:
+                    print(f"{partitioned}: {', '.join(list_partitions(session, partitioned)) or '-'}")
+            elif args.before is None:
+                parser.error("detach needs --before")
+            else:
+                names = detach_partitions_before(session, args.before)
+                session.commit()
+                print(f"detached {', '.join(names) or 'nothing'}")
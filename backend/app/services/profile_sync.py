@@ -0,0 +1,56 @@
+import logging
+import threading
+
+from sqlalchemy import update
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = ("first_name", "last_name", "username")
+
+_pending: dict[int, dict] = {}
+_lock = threading.Lock()
+
+
+def profile_changes(user: User, tg_user: dict) -> dict:
+    """Return the Telegram profile fields that differ from the stored user."""
+    changes = {}
+    for field in PROFILE_FIELDS:
+        value = tg_user.get(field, getattr(user, field))
+        if value != getattr(user, field):
+            changes[field] = value
+    return changes
+
+
+def queue_profile_update(user_id: int, changes: dict) -> None:
+    """Queue a changed profile; flushes once the batch size is reached."""
+    with _lock:
+        _pending.setdefault(user_id, {}).update(changes)
+        full = len(_pending) >= settings.PROFILE_SYNC_BATCH_SIZE
+    if full:
+        flush_profile_updates()
+
+
+def flush_profile_updates() -> int:
+    """Write all queued profile changes in a single bulk UPDATE."""
+    with _lock:
+        if not _pending:
+            return 0
+        rows = [{"id": user_id, **changes} for user_id, changes in _pending.items()]
+        _pending.clear()
+
+    db = SessionLocal()
+    try:
+        db.execute(update(User), rows)
+        db.commit()
+        logger.info("Flushed %d queued profile updates", len(rows))
+        return len(rows)
+    except Exception:
+        logger.exception("Failed to flush %d queued profile updates", len(rows))
+        db.rollback()
+        return 0
+    finally:
+        db.close()
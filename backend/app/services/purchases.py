@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.product import Product
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.schemas.transaction import TransactionOut
+from app.services.balance import apply_batch
+from app.services.idempotency import (
+    IdempotentRequest,
+    remember_response,
+    replay_response,
+    store_response,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def new_purchase(user_id: int, product: Product, quantity: int) -> Transaction:
+    quantity = max(1, quantity)
+    auto_approve = settings.AUTO_APPROVE_PURCHASES
+    return Transaction(
+        user_id=user_id,
+        product_id=product.id,
+        type="purchase",
+        amount=-(product.price * quantity),
+        quantity=quantity,
+        status="approved" if auto_approve else "pending",
+        created_by_id=user_id,
+    )
+
+
+@dataclass
+class _QueuedPurchase:
+    user_id: int
+    product_id: int
+    quantity: int
+    idempotency_key: IdempotentRequest | None = None
+    future: Future = field(default_factory=Future)
+
+
+class PurchaseBatcher:
+    """Group commit for purchases.
+
+    Request threads enqueue purchases and wait; a single writer thread
+    collects them for up to `window_seconds` or `max_size` items and writes
+    each batch with one multi-row insert, one set-based balance update and
+    one commit, then resolves every waiting request with its transaction.
+    Responses of requests with an Idempotency-Key are stored in the same
+    commit. A batch that fails is retried one purchase at a time, so only
+    the purchases that fail on their own get an error.
+
+    Requests wait at most `timeout_seconds` and get a 503 after that, as
+    they do straight away while the writer is stuck on a batch; a purchase
+    whose request gave up before its batch was taken is not written.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        max_size: int,
+        session_factory=SessionLocal,
+        write_timeout_seconds: float = settings.PURCHASE_BATCH_WRITE_TIMEOUT_SECONDS,
+    ):
+        self.window_seconds = window_seconds
+        self.max_size = max_size
+        self.session_factory = session_factory
+        self.write_timeout_seconds = write_timeout_seconds
+        self._queue: queue.Queue[_QueuedPurchase | None] = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._writing_since: float | None = None
+
+    @property
+    def timeout_seconds(self) -> float:
+        """How long a request waits: the batch being written ahead of it,
+        then its own window and write."""
+        return 2 * (self.window_seconds + self.write_timeout_seconds)
+
+    def is_alive(self) -> bool:
+        """Whether the writer thread runs and is not stuck on a batch."""
+        writing_since = self._writing_since
+        return (
+            self._thread is not None
+            and self._thread.is_alive()
+            and (writing_since is None or time.monotonic() - writing_since < self.write_timeout_seconds)
+        )
+
+    def submit(
+        self,
+        user_id: int,
+        product_id: int,
+        quantity: int,
+        idempotency_key: IdempotentRequest | None = None,
+    ) -> Future:
+        """Queue a purchase; the future resolves to its TransactionOut, or
+        to the stored response of an earlier request with the same key."""
+        self._ensure_started()
+        if not self.is_alive():
+            raise HTTPException(status_code=503, detail="Purchases are not being written, try again later")
+        item = _QueuedPurchase(user_id, product_id, quantity, idempotency_key)
+        self._queue.put(item)
+        return item.future
+
+    def result(self, future: Future):
+        """Wait for a submitted purchase, see submit."""
+        try:
+            return future.result(timeout=self.timeout_seconds)
+        except TimeoutError:
+            raise _timed_out(future) from None
+
+    async def result_async(self, future: Future):
+        try:
+            # A timeout cancels `future` too, through the wrapping future
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout_seconds)
+        except TimeoutError:
+            raise _timed_out(future) from None
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="purchase-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything still queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window_seconds
+            stopping = False
+            while len(batch) < self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            # Taking a purchase makes it running; one whose request timed out
+            # is cancelled and left out
+            batch = [item for item in batch if item.future.set_running_or_notify_cancel()]
+            if batch:
+                self._writing_since = time.monotonic()
+                try:
+                    self._write(batch)
+                finally:
+                    self._writing_since = None
+            if stopping:
+                return
+
+    def _write(self, batch: list[_QueuedPurchase]) -> None:
+        try:
+            self._commit(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+                return
+            # One bad row (a deleted user, a violated constraint) fails the
+            # whole batch; write the rest one by one so only that row fails
+            logger.warning(
+                "Failed to write a batch of %d purchases, retrying them one by one",
+                len(batch), exc_info=True,
+            )
+            for item in batch:
+                if not item.future.done():
+                    self._write([item])
+
+    def _fail(self, item: _QueuedPurchase, error: Exception) -> None:
+        if isinstance(error, IntegrityError) and item.idempotency_key is not None:
+            # A request with the same key committed first: answer with its response
+            db = self.session_factory()
+            try:
+                stored = replay_response(db, item.user_id, item.idempotency_key)
+            except HTTPException as e:
+                item.future.set_exception(e)
+                return
+            finally:
+                db.close()
+            if stored is not None:
+                item.future.set_result(stored)
+                return
+        logger.error("Failed to write a purchase by user %d", item.user_id, exc_info=error)
+        item.future.set_exception(error)
+
+    def _commit(self, batch: list[_QueuedPurchase]) -> None:
+        """Write `batch` in one transaction and resolve its futures; on
+        failure everything is rolled back, the error raised and only the
+        futures of unknown products are resolved."""
+        db = self.session_factory()
+        try:
+            product_ids = {item.product_id for item in batch}
+            products = {
+                p.id: p
+                for p in db.query(Product).filter(Product.id.in_(product_ids), Product.is_active == True)  # noqa: E712
+            }
+            queued = []
+            for item in batch:
+                product = products.get(item.product_id)
+                if product is None:
+                    item.future.set_exception(HTTPException(status_code=404, detail="Product not found"))
+                else:
+                    queued.append((item, new_purchase(item.user_id, product, item.quantity)))
+            if not queued:
+                return
+
+            txs = [tx for _, tx in queued]
+            db.add_all(txs)
+            db.flush()
+            apply_batch(db, [
+                (tx.user_id, "purchase", tx.id, tx.amount) for tx in txs if tx.status == "approved"
+            ])
+            names = dict(
+                db.query(User.id, User.first_name).filter(User.id.in_({tx.user_id for tx in txs}))
+            )
+            results = [
+                (item, _purchase_out(tx, products[tx.product_id].name, names.get(tx.user_id)))
+                for item, tx in queued
+            ]
+            stored = [
+                (item, store_response(db, item.user_id, item.idempotency_key, out))
+                for item, out in results
+                if item.idempotency_key is not None
+            ]
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for item, body in stored:
+            remember_response(item.user_id, item.idempotency_key, body)
+        for item, out in results:
+            item.future.set_result(out)
+
+
+def _timed_out(future: Future) -> HTTPException:
+    if future.cancel():
+        return HTTPException(status_code=503, detail="Purchase timed out and was not made, try again")
+    # Already being written: it may still go through, and a retry with the
+    # same Idempotency-Key gets its response
+    logger.warning("A purchase request timed out while its batch was being written")
+    return HTTPException(status_code=503, detail="Purchase timed out while being written")
+
+
+def _purchase_out(tx: Transaction, product_name: str, user_name: str | None) -> TransactionOut:
+    return TransactionOut(
+        id=tx.id,
+        user_id=tx.user_id,
+        product_id=tx.product_id,
+        type=tx.type,
+        amount=tx.amount,
+        status=tx.status,
+        approved_by_id=tx.approved_by_id,
+        created_by_id=tx.created_by_id,
+        created_by_name=user_name,
+        quantity=tx.quantity,
+        note=tx.note,
+        created_at=tx.created_at,
+        product_name=product_name,
+        user_name=user_name,
+    )
+
+
+purchase_batcher = PurchaseBatcher(
+    settings.PURCHASE_BATCH_WINDOW_MS / 1000, settings.PURCHASE_BATCH_MAX_SIZE
+)
@@ -3,12 +3,19 @@ import logging
 from datetime import datetime, timezone, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
+from app.config import settings
 from app.database import SessionLocal
 from app.models.reward import Reward
 from app.models.reward_grant import RewardGrant
 from app.models.user import User
+from app.services.balance import credit_users
+from app.services.idempotency import purge_expired_keys
+from app.services.ledger import snapshot_balances
 from app.services.messaging import send_event_message
+from app.services.partitions import maintain_partitions
+from app.services.profile_sync import flush_profile_updates
 
 logger = logging.getLogger(__name__)
 
@@ -73,6 +80,7 @@ def process_recurring_rewards():
                 logger.info(f"Granting reward '{reward.name}' to {len(target_users)} users")
 
                 # Grant to each user
+                grants = []
                 for user in target_users:
                     # Create grant record
                     grant = RewardGrant(
@@ -83,9 +91,7 @@ def process_recurring_rewards():
                         granted_by_scheduler=True,
                     )
                     db.add(grant)
-
-                    # Update user balance (auto-approved)
-                    user.balance += reward.amount
+                    grants.append(grant)
 
                     # Send notification
                     send_event_message(
@@ -99,6 +105,13 @@ def process_recurring_rewards():
                         },
                     )
 
+                # Update user balances (auto-approved)
+                db.flush()
+                credit_users(
+                    db, [user.id for user in target_users], reward.amount, "reward",
+                    {grant.user_id: grant.id for grant in grants},
+                )
+
                 # Update next grant date
                 reward.next_grant_date = _calculate_next_grant_date(
                     reward.recurrence_frequency,
@@ -132,6 +145,36 @@ def start_scheduler():
         misfire_grace_time=300,  # 5 minutes grace period
     )
 
+    scheduler.add_job(
+        snapshot_balances,
+        IntervalTrigger(minutes=settings.LEDGER_SNAPSHOT_INTERVAL_MINUTES),
+        id="snapshot_balances",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        purge_expired_keys,
+        IntervalTrigger(hours=1),
+        id="purge_expired_idempotency_keys",
+        replace_existing=True,
+    )
+
+    scheduler.add_job(
+        maintain_partitions,
+        CronTrigger(hour=3, minute=30),
+        id="maintain_partitions",
+        replace_existing=True,
+        misfire_grace_time=3600,
+    )
+
+    if settings.PROFILE_SYNC_MODE == "batched":
+        scheduler.add_job(
+            flush_profile_updates,
+            IntervalTrigger(seconds=settings.PROFILE_SYNC_FLUSH_SECONDS),
+            id="flush_profile_updates",
+            replace_existing=True,
+        )
+
     scheduler.start()
     logger.info("Reward scheduler started")
 
@@ -139,4 +182,5 @@ def start_scheduler():
 def stop_scheduler():
     """Stop the background scheduler"""
     scheduler.shutdown()
+    flush_profile_updates()
     logger.info("Reward scheduler stopped")
@@ -129,21 +129,7 @@ class SlotMachineService:
         return rtp
 
 
-# For debugging/testing
+# For debugging/testing; simulations and alternative tables:
+# python -m benchmarks.simulate_slot_machine
 if __name__ == "__main__":
     print(f"Theoretical RTP: {SlotMachineService.get_theoretical_rtp():.2f}%")
-    print("\nSimulating 100,000 spins:")
-
-    total_bet = 0.0
-    total_won = 0.0
-
-    for _ in range(100000):
-        symbols, win = SlotMachineService.spin()
-        total_bet += SlotMachineService.BET_AMOUNT
-        total_won += win
-
-    actual_rtp = (total_won / total_bet) * 100
-    print(f"Actual RTP: {actual_rtp:.2f}%")
-    print(f"Total bet: {total_bet:.2f}€")
-    print(f"Total won: {total_won:.2f}€")
-    print(f"Net: {total_won - total_bet:.2f}€")
@@ -0,0 +1,100 @@
+import logging
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Statements executed while a `capture_queries` block was active."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: str | None = None
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.statements[statement] += 1
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements run at least `threshold` times: probable N+1 queries."""
+        return [(stmt, n) for stmt, n in self.statements.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryStats]:
+    """Collect statistics of every statement executed in this context."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _one_line(statement: str) -> str:
+    return " ".join(statement.split())
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on the engine and log slow ones.
+
+    Only the SQL text is logged, never bind parameter values.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if settings.SLOW_QUERY_MS and elapsed * 1000 >= settings.SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1f ms): %s", elapsed * 1000, _one_line(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _on_error(exception_context):
+        started = exception_context.connection and exception_context.connection.info.get("query_started_at")
+        if started:
+            started.pop()
+
+
+def report_request(stats: QueryStats, method: str, path: str) -> dict[str, str]:
+    """Log probable N+1 patterns of a request and return debug headers."""
+    repeated = stats.repeated(settings.N_PLUS_ONE_THRESHOLD)
+    for statement, count in repeated:
+        logger.warning(
+            "Probable N+1 in %s %s: %d identical statements: %s",
+            method, path, count, _one_line(statement),
+        )
+    if not settings.SQL_DEBUG:
+        return {}
+    headers = {
+        "X-DB-Queries": str(stats.count),
+        "X-DB-Time": f"{stats.total_seconds * 1000:.1f}",
+    }
+    if repeated:
+        headers["X-DB-N-Plus-One"] = str(sum(count for _, count in repeated))
+    return headers
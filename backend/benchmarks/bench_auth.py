@@ -0,0 +1,69 @@
+"""Micro-benchmark of per-request Telegram init data validation.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_auth
+"""
+
+import hashlib
+import hmac
+import json
+import time
+import timeit
+from urllib.parse import quote, urlencode
+
+from app.auth.telegram import (
+    _derive_secret_key,
+    init_data_cache,
+    validate_init_data,
+    validate_init_data_cached,
+)
+
+BOT_TOKEN = "123456:benchmark-token"
+ITERATIONS = 100_000
+
+
+def build_init_data(bot_token: str) -> str:
+    """Build a correctly signed init data string like the Mini App sends."""
+    fields = {
+        "auth_date": str(int(time.time())),
+        "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+        "user": json.dumps({
+            "id": 279058397,
+            "first_name": "Matti",
+            "last_name": "Meikäläinen",
+            "username": "matti",
+            "language_code": "fi",
+        }, separators=(",", ":")),
+    }
+    check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret_key, check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields, quote_via=quote)
+
+
+def _uncached(init_data: str) -> None:
+    # Emulate the old code path: key derivation on every call
+    _derive_secret_key.cache_clear()
+    validate_init_data(init_data, BOT_TOKEN)
+
+
+def main():
+    init_data = build_init_data(BOT_TOKEN)
+    init_data_cache.clear()
+
+    before = timeit.timeit(lambda: _uncached(init_data), number=ITERATIONS)
+    derived = timeit.timeit(lambda: validate_init_data(init_data, BOT_TOKEN), number=ITERATIONS)
+    cached = timeit.timeit(lambda: validate_init_data_cached(init_data, BOT_TOKEN), number=ITERATIONS)
+
+    per_call = lambda total: total / ITERATIONS * 1e6  # noqa: E731
+    print(f"{ITERATIONS:,} validations of the same init data")
+    print(f"  full validation (before):     {per_call(before):8.2f} µs/request")
+    print(f"  cached secret key only:       {per_call(derived):8.2f} µs/request")
+    print(f"  verified init data cache:     {per_call(cached):8.2f} µs/request")
+    print(f"  speedup:                      {before / cached:8.1f}x")
+    print(f"  cache stats: {init_data_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Measure throughput and peak memory of the streaming transaction export.
+
+Seeds a large transactions table, then runs `export_rows` for each format
+in a fresh child process and reports rows/s, output size and the child's
+peak RSS. With --baseline it also exports by loading every row first, for
+comparison. Run from the backend directory:
+
+    python -m benchmarks.bench_export --rows 5000000
+
+Uses a scratch SQLite database unless BENCH_DATABASE_URL points at a
+throwaway Postgres database; its tables are dropped and recreated. Only
+Postgres uses a true server-side cursor, but SQLite also steps through
+rows on demand, so both show flat memory.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_scratch = os.path.join(tempfile.gettempdir(), "piikki_export.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch}")
+os.environ["SLOW_QUERY_MS"] = "0"
+
+import app.models  # noqa: E402, F401
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.transaction import Transaction  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.export import DATASETS, _csv, export_rows  # noqa: E402
+
+USERS = 1000
+CHUNK = 50_000
+
+
+def seed(rows: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all(User(telegram_id=1000 + i, first_name=f"User {i}") for i in range(USERS))
+        db.add(Product(name="Olut", price=1.0))
+        db.commit()
+
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(insert(Transaction), [
+                {
+                    "user_id": 1 + i % USERS,
+                    "product_id": 1,
+                    "type": "purchase",
+                    "amount": -1.0,
+                    "status": "approved",
+                    "quantity": 1,
+                    "created_at": start + timedelta(seconds=i),
+                    "updated_at": start,
+                }
+                for i in range(offset, min(offset + CHUNK, rows))
+            ])
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _materialized():
+    # What a naive export does: fetch everything, then render
+    stmt, _ = DATASETS["transactions"]
+    with SessionLocal() as db:
+        rows = db.execute(stmt).all()
+    yield _csv(rows)
+
+
+def _export(mode: str, fmt: str, results) -> None:
+    rows = size = 0
+    start = time.perf_counter()
+    chunks = _materialized() if mode == "baseline" else export_rows("transactions", fmt)
+    for chunk in chunks:
+        size += len(chunk)
+        rows += chunk.count("\n")
+    results.put((rows, size, time.perf_counter() - start, _peak_rss_mb()))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--baseline", action="store_true", help="also export by loading all rows")
+    args = parser.parse_args()
+
+    print(f"seeding {args.rows} transactions...")
+    seed(args.rows)
+    engine.dispose()
+
+    runs = [("streaming", "csv"), ("streaming", "ndjson")]
+    if args.baseline:
+        runs.append(("baseline", "csv"))
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'mode':<11}{'format':<8}{'lines':>10}{'MB out':>9}{'rows/s':>10}{'peak RSS MB':>13}")
+    for mode, fmt in runs:
+        results = context.Queue()
+        child = context.Process(target=_export, args=(mode, fmt, results))
+        child.start()
+        lines, size, elapsed, peak = results.get()
+        child.join()
+        print(
+            f"{mode:<11}{fmt:<8}{lines:>10}{size / 1e6:>9.0f}"
+            f"{args.rows / elapsed:>10.0f}{peak:>13.0f}"
+        )
+
+    if not os.environ.get("BENCH_DATABASE_URL") and os.path.exists(_scratch):
+        os.remove(_scratch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
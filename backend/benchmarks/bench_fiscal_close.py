@@ -0,0 +1,156 @@
+"""Time closing a fiscal period with tens of thousands of debtors.
+
+Seeds users of whom --debtors have a negative balance, then closes the
+period through the endpoint and reports the request time, statement count
+and the background notification pass separately (messages are counted, not
+sent). With --baseline it first times the old per-user close on the same
+data, for comparison. Checks that every debtor got one debt and one ledger
+entry and that no balance is left negative. Run from the backend directory:
+
+    python -m benchmarks.bench_fiscal_close --debtors 50000
+
+Uses a scratch SQLite database unless BENCH_DATABASE_URL points at a
+throwaway Postgres database; its tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+_scratch = os.path.join(tempfile.gettempdir(), "piikki_fiscal_close.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch}")
+os.environ["DEV_MODE"] = "true"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["ASYNC_DB"] = "false"
+os.environ["SLOW_QUERY_MS"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, func, insert, select  # noqa: E402
+
+import app.models  # noqa: E402, F401
+from app.auth.telegram import _new_dev_user  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.fiscal_debt import FiscalDebt  # noqa: E402
+from app.models.fiscal_period import FiscalPeriod  # noqa: E402
+from app.models.ledger_entry import LedgerEntry  # noqa: E402
+from app.models.message_template import MessageTemplate  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routers import fiscal as fiscal_router  # noqa: E402
+from app.services import fiscal as fiscal_service  # noqa: E402
+from app.services import messaging  # noqa: E402
+from app.services.ledger import record_balance_resets  # noqa: E402
+
+CHUNK = 10_000
+
+
+def seed(debtors: int, others: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add(_new_dev_user())
+        db.add(FiscalPeriod())
+        db.add(MessageTemplate(
+            event_type="fiscal_period_closed",
+            template="{user}, you owe {amount} EUR",
+            is_active=True,
+        ))
+        db.commit()
+
+    rows = [
+        {
+            "telegram_id": 1000 + i,
+            "first_name": f"User {i}",
+            "balance": -(1 + i % 97) if i < debtors else i % 13,
+        }
+        for i in range(debtors + others)
+    ]
+    with engine.begin() as conn:
+        for start in range(0, len(rows), CHUNK):
+            conn.execute(insert(User), rows[start:start + CHUNK])
+
+
+def legacy_close() -> None:
+    # The close as it used to be: one ORM object and INSERT per debtor
+    with SessionLocal() as db:
+        current = db.query(FiscalPeriod).filter(FiscalPeriod.ended_at.is_(None)).first()
+        now = datetime.now(timezone.utc)
+        current.ended_at = now
+        debtors = db.query(User).filter(User.is_active == True, User.balance < 0).all()  # noqa: E712
+        for user in debtors:
+            db.add(FiscalDebt(
+                fiscal_period_id=current.id, user_id=user.id,
+                amount=abs(user.balance), status="unpaid",
+            ))
+        record_balance_resets(db, User.balance < 0, kind="fiscal_reset", reference_id=current.id)
+        db.query(User).filter(User.balance < 0).update({User.balance: 0.0})
+        db.add(FiscalPeriod(started_at=now))
+        db.flush()
+        # Rolled back so the set-based close runs on the same data
+        db.rollback()
+
+
+def count_statements():
+    counter = [0]
+
+    def record(*_args):
+        counter[0] += 1
+
+    event.listen(engine, "before_cursor_execute", record)
+    return counter, lambda: event.remove(engine, "before_cursor_execute", record)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--debtors", type=int, default=50_000)
+    parser.add_argument("--others", type=int, default=10_000, help="users without debt")
+    parser.add_argument("--baseline", action="store_true", help="also time the per-user close")
+    args = parser.parse_args()
+
+    print(f"seeding {args.debtors} debtors and {args.others} other users...")
+    seed(args.debtors, args.others)
+
+    if args.baseline:
+        start = time.perf_counter()
+        legacy_close()
+        print(f"per-user close:      {time.perf_counter() - start:8.2f} s")
+
+    client = TestClient(app)
+    sent = []
+    # Background tasks run inside the TestClient call; time them on their own
+    with mock.patch.object(fiscal_router, "notify_debtors", lambda period_id: sent.append(period_id)):
+        counter, stop = count_statements()
+        start = time.perf_counter()
+        response = client.post("/api/fiscal-periods/close")
+        elapsed = time.perf_counter() - start
+        stop()
+    if response.status_code != 200:
+        print(f"close returned {response.status_code}: {response.text}")
+        return 1
+    result = response.json()
+    print(f"set-based close:     {elapsed:8.2f} s  ({counter[0]} statements)")
+
+    with mock.patch.object(messaging, "send_message", lambda chat_id, text: True):
+        start = time.perf_counter()
+        notified = fiscal_service.notify_debtors(result["closed_period_id"])
+        print(f"notification pass:   {time.perf_counter() - start:8.2f} s  ({notified} messages)")
+
+    with SessionLocal() as db:
+        debts = db.scalar(select(func.count()).select_from(FiscalDebt))
+        entries = db.scalar(select(func.count()).select_from(LedgerEntry))
+        negative = db.scalar(select(func.count()).where(User.balance < 0))
+    ok = result["debts_created"] == debts == entries == notified == args.debtors and negative == 0
+    print(f"debts {debts}, ledger entries {entries}, negative balances left {negative}")
+
+    engine.dispose()
+    if not os.environ.get("BENCH_DATABASE_URL") and os.path.exists(_scratch):
+        os.remove(_scratch)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Compare per-request commits with the purchase group-commit batcher.
+
+Runs bursts of purchases from 1, 10 and 100 concurrent buyers, once through
+the `create_purchase` handler with its own commit per request and once
+through `purchase_batcher`, and reports throughput and latency
+percentiles. Every purchase carries a fresh Idempotency-Key, as the Mini App
+sends. Run from the backend directory:
+
+    python -m benchmarks.bench_group_commit --purchases 20
+
+Uses a scratch SQLite database unless BENCH_DATABASE_URL points at a
+throwaway Postgres database; its tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+_scratch = os.path.join(tempfile.gettempdir(), "piikki_group_commit.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch}")
+os.environ["DB_POOL_SIZE"] = "110"
+os.environ["SLOW_QUERY_MS"] = "0"
+os.environ["AUTO_APPROVE_PURCHASES"] = "true"
+
+import app.models  # noqa: E402, F401
+from app.auth.session import SessionUser  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.routers.transactions import create_purchase  # noqa: E402
+from app.schemas.transaction import PurchaseRequest  # noqa: E402
+from app.services.idempotency import IdempotentRequest  # noqa: E402
+from app.services.purchases import PurchaseBatcher  # noqa: E402
+
+CONCURRENCY = (1, 10, 100)
+
+
+def seed(buyers: int) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all(User(telegram_id=1000 + i, first_name=f"Buyer {i}") for i in range(buyers))
+        product = Product(name="Olut", price=1.0)
+        db.add(product)
+        db.commit()
+        return product.id
+
+
+def new_key() -> IdempotentRequest:
+    return IdempotentRequest(key=uuid.uuid4().hex, fingerprint="purchase")
+
+
+def per_request(user_id: int, product_id: int) -> None:
+    db = SessionLocal()
+    try:
+        create_purchase(
+            PurchaseRequest(product_id=product_id), SessionUser(user_id, True, False), db, new_key()
+        )
+    finally:
+        db.close()
+
+
+def run(buyers: int, purchases: int, purchase) -> tuple[float, list[float], int]:
+    def buyer(user_id: int) -> tuple[list[float], int]:
+        latencies, errors = [], 0
+        for _ in range(purchases):
+            start = time.perf_counter()
+            try:
+                purchase(user_id)
+            except Exception:
+                # e.g. SQLite lock timeouts under per-request contention
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=buyers) as pool:
+        results = list(pool.map(buyer, range(1, buyers + 1)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for buyer_latencies, _ in results for latency in buyer_latencies]
+    return elapsed, latencies, sum(errors for _, errors in results)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    return statistics.quantiles(values, n=100)[int(pct) - 1] if len(values) > 1 else values[0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--purchases", type=int, default=20, help="purchases per buyer")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-size", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'mode':<14}{'buyers':>7}{'purchases/s':>13}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for buyers in CONCURRENCY:
+        product_id = seed(max(CONCURRENCY))
+        batcher = PurchaseBatcher(args.window_ms / 1000, args.max_size)
+        modes = {
+            "per-request": lambda user_id: per_request(user_id, product_id),
+            "group commit": lambda user_id: batcher.submit(user_id, product_id, 1, new_key()).result(),
+        }
+        expected = 0
+        for name, purchase in modes.items():
+            elapsed, latencies, errors = run(buyers, args.purchases, purchase)
+            expected += len(latencies)
+            print(
+                f"{name:<14}{buyers:>7}{len(latencies) / elapsed:>13.0f}"
+                f"{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 99) * 1000:>9.2f}"
+                f"{errors:>8}"
+            )
+        batcher.stop()
+
+        with SessionLocal() as db:
+            charged = -sum(balance for (balance,) in db.query(User.balance))
+        if charged != expected:
+            print(f"balance mismatch: charged {charged:.0f}, expected {expected}")
+            return 1
+
+    engine.dispose()
+    if not os.environ.get("BENCH_DATABASE_URL") and os.path.exists(_scratch):
+        os.remove(_scratch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Measure what the ledger insert adds to a balance change.
+
+Runs balance changes from 1, 10 and 50 concurrent writers, each in its own
+transaction, once as the bare balance UPDATE and once through `apply_delta`,
+which also appends the ledger entry. Every writer either hits the same hot
+user, as a bar tab during a rush does, or a user of its own. Reports
+throughput, latency percentiles and failed changes. Run from the backend
+directory:
+
+    python -m benchmarks.bench_ledger_overhead --changes 200
+
+Uses a scratch SQLite database unless BENCH_DATABASE_URL points at a
+throwaway Postgres database; its tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_scratch = os.path.join(tempfile.gettempdir(), "piikki_ledger_overhead.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch}")
+os.environ["DB_POOL_SIZE"] = "60"
+os.environ["SLOW_QUERY_MS"] = "0"
+
+import app.models  # noqa: E402, F401
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.ledger_entry import LedgerEntry  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.balance import _delta_statement, apply_delta  # noqa: E402
+
+CONCURRENCY = (1, 10, 50)
+
+
+def seed(users: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        db.add_all(User(telegram_id=1000 + i, first_name=f"Buyer {i}") for i in range(users))
+        db.commit()
+
+
+def update_only(user_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(_delta_statement(user_id, -1.0, None, None)).scalar_one()
+        db.commit()
+
+
+def with_ledger(user_id: int) -> None:
+    with SessionLocal() as db:
+        apply_delta(db, user_id, -1.0, "purchase")
+        db.commit()
+
+
+def run(writers: int, changes: int, change, hot: bool) -> tuple[float, list[float], int]:
+    def writer(n: int) -> tuple[list[float], int]:
+        user_id = 1 if hot else n
+        latencies, errors = [], 0
+        for _ in range(changes):
+            start = time.perf_counter()
+            try:
+                change(user_id)
+            except Exception:
+                # e.g. SQLite lock timeouts
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        results = list(pool.map(writer, range(1, writers + 1)))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for writer_latencies, _ in results for latency in writer_latencies]
+    return elapsed, latencies, sum(errors for _, errors in results)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    return statistics.quantiles(values, n=100)[int(pct) - 1] if len(values) > 1 else values[0]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--changes", type=int, default=200, help="balance changes per writer")
+    args = parser.parse_args()
+
+    modes = {"update only": update_only, "with ledger": with_ledger}
+    print(f"{'mode':<13}{'users':>7}{'writers':>9}{'changes/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for hot in (True, False):
+        for writers in CONCURRENCY:
+            for name, change in modes.items():
+                seed(max(CONCURRENCY))
+                elapsed, latencies, errors = run(writers, args.changes, change, hot)
+                print(
+                    f"{name:<13}{'hot' if hot else 'spread':>7}{writers:>9}"
+                    f"{len(latencies) / elapsed:>11.0f}"
+                    f"{percentile(latencies, 50) * 1000:>9.2f}{percentile(latencies, 99) * 1000:>9.2f}"
+                    f"{errors:>8}"
+                )
+
+                with SessionLocal() as db:
+                    charged = -sum(balance for (balance,) in db.query(User.balance))
+                    entries = db.query(LedgerEntry).count()
+                expected_entries = len(latencies) if change is with_ledger else 0
+                if charged != len(latencies) or entries != expected_entries:
+                    print(f"mismatch: charged {charged:.0f}, {entries} entries for {len(latencies)} changes")
+                    return 1
+
+    engine.dispose()
+    if not os.environ.get("BENCH_DATABASE_URL") and os.path.exists(_scratch):
+        os.remove(_scratch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Compare OFFSET and keyset pagination of /transactions/mine at deep pages.
+
+Seeds one user with a long transaction history and times fetching a page
+at increasing depths, once with LIMIT/OFFSET and once with the `keyset`
+helper from app.pagination. OFFSET latency grows with the depth; keyset
+pages are an index range scan on ix_transactions_user_id_created_at_id and
+stay flat. Run from the backend directory:
+
+    python -m benchmarks.bench_pagination --rows 2000000
+
+Uses a scratch SQLite database unless BENCH_DATABASE_URL points at a
+throwaway Postgres database; its tables are dropped and recreated.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_scratch = os.path.join(tempfile.gettempdir(), "piikki_pagination.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch}")
+os.environ["SLOW_QUERY_MS"] = "0"
+
+import app.models  # noqa: E402, F401
+from sqlalchemy import insert  # noqa: E402
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.transaction import Transaction  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.pagination import PageParams, encode_cursor, keyset  # noqa: E402
+from app.routers.transactions import _TX_PAGE_KEYS  # noqa: E402
+
+DEPTHS = (0, 0.01, 0.1, 0.5, 0.9)
+CHUNK = 50_000
+
+
+def seed(rows: int) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        user = User(telegram_id=1, first_name="Regular")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    start = datetime(2020, 1, 1)
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            conn.execute(insert(Transaction), [
+                {
+                    "user_id": user_id,
+                    "type": "purchase",
+                    "amount": -1.0,
+                    "status": "approved",
+                    "quantity": 1,
+                    # Several rows per second so the id tiebreaker matters
+                    "created_at": start + timedelta(seconds=i // 3),
+                    "updated_at": start,
+                }
+                for i in range(offset, min(offset + CHUNK, rows))
+            ])
+    return user_id
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"seeding {args.rows} transactions...")
+    user_id = seed(args.rows)
+
+    print(f"{'offset':>10}{'offset ms':>12}{'keyset ms':>12}")
+    with SessionLocal() as db:
+        mine = db.query(Transaction).filter(Transaction.user_id == user_id)
+        ordered = mine.order_by(Transaction.created_at.desc(), Transaction.id.desc())
+        for depth in DEPTHS:
+            offset = int((args.rows - args.page_size) * depth)
+            cursor = None
+            if offset:
+                # Cursor of the row just before the page, as a client paging down would hold
+                before = ordered.offset(offset - 1).first()
+                cursor = encode_cursor(_TX_PAGE_KEYS, before)
+            page = PageParams(cursor=cursor, limit=args.page_size)
+
+            by_offset = ordered.offset(offset).limit(args.page_size)
+            by_keyset = keyset(mine, _TX_PAGE_KEYS, page)
+            if [tx.id for tx in by_offset] != [tx.id for tx in by_keyset][: args.page_size]:
+                print(f"page mismatch at offset {offset}")
+                return 1
+
+            offset_s = timed(lambda: by_offset.all(), args.repeat)
+            keyset_s = timed(lambda: by_keyset.all(), args.repeat)
+            print(f"{offset:>10}{offset_s * 1000:>12.2f}{keyset_s * 1000:>12.2f}")
+            db.expunge_all()
+
+    engine.dispose()
+    if not os.environ.get("BENCH_DATABASE_URL") and os.path.exists(_scratch):
+        os.remove(_scratch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Time /transactions/search for typical admin filters on a large table.
+
+Seeds transactions for many users and products with short notes, then
+requests the first page (which includes the total count) and a later page
+for each filter set and reports median latencies and the reported totals.
+The target is under 50 ms per request on 10M rows in Postgres. Run from
+the backend directory:
+
+    python -m benchmarks.bench_search --rows 1000000
+
+Uses a scratch SQLite database unless BENCH_DATABASE_URL points at a
+throwaway Postgres database; its tables are dropped and recreated. SQLite
+has no trigram index and no planner estimates, so note searches there scan
+the table and totals are always exact.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+_scratch = os.path.join(tempfile.gettempdir(), "piikki_search.db")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL", f"sqlite:///{_scratch}")
+os.environ["DEV_MODE"] = "true"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["ASYNC_DB"] = "false"
+os.environ["SLOW_QUERY_MS"] = "0"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+
+import app.models  # noqa: E402, F401
+from app.auth.telegram import _new_dev_user  # noqa: E402
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.models.transaction import Transaction  # noqa: E402
+from app.models.user import User  # noqa: E402
+
+USERS = 2000
+PRODUCTS = 20
+DAYS = 730
+CHUNK = 50_000
+NOTES = [None, None, None, "sauna night", "cash to Matti", "MobilePay", "tab from the cottage trip"]
+END = datetime(2026, 1, 1)
+
+FILTERS = {
+    "no filter": "",
+    "user": "?user_id=42",
+    "user + product": "?user_id=42&product_id=3",
+    "product, last month": f"?product_id=3&start={(END - timedelta(days=30)).date()}&end={END.date()}",
+    "pending": "?status=pending",
+    "payments >= 20": "?type=payment&min_amount=20",
+    "note 'cottage'": "?note=cottage",
+}
+
+
+def seed(rows: int) -> None:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    rng = random.Random(0)
+    with SessionLocal() as db:
+        db.add(_new_dev_user())
+        db.flush()
+        db.add_all(User(telegram_id=1000 + i, first_name=f"User {i}") for i in range(USERS))
+        db.add_all(Product(name=f"Product {i}", price=1.0 + i % 5) for i in range(PRODUCTS))
+        db.commit()
+
+    start = END - timedelta(days=DAYS)
+    with engine.begin() as conn:
+        for offset in range(0, rows, CHUNK):
+            batch = []
+            for _ in range(min(CHUNK, rows - offset)):
+                purchase = rng.random() < 0.9
+                batch.append({
+                    "user_id": rng.randint(1, USERS + 1),
+                    "product_id": rng.randint(1, PRODUCTS) if purchase else None,
+                    "type": "purchase" if purchase else "payment",
+                    "amount": -float(rng.randint(1, 5)) if purchase else float(rng.randint(5, 50)),
+                    "status": "pending" if rng.random() < 0.01 else "approved",
+                    "quantity": 1,
+                    "note": rng.choice(NOTES),
+                    "created_at": start + timedelta(seconds=rng.uniform(0, DAYS * 86400)),
+                    "updated_at": start,
+                })
+            conn.execute(insert(Transaction), batch)
+        conn.execute(text("ANALYZE"))
+
+
+def timed(client: TestClient, path: str, repeat: int) -> tuple[float, object]:
+    samples, response = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(path)
+        samples.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.text}")
+    return statistics.median(samples), response
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"seeding {args.rows} transactions...")
+    seed(args.rows)
+    client = TestClient(app)
+
+    print(f"{'filter':<22}{'first ms':>10}{'next ms':>10}{'total':>12}")
+    for name, query in FILTERS.items():
+        path = "/api/transactions/search" + query
+        first_s, response = timed(client, path, args.repeat)
+        total = response.headers["X-Total-Count"]
+        if response.headers["X-Total-Count-Estimated"] == "true":
+            total = f"~{total}"
+        cursor = response.headers.get("X-Next-Cursor")
+        next_s = 0.0
+        if cursor:
+            separator = "&" if "?" in path else "?"
+            next_s, _ = timed(client, f"{path}{separator}cursor={cursor}", args.repeat)
+        print(f"{name:<22}{first_s * 1000:>10.1f}{next_s * 1000:>10.1f}{total:>12}")
+
+    engine.dispose()
+    if not os.environ.get("BENCH_DATABASE_URL") and os.path.exists(_scratch):
+        os.remove(_scratch)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""Simulate the slot machine with NumPy and compare pay tables.
+
+Draws millions of spins per pay table in vectorized chunks and reports the
+RTP with a confidence interval, hit frequency, volatility (standard
+deviation of the payout per spin, in bets) and how often each outcome came
+up against its exact probability. Every table is cross-checked three ways:
+the simulated RTP must lie within --tolerance standard errors of the exact
+RTP, `SlotMachineService.get_theoretical_rtp` must agree with the exact
+RTP, and a sample of the vectorized payouts must match
+`SlotMachineService._calculate_payout`. Exits non-zero if any check fails.
+Run from the backend directory:
+
+    python -m benchmarks.simulate_slot_machine --spins 10000000
+
+Alternative tables are given as NAME:WEIGHTS:PAYOUTS with comma-separated
+values in SYMBOLS order; an empty part keeps the production values:
+
+    python -m benchmarks.simulate_slot_machine \\
+        --table "rarer sevens:30,25,21,15,7,2:" --table "richer bells::4,7,15,15,50,50"
+
+Needs NumPy, which the backend itself does not: pip install numpy
+"""
+
+import argparse
+import random
+import sys
+import time
+from dataclasses import dataclass
+from statistics import NormalDist
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit("simulate_slot_machine needs NumPy: pip install numpy")
+
+from app.services.slot_machine import SlotMachineService
+
+CHUNK = 1_000_000
+CROSS_CHECK_SPINS = 10_000
+
+
+@dataclass(frozen=True)
+class PayTable:
+    name: str
+    weights: tuple[float, ...]
+    payouts: tuple[float, ...]  # three of a kind, per symbol, in bets
+
+    @classmethod
+    def production(cls) -> "PayTable":
+        return cls(
+            "production",
+            tuple(SlotMachineService.SYMBOL_WEIGHTS),
+            tuple(SlotMachineService.PAYOUTS[symbol] for symbol in SlotMachineService.SYMBOLS),
+        )
+
+    @classmethod
+    def parse(cls, spec: str) -> "PayTable":
+        name, weights, payouts = spec.split(":")
+        base = cls.production()
+        table = cls(
+            name,
+            tuple(float(w) for w in weights.split(",")) if weights else base.weights,
+            tuple(float(p) for p in payouts.split(",")) if payouts else base.payouts,
+        )
+        symbols = len(SlotMachineService.SYMBOLS)
+        if len(table.weights) != symbols or len(table.payouts) != symbols:
+            raise ValueError(f"{name}: need {symbols} weights and {symbols} payouts")
+        return table
+
+    def service(self) -> type[SlotMachineService]:
+        """SlotMachineService with this table, for the cross-checks."""
+        return type(f"SlotMachine[{self.name}]", (SlotMachineService,), {
+            "SYMBOL_WEIGHTS": list(self.weights),
+            "PAYOUTS": dict(zip(SlotMachineService.SYMBOLS, self.payouts)),
+        })
+
+    def probabilities(self) -> np.ndarray:
+        weights = np.asarray(self.weights, dtype=float)
+        return weights / weights.sum()
+
+    def outcomes(self) -> tuple[np.ndarray, np.ndarray]:
+        """Exact probability and payout, in bets, of every outcome: three of
+        each symbol, then any pair, then no match."""
+        p = self.probabilities()
+        three = p ** 3
+        pair = (3 * p ** 2 * (1 - p)).sum()
+        probability = np.append(three, [pair, 1 - three.sum() - pair])
+        payout = np.append(np.asarray(self.payouts, dtype=float), [1.0, 0.0])
+        return probability, payout
+
+
+def payout_outcomes(reels: np.ndarray, symbols: int) -> np.ndarray:
+    """Outcome index of each spin in `reels` (spins x 3 symbol indexes), in
+    the order of PayTable.outcomes."""
+    a, b, c = reels.T
+    three = (a == b) & (b == c)
+    pair = (a == b) | (b == c) | (a == c)
+    return np.where(three, a, np.where(pair, symbols, symbols + 1))
+
+
+def simulate(table: PayTable, spins: int, rng: np.random.Generator) -> np.ndarray:
+    """Count how often each outcome comes up in `spins` spins."""
+    symbols = len(table.weights)
+    p = table.probabilities()
+    counts = np.zeros(symbols + 2, dtype=np.int64)
+    for start in range(0, spins, CHUNK):
+        reels = rng.choice(symbols, size=(min(CHUNK, spins - start), 3), p=p).astype(np.int8)
+        counts += np.bincount(payout_outcomes(reels, symbols), minlength=symbols + 2)
+    return counts
+
+
+def cross_check_payouts(table: PayTable, rng: np.random.Generator) -> int:
+    """Number of sample spins whose vectorized payout differs from the
+    service's own `_calculate_payout`."""
+    service = table.service()
+    symbols = len(table.weights)
+    reels = rng.choice(symbols, size=(CROSS_CHECK_SPINS, 3), p=table.probabilities())
+    _, payout = table.outcomes()
+    vectorized = payout[payout_outcomes(reels, symbols)]
+    names = np.asarray(SlotMachineService.SYMBOLS)
+    return sum(
+        service._calculate_payout(list(names[row]), 1.0) != expected
+        for row, expected in zip(reels, vectorized)
+    )
+
+
+@dataclass
+class Report:
+    table: PayTable
+    spins: int
+    seconds: float
+    exact_rtp: float
+    service_rtp: float
+    rtp: float
+    rtp_margin: float
+    z: float
+    hit_frequency: float
+    volatility: float
+    exact_volatility: float
+    counts: np.ndarray
+    probability: np.ndarray
+    payout: np.ndarray
+    payout_mismatches: int
+
+
+def analyse(table: PayTable, spins: int, confidence: float, rng: np.random.Generator) -> Report:
+    probability, payout = table.outcomes()
+    start = time.perf_counter()
+    counts = simulate(table, spins, rng)
+    seconds = time.perf_counter() - start
+
+    mean = counts @ payout / spins
+    variance = counts @ payout ** 2 / spins - mean ** 2
+    exact_mean = probability @ payout
+    exact_variance = probability @ payout ** 2 - exact_mean ** 2
+    z_confidence = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return Report(
+        table=table,
+        spins=spins,
+        seconds=seconds,
+        exact_rtp=exact_mean * 100,
+        service_rtp=table.service().get_theoretical_rtp(),
+        rtp=mean * 100,
+        rtp_margin=z_confidence * (variance / spins) ** 0.5 * 100,
+        # Against the exact standard error, which does not depend on the sample
+        z=(mean - exact_mean) / (exact_variance / spins) ** 0.5,
+        hit_frequency=counts[payout > 0].sum() / spins * 100,
+        volatility=variance ** 0.5,
+        exact_volatility=exact_variance ** 0.5,
+        counts=counts,
+        probability=probability,
+        payout=payout,
+        payout_mismatches=cross_check_payouts(table, rng),
+    )
+
+
+def print_reports(reports: list[Report], confidence: float) -> None:
+    width = max(24, *(len(r.table.name) + 2 for r in reports))
+
+    def row(label: str, values) -> None:
+        print(f"{label:<28}" + "".join(f"{value:>{width}}" for value in values))
+
+    row("", [r.table.name for r in reports])
+    row("weights", [",".join(f"{w:g}" for w in r.table.weights) for r in reports])
+    row("payouts", [",".join(f"{p:g}" for p in r.table.payouts) for r in reports])
+    row("spins", [f"{r.spins:,}" for r in reports])
+    row("spins/s", [f"{r.spins / r.seconds:,.0f}" for r in reports])
+    row("exact RTP %", [f"{r.exact_rtp:.4f}" for r in reports])
+    row("get_theoretical_rtp %", [f"{r.service_rtp:.4f}" for r in reports])
+    row(f"simulated RTP % ({confidence:.0%} CI)", [f"{r.rtp:.4f} ± {r.rtp_margin:.4f}" for r in reports])
+    row("z vs exact", [f"{r.z:+.2f}" for r in reports])
+    row("hit frequency %", [f"{r.hit_frequency:.3f}" for r in reports])
+    row("volatility (sd, bets)", [f"{r.volatility:.4f} ({r.exact_volatility:.4f})" for r in reports])
+    row("payout mismatches", [f"{r.payout_mismatches}/{CROSS_CHECK_SPINS}" for r in reports])
+
+    labels = [f"3x {symbol}" for symbol in SlotMachineService.SYMBOLS] + ["pair", "no match"]
+    for r in reports:
+        print(f"\n{r.table.name}")
+        print(f"{'outcome':<12}{'pays':>8}{'observed %':>13}{'exact %':>11}{'RTP share %':>13}")
+        for index, label in enumerate(labels):
+            share = r.probability[index] * r.payout[index] / (r.exact_rtp / 100) * 100
+            print(
+                f"{label:<12}{r.payout[index]:>7g}x{r.counts[index] / r.spins * 100:>13.4f}"
+                f"{r.probability[index] * 100:>11.4f}{share:>13.1f}"
+            )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--spins", type=int, default=10_000_000, help="spins per table")
+    parser.add_argument(
+        "--table", action="append", default=[], type=PayTable.parse,
+        help="alternative table as NAME:WEIGHTS:PAYOUTS (repeatable)",
+    )
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument(
+        "--tolerance", type=float, default=4.0,
+        help="standard errors the simulated RTP may stray from the exact RTP",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = np.random.default_rng(seed)
+    tables = [PayTable.production(), *args.table]
+    reports = [analyse(table, args.spins, args.confidence, rng) for table in tables]
+
+    print(f"seed {seed}\n")
+    print_reports(reports, args.confidence)
+
+    failures = []
+    for r in reports:
+        if abs(r.z) > args.tolerance:
+            failures.append(f"{r.table.name}: simulated RTP is {r.z:+.1f} standard errors from exact")
+        if abs(r.service_rtp - r.exact_rtp) > 1e-9:
+            failures.append(f"{r.table.name}: get_theoretical_rtp differs from the exact RTP")
+        if r.payout_mismatches:
+            failures.append(f"{r.table.name}: vectorized payouts differ from _calculate_payout")
+    for failure in failures:
+        print(failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
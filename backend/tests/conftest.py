@@ -0,0 +1,49 @@
+"""Shared fixtures. Run from the backend directory:
+
+    python -m pytest
+
+Tests use a scratch SQLite database unless TEST_DATABASE_URL points at a
+throwaway Postgres database; tables are dropped and recreated as tests
+seed their data. The settings below must be in place before anything
+imports app.config, so this module sets them at import time.
+"""
+
+import os
+import tempfile
+
+_scratch = os.path.join(tempfile.mkdtemp(prefix="piikki_tests_"), "test.db")
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL") or f"sqlite:///{_scratch}"
+os.environ["DATABASE_READ_URL"] = ""
+os.environ["ASYNC_DB"] = "false"
+os.environ["DEV_MODE"] = "true"
+os.environ["SQL_DEBUG"] = "true"
+os.environ["SLOW_QUERY_MS"] = "0"  # lock waits are expected in the concurrency tests
+os.environ["DB_POOL_SIZE"] = "32"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+import app.models  # noqa: E402, F401
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+
+if engine.dialect.name == "sqlite":
+    # Enforce foreign keys like Postgres does, and let the concurrency tests'
+    # writers queue for the database lock instead of giving up after 5s
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, _record):
+        dbapi_connection.execute("PRAGMA foreign_keys = ON")
+        dbapi_connection.execute("PRAGMA busy_timeout = 60000")
+
+
+@pytest.fixture(scope="session")
+def client() -> TestClient:
+    # Not entered as a context manager: no migrations, seed data or scheduler
+    return TestClient(app)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _dispose_engine():
+    yield
+    engine.dispose()
@@ -0,0 +1,71 @@
+"""Hammer one user's balance from many threads through `apply_delta`.
+
+Every update must land, and a floor must hold however many debits race
+for the last of the headroom.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+from app.models.user import User
+from app.services.balance import apply_delta
+
+THREADS = 16
+ITERATIONS = 200
+
+
+def hammer(fn, *args) -> list:
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return list(pool.map(lambda _: fn(*args), range(THREADS * ITERATIONS)))
+
+
+def credit(user_id: int) -> bool:
+    with SessionLocal() as db:
+        ok = apply_delta(db, user_id, 1.0, "adjustment") is not None
+        db.commit()
+        return ok
+
+
+def debit(user_id: int, floor: float) -> bool:
+    with SessionLocal() as db:
+        ok = apply_delta(db, user_id, -1.0, "adjustment", floor=floor) is not None
+        db.commit()
+        return ok
+
+
+def balance_of(user_id: int) -> float:
+    with SessionLocal() as db:
+        return db.get(User, user_id).balance
+
+
+@pytest.fixture
+def user_id() -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        user = User(telegram_id=1, first_name="Stress")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def test_concurrent_deltas_lose_no_updates(user_id):
+    results = hammer(credit, user_id)
+
+    assert all(results)
+    assert balance_of(user_id) == THREADS * ITERATIONS
+
+
+def test_floor_holds_under_concurrent_debits(user_id):
+    # Start 10 above the floor: exactly 10 debits may succeed
+    floor = -50.0
+    with SessionLocal() as db:
+        db.query(User).filter(User.id == user_id).update({User.balance: floor + 10})
+        db.commit()
+
+    results = hammer(debit, user_id, floor)
+
+    assert sum(results) == 10
+    assert balance_of(user_id) == floor
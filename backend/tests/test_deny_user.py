@@ -0,0 +1,47 @@
+"""Denying a pending user removes them along with their disposable rows,
+but never the balance history of a user who had one."""
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+from app.models.idempotency_key import IdempotencyKey
+from app.models.ledger_entry import LedgerEntry
+from app.models.user import User
+
+
+@pytest.fixture
+def pending_user_id(client) -> int:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    client.get("/api/me")  # creates the dev admin
+    with SessionLocal() as db:
+        user = User(telegram_id=1000, first_name="Pending", is_active=False)
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def test_deny_removes_stored_idempotency_keys(client, pending_user_id):
+    with SessionLocal() as db:
+        db.add(IdempotencyKey(user_id=pending_user_id, key="k", fingerprint="f", response="{}"))
+        db.commit()
+
+    response = client.delete(f"/api/users/{pending_user_id}/deny")
+    assert response.status_code == 200, response.text
+
+    with SessionLocal() as db:
+        assert db.get(User, pending_user_id) is None
+        assert db.query(IdempotencyKey).count() == 0
+
+
+def test_deny_keeps_the_ledger_of_a_user_with_history(client, pending_user_id):
+    with SessionLocal() as db:
+        db.add(LedgerEntry(user_id=pending_user_id, amount=-5.0, kind="adjustment"))
+        db.commit()
+
+    response = client.delete(f"/api/users/{pending_user_id}/deny")
+    assert response.status_code == 400, response.text
+
+    with SessionLocal() as db:
+        assert db.get(User, pending_user_id) is not None
+        assert db.query(LedgerEntry).filter(LedgerEntry.user_id == pending_user_id).count() == 1
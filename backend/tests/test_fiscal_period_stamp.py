@@ -0,0 +1,133 @@
+"""New rows record the period that is open when they are written, including
+right after another worker closed the previous one, and a close never
+freezes statistics that miss a row stamped with its period."""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import app.routers.fiscal as fiscal_router
+from app.database import Base, SessionLocal, engine
+from app.models.fiscal_period import FiscalPeriod
+from app.models.fiscal_period_rollup import FiscalPeriodRollup
+from app.models.product import Product
+from app.models.transaction import Transaction
+from app.services.fiscal import period_stats
+
+DEV_USER_ID = 1
+
+
+@pytest.fixture
+def open_period(client) -> tuple[int, int]:
+    """Returns the ids of the open period and of a product."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    client.get("/api/me")  # creates the dev admin
+    with SessionLocal() as db:
+        period = FiscalPeriod()
+        product = Product(name="Olut", price=2.0)
+        db.add_all([period, product])
+        db.commit()
+        return period.id, product.id
+
+
+def buy(client, product_id: int) -> int:
+    response = client.post("/api/transactions/purchase", json={"product_id": product_id})
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def purchase(product_id: int) -> Transaction:
+    return Transaction(
+        user_id=DEV_USER_ID, product_id=product_id, type="purchase",
+        amount=-2.0, status="approved",
+    )
+
+
+def close_in_background(client) -> tuple[threading.Thread, dict]:
+    result = {}
+
+    def close():
+        result["response"] = client.post("/api/fiscal-periods/close")
+
+    thread = threading.Thread(target=close)
+    thread.start()
+    return thread, result
+
+
+def assert_frozen_purchases(period_id: int, expected: int) -> None:
+    with SessionLocal() as db:
+        frozen = db.get(FiscalPeriodRollup, period_id)
+        period = db.get(FiscalPeriod, period_id)
+        live = db.execute(period_stats(period.id, period.started_at)).one()
+    assert frozen.total_purchases == live.total_purchases == expected
+
+
+def test_rows_written_after_a_close_get_the_new_period(client, open_period):
+    old_period_id, product_id = open_period
+
+    before = buy(client, product_id)
+    # Closed behind this process's back, as by another worker
+    with SessionLocal() as db:
+        db.get(FiscalPeriod, old_period_id).ended_at = datetime.now()
+        new_period = FiscalPeriod()
+        db.add(new_period)
+        db.commit()
+        new_period_id = new_period.id
+    after = buy(client, product_id)
+    checkout = client.post("/api/transactions/checkout", json={
+        "items": [{"product_id": product_id}, {"product_id": product_id, "quantity": 2}],
+    })
+    assert checkout.status_code == 200, checkout.text
+
+    with SessionLocal() as db:
+        stamped = dict(db.query(Transaction.id, Transaction.fiscal_period_id).all())
+    assert stamped.pop(before) == old_period_id
+    assert stamped.pop(after) == new_period_id
+    assert set(stamped.values()) == {new_period_id}
+
+
+def test_close_waits_for_a_writer_that_stamped_its_period(client, open_period):
+    period_id, product_id = open_period
+
+    with SessionLocal() as writer:
+        tx = purchase(product_id)
+        writer.add(tx)
+        writer.flush()
+        assert tx.fiscal_period_id == period_id
+
+        thread, result = close_in_background(client)
+        time.sleep(0.5)
+        assert thread.is_alive(), "the close did not wait for the writer"
+        writer.commit()
+    thread.join()
+
+    assert result["response"].status_code == 200, result["response"].text
+    assert_frozen_purchases(period_id, 1)
+
+
+def test_writer_during_a_close_gets_the_new_period(client, open_period, monkeypatch):
+    period_id, product_id = open_period
+    closing = threading.Event()
+    freeze = fiscal_router.freeze_period_stats
+
+    def slow_freeze(*args):
+        closing.set()
+        time.sleep(0.5)
+        freeze(*args)
+
+    monkeypatch.setattr(fiscal_router, "freeze_period_stats", slow_freeze)
+    thread, result = close_in_background(client)
+    assert closing.wait(5)
+    with SessionLocal() as writer:
+        tx = purchase(product_id)
+        writer.add(tx)
+        writer.commit()
+        stamped = tx.fiscal_period_id
+    thread.join()
+
+    assert result["response"].status_code == 200, result["response"].text
+    assert stamped == result["response"].json()["new_period_id"]
+    assert_frozen_purchases(period_id, 0)
@@ -0,0 +1,84 @@
+"""A closed period's frozen statistics must follow approvals made after the
+close, so they keep matching what aggregating its transactions gives."""
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+from app.models.fiscal_period import FiscalPeriod
+from app.models.product import Product
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.fiscal import period_stats
+
+STAT_FIELDS = ("total_purchases", "total_purchase_amount", "total_payments", "total_payment_amount")
+
+
+@pytest.fixture
+def pending(client) -> tuple[int, list[int]]:
+    """A closed period holding two pending and two approved transactions;
+    returns its id and the pending transaction ids."""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    client.get("/api/me")  # creates the dev admin
+    with SessionLocal() as db:
+        period = FiscalPeriod()
+        user = User(telegram_id=1000, first_name="Late")
+        product = Product(name="Olut", price=2.0)
+        db.add_all([period, user, product])
+        db.flush()
+
+        def tx(tx_type: str, amount: float, status: str) -> Transaction:
+            return Transaction(
+                user_id=user.id, product_id=product.id if tx_type == "purchase" else None,
+                type=tx_type, amount=amount, status=status, fiscal_period_id=period.id,
+            )
+
+        txs = [
+            tx("purchase", -2.0, "approved"),
+            tx("payment", 5.0, "approved"),
+            tx("purchase", -4.0, "pending"),
+            tx("payment", 3.0, "pending"),
+        ]
+        db.add_all(txs)
+        db.commit()
+        period_id, pending_ids = period.id, [t.id for t in txs[2:]]
+
+    response = client.post("/api/fiscal-periods/close")
+    assert response.status_code == 200, response.text
+    assert response.json()["closed_period_id"] == period_id
+    return period_id, pending_ids
+
+
+def frozen_matches_aggregate(client, period_id: int) -> dict:
+    frozen = client.get(f"/api/fiscal-periods/{period_id}/stats").json()
+    with SessionLocal() as db:
+        period = db.get(FiscalPeriod, period_id)
+        live = db.execute(period_stats(period.id, period.started_at)).one()
+    assert {f: frozen[f] for f in STAT_FIELDS} == {f: getattr(live, f) for f in STAT_FIELDS}
+    return frozen
+
+
+def test_approval_after_close_updates_frozen_stats(client, pending):
+    period_id, (purchase_id, payment_id) = pending
+    assert frozen_matches_aggregate(client, period_id)["total_purchases"] == 1
+
+    for tx_id in (purchase_id, payment_id):
+        response = client.put(f"/api/transactions/{tx_id}/approve")
+        assert response.status_code == 200, response.text
+
+    stats = frozen_matches_aggregate(client, period_id)
+    assert stats["total_purchases"] == 2
+    assert stats["total_purchase_amount"] == 6.0
+    assert stats["total_payments"] == 2
+    assert stats["total_payment_amount"] == 8.0
+
+
+def test_bulk_approval_after_close_updates_frozen_stats(client, pending):
+    period_id, pending_ids = pending
+
+    response = client.post("/api/transactions/bulk-approve", json={"transaction_ids": pending_ids})
+    assert response.status_code == 200, response.text
+
+    stats = frozen_matches_aggregate(client, period_id)
+    assert stats["total_purchases"] == 2
+    assert stats["total_payments"] == 2
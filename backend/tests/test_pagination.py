@@ -0,0 +1,50 @@
+"""Page cursors round-trip, and malformed ones are rejected with a 400,
+never a server error."""
+
+import base64
+import json
+
+import pytest
+
+from app.database import Base, SessionLocal, engine
+from app.models.user import User
+from app.pagination import NEXT_CURSOR_HEADER
+
+
+def cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+@pytest.fixture(scope="module")
+def signed_in(client):
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    client.get("/api/me")  # creates the dev user
+    with SessionLocal() as db:
+        db.add_all(User(telegram_id=1000 + i, first_name=f"User {i}", balance=-i) for i in range(3))
+        db.commit()
+
+
+@pytest.mark.parametrize("value", [
+    "not base64 json",
+    cursor({"created_at": "2026-01-01"}),
+    cursor(["2026-01-01T00:00:00"]),
+    cursor(["yesterday", 1]),
+    cursor([12345, 1]),
+    cursor([["2026-01-01T00:00:00"], 1]),
+    cursor(["2026-01-01T00:00:00", "abc"]),
+])
+def test_malformed_cursor_is_rejected(client, signed_in, value):
+    response = client.get("/api/transactions/mine", params={"cursor": value})
+    assert response.status_code == 400, response.text
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+@pytest.mark.parametrize("path", ["/api/users", "/api/leaderboard", "/api/transactions/mine"])
+def test_cursor_round_trips(client, signed_in, path):
+    response = client.get(path, params={"limit": 1})
+    assert response.status_code == 200, response.text
+    next_cursor = response.headers.get(NEXT_CURSOR_HEADER)
+    if next_cursor is not None:
+        response = client.get(path, params={"limit": 1, "cursor": next_cursor})
+        assert response.status_code == 200, response.text
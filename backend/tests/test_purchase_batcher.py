@@ -0,0 +1,168 @@
+"""The group-commit batcher must fail only the purchases that are bad,
+store the responses of keyed purchases in the same commit and never keep a
+request waiting on a stuck writer."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+
+from app.config import settings
+from app.database import Base, SessionLocal, engine
+from app.models.idempotency_key import IdempotencyKey
+from app.models.product import Product
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.idempotency import IdempotentRequest, idempotency_cache
+from app.services.purchases import PurchaseBatcher, purchase_batcher
+
+MISSING_USER_ID = 999
+
+
+@pytest.fixture
+def shop() -> tuple[list[int], int]:
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        users = [User(telegram_id=1000 + i, first_name=f"Buyer {i}") for i in range(3)]
+        product = Product(name="Olut", price=2.0)
+        db.add_all([*users, product])
+        db.commit()
+        return [user.id for user in users], product.id
+
+
+@pytest.fixture
+def batcher():
+    # A long window so that every purchase submitted below lands in one batch
+    batcher = PurchaseBatcher(window_seconds=0.2, max_size=100)
+    yield batcher
+    batcher.stop()
+
+
+def test_bad_purchase_fails_alone(shop, batcher, caplog):
+    user_ids, product_id = shop
+
+    with caplog.at_level(logging.WARNING, logger="app.services.purchases"):
+        good = [batcher.submit(user_id, product_id, 1) for user_id in user_ids]
+        bad = batcher.submit(MISSING_USER_ID, product_id, 1)
+        results = [future.result(timeout=10) for future in good]
+        with pytest.raises(IntegrityError):
+            bad.result(timeout=10)
+
+    assert "retrying them one by one" in caplog.text
+    assert [out.user_id for out in results] == user_ids
+    with SessionLocal() as db:
+        assert db.query(Transaction).count() == len(user_ids)
+        assert {balance for (balance,) in db.query(User.balance)} == {-2.0}
+
+
+def test_unknown_product_is_not_found(shop, batcher):
+    user_ids, product_id = shop
+
+    found = batcher.submit(user_ids[0], product_id, 1)
+    missing = batcher.submit(user_ids[1], product_id + 1, 1)
+
+    assert found.result(timeout=10).product_id == product_id
+    with pytest.raises(HTTPException) as error:
+        missing.result(timeout=10)
+    assert error.value.status_code == 404
+
+
+def test_same_key_in_one_batch_buys_once(shop, batcher):
+    user_ids, product_id = shop
+    key = IdempotentRequest(key="tap", fingerprint="same body")
+
+    first = batcher.submit(user_ids[0], product_id, 1, key)
+    retry = batcher.submit(user_ids[0], product_id, 1, key)
+
+    assert first.result(timeout=10).id == retry.result(timeout=10)["id"]
+    with SessionLocal() as db:
+        assert db.query(Transaction).count() == 1
+        assert db.get(IdempotencyKey, (user_ids[0], "tap")) is not None
+        assert db.get(User, user_ids[0]).balance == -2.0
+
+
+def test_key_reused_for_another_request_is_rejected(shop, batcher):
+    user_ids, product_id = shop
+
+    first = batcher.submit(user_ids[0], product_id, 1, IdempotentRequest("tap", "one body"))
+    other = batcher.submit(user_ids[0], product_id, 2, IdempotentRequest("tap", "another body"))
+
+    first.result(timeout=10)
+    with pytest.raises(HTTPException) as error:
+        other.result(timeout=10)
+    assert error.value.status_code == 422
+
+
+def test_stuck_writer_answers_503(shop):
+    user_ids, product_id = shop
+    released = threading.Event()
+
+    def stuck_session():
+        released.wait(10)
+        return SessionLocal()
+
+    batcher = PurchaseBatcher(
+        window_seconds=0.01, max_size=100, session_factory=stuck_session, write_timeout_seconds=0.2,
+    )
+    try:
+        writing = batcher.submit(user_ids[0], product_id, 1)
+        time.sleep(0.05)  # past the window, so that the writer takes it alone
+        queued = batcher.submit(user_ids[1], product_id, 1)
+        for future in (writing, queued):
+            with pytest.raises(HTTPException) as error:
+                batcher.result(future)
+            assert error.value.status_code == 503
+
+        # Stuck for longer than a write may take: refused without waiting
+        assert not batcher.is_alive()
+        with pytest.raises(HTTPException) as error:
+            batcher.submit(user_ids[2], product_id, 1)
+        assert error.value.status_code == 503
+    finally:
+        released.set()
+        batcher.stop()
+
+    # The purchase being written went through, the queued one was given up
+    assert writing.result(timeout=10).user_id == user_ids[0]
+    assert queued.cancelled()
+    with SessionLocal() as db:
+        assert [user_id for (user_id,) in db.query(Transaction.user_id)] == [user_ids[0]]
+
+
+def test_keyed_purchases_take_the_group_commit_path(client, shop, monkeypatch):
+    _, product_id = shop
+    idempotency_cache.clear()
+    monkeypatch.setattr(settings, "PURCHASE_GROUP_COMMIT", True)
+    submitted = []
+    submit = purchase_batcher.submit
+    monkeypatch.setattr(
+        purchase_batcher, "submit", lambda *args: submitted.append(args) or submit(*args)
+    )
+
+    def buy(i: int) -> dict:
+        response = client.post(
+            "/api/transactions/purchase",
+            json={"product_id": product_id},
+            headers={"Idempotency-Key": f"tap-{i % 20}"},
+        )
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    # Create the dev user before the requests race to do it
+    client.get("/api/me")
+
+    # Concurrent purchases, each key sent twice
+    with ThreadPoolExecutor(max_workers=40) as pool:
+        bought = list(pool.map(buy, range(40)))
+
+    # Retries that arrive after the first commit are replayed without queueing
+    assert {args[3].key for args in submitted} == {f"tap-{i}" for i in range(20)}
+    assert len({tx["id"] for tx in bought}) == 20
+    with SessionLocal() as db:
+        assert db.query(Transaction).count() == 20
+        assert db.query(IdempotencyKey).count() == 20
@@ -0,0 +1,105 @@
+"""List endpoints must issue the same number of queries whatever their size.
+
+Seeds the database at several sizes, calls each list endpoint and compares
+the X-DB-Queries headers; a lazy load per row shows up as a count that
+grows with the rows.
+"""
+
+import pytest
+
+from app.auth.telegram import _new_dev_user
+from app.database import Base, SessionLocal, engine
+from app.models.fiscal_debt import FiscalDebt
+from app.models.fiscal_period import FiscalPeriod
+from app.models.product import Product
+from app.models.reward import Reward
+from app.models.reward_grant import RewardGrant
+from app.models.slot_machine_spin import SlotMachineSpin
+from app.models.transaction import Transaction
+from app.models.user import User
+
+SIZES = (1, 5, 25)
+DEV_USER_ID = 1
+
+ENDPOINTS = [
+    "/api/users",
+    "/api/leaderboard",
+    "/api/transactions/mine",
+    "/api/transactions/pending",
+    "/api/fiscal-periods",
+    "/api/fiscal-periods/1/debts",
+    "/api/fiscal-periods/1/stats",
+    "/api/fiscal-debts/pending",
+    "/api/my/debts",
+    "/api/rewards",
+    "/api/rewards/grants",
+    f"/api/rewards/grants/user/{DEV_USER_ID}",
+    "/api/slot-machine/history",
+    "/api/slot-machine/admin/stats",
+]
+
+
+def seed(size: int) -> None:
+    with SessionLocal() as db:
+        # The dev user authenticates the requests and owns half of the rows
+        dev = _new_dev_user()
+        db.add(dev)
+        db.flush()
+        assert dev.id == DEV_USER_ID
+
+        period = FiscalPeriod()
+        reward = Reward(
+            name="Sauna", amount=1.0, reward_type="one_time",
+            assigned_user_ids="[]", created_by_id=dev.id,
+        )
+        db.add_all([period, reward])
+        db.flush()
+
+        for i in range(size):
+            user = User(telegram_id=1000 + i, first_name=f"User {i}")
+            product = Product(name=f"Product {i}", price=1.0)
+            db.add_all([user, product])
+            db.flush()
+            # Rows refer to distinct users and products so lazy loads cannot hit the identity map
+            owner_id = dev.id if i % 2 else user.id
+            db.add_all([
+                Transaction(
+                    user_id=owner_id, product_id=product.id, type="purchase",
+                    amount=-1.0, status="pending",
+                    created_by_id=user.id if owner_id == dev.id else dev.id,
+                ),
+                FiscalDebt(
+                    fiscal_period_id=period.id, user_id=owner_id,
+                    amount=1.0, status="payment_pending",
+                ),
+                RewardGrant(
+                    reward_id=reward.id, user_id=owner_id,
+                    reward_name=reward.name, amount=reward.amount,
+                ),
+                SlotMachineSpin(
+                    user_id=user.id, bet_amount=1.0, win_amount=0.0,
+                    symbols='["cherry", "lemon", "plum"]',
+                ),
+            ])
+        db.commit()
+
+
+@pytest.fixture(scope="module")
+def query_counts(client) -> dict[str, list[int]]:
+    """Endpoint -> its query count at each of SIZES."""
+    counts: dict[str, list[int]] = {path: [] for path in ENDPOINTS}
+    for size in SIZES:
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        seed(size)
+        for path in ENDPOINTS:
+            response = client.get(path)
+            assert response.status_code == 200, f"{path}: {response.text}"
+            counts[path].append(int(response.headers["X-DB-Queries"]))
+    return counts
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_query_count_does_not_grow_with_rows(query_counts, path):
+    per_size = dict(zip(SIZES, query_counts[path]))
+    assert len(set(per_size.values())) == 1, f"queries per row count: {per_size}"
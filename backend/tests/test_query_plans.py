@@ -0,0 +1,211 @@
+"""Hot endpoints must not sequentially scan a large table.
+
+Builds the schema with the Alembic migrations, so that their indexes and
+partitions are what gets checked, seeds a year of data and records the
+SELECT statements each hot endpoint issues. Every statement is then
+EXPLAINed with the same parameters and with sequential scans disabled, so
+the planner only falls back to one when no index can serve the query; a
+sequential scan of one of LARGE_TABLES means a missing or unusable index.
+
+Needs Postgres: skipped unless TEST_DATABASE_URL points at one.
+"""
+
+import random
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import event, insert, select
+
+from app.auth.telegram import _new_dev_user
+from app.database import SessionLocal, engine
+from app.models.fiscal_debt import FiscalDebt
+from app.models.fiscal_period import FiscalPeriod
+from app.models.product import Product
+from app.models.reward import Reward
+from app.models.reward_grant import RewardGrant
+from app.models.slot_machine_spin import SlotMachineSpin
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.partitions import add_months, create_partitions
+
+pytestmark = pytest.mark.skipif(
+    engine.dialect.name != "postgresql", reason="EXPLAIN checks need Postgres; set TEST_DATABASE_URL"
+)
+
+DEV_USER_ID = 1
+PERIODS = 52
+USERS = 5_000
+TRANSACTIONS = 200_000
+CHUNK = 10_000
+
+# Small lookup tables (products, periods, settings) are fine to scan
+LARGE_TABLES = {"users", "transactions", "fiscal_debts", "reward_grants", "slot_machine_spins"}
+
+ENDPOINTS = [
+    "/api/me",
+    "/api/users",
+    "/api/leaderboard",
+    "/api/transactions/mine",
+    "/api/transactions/pending",
+    "/api/fiscal-periods/1/debts",
+    "/api/fiscal-periods/1/stats",
+    f"/api/fiscal-periods/{PERIODS}/stats",
+    "/api/fiscal-debts/pending",
+    "/api/my/debts",
+    "/api/rewards/grants",
+    f"/api/rewards/grants/user/{DEV_USER_ID}",
+    "/api/slot-machine/history",
+]
+
+
+def migrate() -> None:
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("DROP SCHEMA public CASCADE")
+        conn.exec_driver_sql("CREATE SCHEMA public")
+    config = Config()
+    config.set_main_option("script_location", str(Path(__file__).parents[1] / "alembic"))
+    command.upgrade(config, "head")
+
+
+def bulk_insert(table, rows) -> None:
+    with engine.begin() as conn:
+        for start in range(0, len(rows), CHUNK):
+            conn.execute(insert(table), rows[start:start + CHUNK])
+
+
+def seed() -> None:
+    rng = random.Random(0)
+    year_start = datetime.now() - timedelta(weeks=PERIODS)
+
+    with SessionLocal() as db:
+        dev = _new_dev_user()
+        db.add(dev)
+        db.flush()
+        assert dev.id == DEV_USER_ID
+        periods = [
+            FiscalPeriod(
+                started_at=year_start + timedelta(weeks=week),
+                ended_at=year_start + timedelta(weeks=week + 1) if week < PERIODS - 1 else None,
+            )
+            for week in range(PERIODS)
+        ]
+        product = Product(name="Olut", price=1.0)
+        reward = Reward(
+            name="Sauna", amount=1.0, reward_type="one_time",
+            assigned_user_ids="[]", created_by_id=dev.id,
+        )
+        db.add_all([*periods, product, reward])
+        create_partitions(db, year_start, add_months(datetime.now(), 1))
+        db.commit()
+        product_id, reward_id = product.id, reward.id
+        period_ids = [period.id for period in periods]
+
+    bulk_insert(User, [
+        {"telegram_id": 1000 + i, "first_name": f"User {i}", "balance": rng.uniform(-100, 10)}
+        for i in range(USERS)
+    ])
+    with engine.connect() as conn:
+        user_ids = conn.execute(select(User.id)).scalars().all()
+
+    def moment() -> tuple[datetime, int]:
+        """A random time within the year and the id of its period."""
+        offset = rng.uniform(0, PERIODS * 7 * 86400)
+        return year_start + timedelta(seconds=offset), period_ids[int(offset // (7 * 86400))]
+
+    def stamped(time_column: str, row: dict) -> dict:
+        row[time_column], row["fiscal_period_id"] = moment()
+        return row
+
+    bulk_insert(Transaction, [
+        stamped("created_at", {
+            "user_id": rng.choice(user_ids), "product_id": product_id, "type": "purchase",
+            "amount": -1.0, "quantity": 1,
+            "status": "pending" if rng.random() < 0.01 else "approved",
+        })
+        for _ in range(TRANSACTIONS)
+    ])
+    bulk_insert(FiscalDebt, [
+        {
+            "fiscal_period_id": period_id, "user_id": user_id, "amount": rng.uniform(1, 100),
+            "status": rng.choices(["paid", "unpaid", "payment_pending"], [90, 8, 2])[0],
+        }
+        for period_id in period_ids[:-1]
+        for user_id in rng.sample(user_ids, len(user_ids) // 5)
+    ])
+    bulk_insert(RewardGrant, [
+        stamped("granted_at", {
+            "reward_id": reward_id, "user_id": rng.choice(user_ids),
+            "reward_name": "Sauna", "amount": 1.0,
+        })
+        for _ in range(TRANSACTIONS // 10)
+    ])
+    bulk_insert(SlotMachineSpin, [
+        stamped("created_at", {
+            "user_id": rng.choice(user_ids), "bet_amount": 1.0, "win_amount": 0.0,
+            "symbols": '["cherry", "lemon", "plum"]',
+        })
+        for _ in range(TRANSACTIONS // 5)
+    ])
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("VACUUM ANALYZE")
+
+
+@pytest.fixture(scope="module")
+def selects(client) -> dict[str, list[tuple[str, object]]]:
+    """Endpoint -> the (statement, parameters) of every SELECT it issued."""
+    migrate()
+    seed()
+    captured: dict[str, list[tuple[str, object]]] = {path: [] for path in ENDPOINTS}
+    current = [""]
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured[current[0]].append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for path in ENDPOINTS:
+            current[0] = path
+            response = client.get(path)
+            assert response.status_code == 200, f"{path}: {response.text}"
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    yield captured
+
+    # Leave a schema the other tests can drop and recreate
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.exec_driver_sql("DROP SCHEMA public CASCADE")
+        conn.exec_driver_sql("CREATE SCHEMA public")
+
+
+def seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan["Node Type"] in ("Seq Scan", "Parallel Seq Scan"):
+        # Partitions are named like transactions_y2026m10
+        table = re.sub(r"_y\d{4}m\d{2}$", "", plan["Relation Name"])
+        if table in LARGE_TABLES:
+            found.append(table)
+    for child in plan.get("Plans", []):
+        found += seq_scans(child)
+    return found
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+def test_no_sequential_scans_of_large_tables(selects, path):
+    assert selects[path], f"{path} issued no SELECT"
+    scanned = []
+    with engine.connect() as conn:
+        # A scan that is merely cheaper than the index (a small partition, a
+        # hash join over all users) is fine; only an unavoidable one is not
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in selects[path]:
+            [explained] = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+            tables = seq_scans(explained["Plan"])
+            if tables:
+                scanned.append(f"{', '.join(sorted(set(tables)))}: {' '.join(statement.split())}")
+    assert not scanned, "sequential scans:\n" + "\n".join(scanned)
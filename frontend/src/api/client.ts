@@ -1,33 +1,148 @@
 const API_BASE = '/api';
 
+// Refresh the session token this long before it expires
+const SESSION_REFRESH_MARGIN_MS = 60_000;
+
+// Echoed back so reads right after our own writes skip the read replica
+const READ_PRIMARY_HEADER = 'X-Read-Primary-Until';
+let readPrimaryUntil: string | undefined;
+
+// Money-moving requests carry a key so a retried request is applied once
+const IDEMPOTENCY_HEADER = 'Idempotency-Key';
+
+export function idempotencyHeaders(): Record<string, string> {
+  return { [IDEMPOTENCY_HEADER]: crypto.randomUUID() };
+}
+
 let initDataRaw: string | undefined;
+let sessionToken: string | undefined;
+let sessionExpiresAt = 0;
+let sessionRequest: Promise<string | undefined> | undefined;
 
 export function setInitData(raw: string) {
   initDataRaw = raw;
+  sessionToken = undefined;
+  sessionExpiresAt = 0;
 }
 
-export async function apiRequest<T>(
+async function fetchSessionToken(): Promise<string | undefined> {
+  const response = await fetch(`${API_BASE}/auth/session`, {
+    method: 'POST',
+    headers: { Authorization: `tma ${initDataRaw}` },
+  });
+  if (!response.ok) {
+    return undefined;
+  }
+  const body = await response.json();
+  sessionToken = body.token;
+  sessionExpiresAt = new Date(body.expires_at).getTime();
+  return sessionToken;
+}
+
+async function getSessionToken(): Promise<string | undefined> {
+  if (!initDataRaw) {
+    return undefined;
+  }
+  if (sessionToken && Date.now() < sessionExpiresAt - SESSION_REFRESH_MARGIN_MS) {
+    return sessionToken;
+  }
+  if (!sessionRequest) {
+    sessionRequest = fetchSessionToken()
+      .catch(() => undefined)
+      .finally(() => {
+        sessionRequest = undefined;
+      });
+  }
+  return sessionRequest;
+}
+
+async function send(
   path: string,
   options: RequestInit = {},
-): Promise<T> {
+  retry = true,
+): Promise<Response> {
   const headers: Record<string, string> = {
     'Content-Type': 'application/json',
     ...(options.headers as Record<string, string>),
   };
 
-  if (initDataRaw) {
+  if (readPrimaryUntil) {
+    headers[READ_PRIMARY_HEADER] = readPrimaryUntil;
+  }
+
+  const token = await getSessionToken();
+  if (token) {
+    headers['Authorization'] = `Bearer ${token}`;
+  } else if (initDataRaw) {
     headers['Authorization'] = `tma ${initDataRaw}`;
   }
 
-  const response = await fetch(`${API_BASE}${path}`, {
-    ...options,
-    headers,
-  });
+  let response: Response;
+  try {
+    response = await fetch(`${API_BASE}${path}`, {
+      ...options,
+      headers,
+    });
+  } catch (e) {
+    // A dropped connection may still have reached the server; only
+    // idempotent requests are safe to send again
+    if (retry && headers[IDEMPOTENCY_HEADER]) {
+      return send(path, options, false);
+    }
+    throw e;
+  }
+
+  // Session tokens are revoked on role changes; get a fresh one and retry once
+  if (response.status === 401 && token && retry) {
+    sessionToken = undefined;
+    sessionExpiresAt = 0;
+    return send(path, options, false);
+  }
+
+  const primaryUntil = response.headers.get(READ_PRIMARY_HEADER);
+  if (primaryUntil) {
+    readPrimaryUntil = primaryUntil;
+  }
 
   if (!response.ok) {
     const body = await response.json().catch(() => ({}));
     throw new Error(body.detail || `API error: ${response.status}`);
   }
 
+  return response;
+}
+
+export async function apiRequest<T>(path: string, options: RequestInit = {}): Promise<T> {
+  const response = await send(path, options);
   return response.json();
 }
+
+// List endpoints are cursor paginated; the next page's cursor comes in this header
+const NEXT_CURSOR_HEADER = 'X-Next-Cursor';
+
+export interface Page<T> {
+  items: T[];
+  nextCursor?: string;
+}
+
+export async function apiRequestPage<T>(path: string, cursor?: string): Promise<Page<T>> {
+  const url = cursor
+    ? `${path}${path.includes('?') ? '&' : '?'}cursor=${encodeURIComponent(cursor)}`
+    : path;
+  const response = await send(url);
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get(NEXT_CURSOR_HEADER) ?? undefined,
+  };
+}
+
+export async function apiRequestAll<T>(path: string): Promise<T[]> {
+  const items: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const page = await apiRequestPage<T>(path, cursor);
+    items.push(...page.items);
+    cursor = page.nextCursor;
+  } while (cursor);
+  return items;
+}
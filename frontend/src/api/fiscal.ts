@@ -1,4 +1,4 @@
-import { apiRequest } from './client';
+import { apiRequest, apiRequestAll } from './client';
 import type { FiscalPeriod, FiscalPeriodStats, FiscalDebt } from '../types';
 
 export function listFiscalPeriods(): Promise<FiscalPeriod[]> {
@@ -42,5 +42,5 @@ export function markDebtPaid(debtId: number): Promise<FiscalDebt> {
 }
 
 export function getPendingDebts(): Promise<FiscalDebt[]> {
-  return apiRequest<FiscalDebt[]>('/fiscal-debts/pending');
+  return apiRequestAll<FiscalDebt>('/fiscal-debts/pending');
 }
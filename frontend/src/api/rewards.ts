@@ -1,4 +1,4 @@
-import { apiRequest } from './client';
+import { apiRequest, apiRequestAll } from './client';
 import type { Reward, RewardGrant } from '../types';
 
 export interface RewardCreateInput {
@@ -67,5 +67,5 @@ export function listAllGrants(limit: number = 100): Promise<RewardGrant[]> {
 }
 
 export function listUserGrants(userId: number): Promise<RewardGrant[]> {
-  return apiRequest<RewardGrant[]>(`/rewards/grants/user/${userId}`);
+  return apiRequestAll<RewardGrant>(`/rewards/grants/user/${userId}`);
 }
@@ -1,4 +1,4 @@
-import { apiRequest } from './client';
+import { apiRequest, idempotencyHeaders } from './client';
 
 export interface SlotMachineSpinResponse {
   symbols: string[];
@@ -28,6 +28,7 @@ export interface SlotMachineStats {
 export function spinSlotMachine(): Promise<SlotMachineSpinResponse> {
   return apiRequest<SlotMachineSpinResponse>('/slot-machine/spin', {
     method: 'POST',
+    headers: idempotencyHeaders(),
     body: JSON.stringify({}),
   });
 }
@@ -1,13 +1,26 @@
-import { apiRequest } from './client';
-import type { Transaction } from '../types';
+import { apiRequest, apiRequestAll, apiRequestPage, idempotencyHeaders } from './client';
+import type { Page } from './client';
+import type { BulkTransactionResult, CheckoutResult, Transaction } from '../types';
 
 export function createPurchase(productId: number, quantity = 1): Promise<Transaction> {
   return apiRequest<Transaction>('/transactions/purchase', {
     method: 'POST',
+    headers: idempotencyHeaders(),
     body: JSON.stringify({ product_id: productId, quantity }),
   });
 }
 
+export function checkout(
+  items: { productId: number; quantity: number }[],
+): Promise<CheckoutResult> {
+  return apiRequest<CheckoutResult>('/transactions/checkout', {
+    method: 'POST',
+    body: JSON.stringify({
+      items: items.map((item) => ({ product_id: item.productId, quantity: item.quantity })),
+    }),
+  });
+}
+
 export function createPayment(
   userId: number,
   amount: number,
@@ -25,16 +38,17 @@ export function createPaymentRequest(
 ): Promise<Transaction> {
   return apiRequest<Transaction>('/transactions/payment-request', {
     method: 'POST',
+    headers: idempotencyHeaders(),
     body: JSON.stringify({ amount, note }),
   });
 }
 
-export function getMyTransactions(): Promise<Transaction[]> {
-  return apiRequest<Transaction[]>('/transactions/mine');
+export function getMyTransactions(cursor?: string): Promise<Page<Transaction>> {
+  return apiRequestPage<Transaction>('/transactions/mine', cursor);
 }
 
 export function getPendingTransactions(): Promise<Transaction[]> {
-  return apiRequest<Transaction[]>('/transactions/pending');
+  return apiRequestAll<Transaction>('/transactions/pending');
 }
 
 export function approveTransaction(txId: number): Promise<Transaction> {
@@ -48,3 +62,17 @@ export function rejectTransaction(txId: number): Promise<Transaction> {
     method: 'PUT',
   });
 }
+
+export function bulkApproveTransactions(txIds: number[]): Promise<BulkTransactionResult> {
+  return apiRequest<BulkTransactionResult>('/transactions/bulk-approve', {
+    method: 'POST',
+    body: JSON.stringify({ transaction_ids: txIds }),
+  });
+}
+
+export function bulkRejectTransactions(txIds: number[]): Promise<BulkTransactionResult> {
+  return apiRequest<BulkTransactionResult>('/transactions/bulk-reject', {
+    method: 'POST',
+    body: JSON.stringify({ transaction_ids: txIds }),
+  });
+}
@@ -1,4 +1,4 @@
-import { apiRequest } from './client';
+import { apiRequest, apiRequestAll } from './client';
 import type { User } from '../types';
 
 export function getMe(): Promise<User> {
@@ -6,11 +6,11 @@ export function getMe(): Promise<User> {
 }
 
 export function listUsers(): Promise<User[]> {
-  return apiRequest<User[]>('/users');
+  return apiRequestAll<User>('/users');
 }
 
 export function getLeaderboard(): Promise<User[]> {
-  return apiRequest<User[]>('/leaderboard');
+  return apiRequestAll<User>('/leaderboard');
 }
 
 export function createUser(data: {
@@ -6,6 +6,8 @@ import {
   getPendingTransactions,
   approveTransaction,
   rejectTransaction,
+  bulkApproveTransactions,
+  bulkRejectTransactions,
 } from '../api/transactions';
 import type { Transaction, User } from '../types';
 
@@ -20,6 +22,11 @@ const styles = {
     textTransform: 'uppercase' as const,
     padding: '16px 0 8px',
   },
+  headerRow: {
+    display: 'flex',
+    alignItems: 'center' as const,
+    gap: '8px',
+  },
   card: {
     backgroundColor: 'var(--bg)',
     borderRadius: '12px',
@@ -143,6 +150,17 @@ export default function AdminPage() {
     fetchData();
   };
 
+  const handleApproveAll = async () => {
+    await bulkApproveTransactions(pending.map((tx) => tx.id));
+    fetchData();
+  };
+
+  const handleRejectAll = async () => {
+    if (!confirm(`Reject all ${pending.length} pending transactions?`)) return;
+    await bulkRejectTransactions(pending.map((tx) => tx.id));
+    fetchData();
+  };
+
   return (
     <div>
       <div style={styles.section}>
@@ -188,8 +206,26 @@ export default function AdminPage() {
       </div>
 
       <div style={styles.section}>
-        <div style={styles.header}>
-          Pending ({pending.length})
+        <div style={styles.headerRow}>
+          <div style={{ ...styles.header, flex: 1 }}>
+            Pending ({pending.length})
+          </div>
+          {pending.length > 1 && (
+            <>
+              <button
+                style={{ ...styles.actionBtn, ...styles.approveBtn }}
+                onClick={handleApproveAll}
+              >
+                ✓ All
+              </button>
+              <button
+                style={{ ...styles.actionBtn, ...styles.rejectBtn }}
+                onClick={handleRejectAll}
+              >
+                ✕ All
+              </button>
+            </>
+          )}
         </div>
         {pending.length === 0 ? (
           <div style={{ ...styles.card, ...styles.empty }}>No pending transactions</div>
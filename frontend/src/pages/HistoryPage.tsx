@@ -12,6 +12,16 @@ const styles = {
     textTransform: 'uppercase' as const,
     padding: '16px 16px 8px',
   },
+  more: {
+    display: 'block',
+    margin: '8px auto 16px',
+    padding: '8px 16px',
+    fontSize: '14px',
+    color: 'var(--link)',
+    background: 'none',
+    border: 'none',
+    cursor: 'pointer',
+  },
   loading: {
     textAlign: 'center' as const,
     padding: '32px',
@@ -23,16 +33,32 @@ const styles = {
 export default function HistoryPage() {
   const location = useLocation();
   const [transactions, setTransactions] = useState<Transaction[]>([]);
+  const [nextCursor, setNextCursor] = useState<string>();
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     setLoading(true);
     getMyTransactions()
-      .then(setTransactions)
+      .then((page) => {
+        setTransactions(page.items);
+        setNextCursor(page.nextCursor);
+      })
       .catch(console.error)
       .finally(() => setLoading(false));
   }, [location.key]);
 
+  const loadMore = () => {
+    setLoadingMore(true);
+    getMyTransactions(nextCursor)
+      .then((page) => {
+        setTransactions((prev) => [...prev, ...page.items]);
+        setNextCursor(page.nextCursor);
+      })
+      .catch(console.error)
+      .finally(() => setLoadingMore(false));
+  };
+
   if (loading) {
     return <div style={styles.loading}>Loading...</div>;
   }
@@ -44,6 +70,11 @@ export default function HistoryPage() {
         transactions={transactions}
         emptyText="No transactions yet. Log a drink to get started!"
       />
+      {nextCursor && (
+        <button style={styles.more} onClick={loadMore} disabled={loadingMore}>
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      )}
     </div>
   );
 }
@@ -38,6 +38,16 @@ export interface Transaction {
   user_name: string | null;
 }
 
+export interface CheckoutResult {
+  transactions: Transaction[];
+  new_balance: number;
+}
+
+export interface BulkTransactionResult {
+  transactions: Transaction[];
+  skipped_ids: number[];
+}
+
 export interface FiscalPeriod {
   id: number;
   started_at: string;